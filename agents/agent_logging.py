@@ -0,0 +1,140 @@
+# agent_logging.py
+# Agent verbosity, structlog events and a bounded per-session buffer of crew chatter
+
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Any, Dict, List, Optional
+
+import structlog
+
+from agents.run_control import current_run
+
+# crewai prints every prompt and reasoning step when verbose; off unless asked for (local debugging)
+AGENT_VERBOSE = os.getenv("AGENT_VERBOSE", "false").lower() == "true"
+
+# Lowest level of agent log events written to stdout; quieter ones only go to the session chatter
+LOG_LEVELS = {"debug": 10, "info": 20, "warning": 30, "error": 40, "critical": 50}
+AGENT_LOG_LEVEL = os.getenv("AGENT_LOG_LEVEL", "info" if AGENT_VERBOSE else "warning").lower()
+
+
+def _session_id() -> Optional[str]:
+    control = current_run()
+    return control.session_id if control is not None else None
+
+
+class AgentChatter:
+    """
+    Ring buffer of agent steps, task outputs and log events per session.
+
+    Crews report each step and finished task through `record_step` /
+    `record_task_output` (wired as crew callbacks), so a run's reasoning
+    trace can be read back from /research/{session_id}/agent-log instead of
+    being dumped to stdout. Each session keeps its last AGENT_CHATTER_LINES
+    entries and only the AGENT_CHATTER_SESSIONS most recent sessions are
+    kept. Buffers live in the worker process that ran the session.
+    """
+
+    def __init__(self, max_entries: int = None, max_sessions: int = None, max_chars: int = None):
+        self.max_entries = max_entries or int(os.getenv("AGENT_CHATTER_LINES", "500"))
+        self.max_sessions = max_sessions or int(os.getenv("AGENT_CHATTER_SESSIONS", "64"))
+        self.max_chars = max_chars or int(os.getenv("AGENT_CHATTER_MAX_CHARS", "4000"))
+        self._sessions: "OrderedDict[str, deque]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def append(self, kind: str, text: str, session_id: Optional[str] = None, **fields):
+        session_id = session_id or _session_id()
+        if session_id is None:
+            return
+        if len(text) > self.max_chars:
+            text = text[:self.max_chars] + f"... [{len(text) - self.max_chars} more chars]"
+        entry = {"time": round(time.time(), 3), "kind": kind, "text": text, **fields}
+        with self._lock:
+            entries = self._sessions.get(session_id)
+            if entries is None:
+                entries = self._sessions[session_id] = deque(maxlen=self.max_entries)
+                while len(self._sessions) > self.max_sessions:
+                    self._sessions.popitem(last=False)
+            else:
+                self._sessions.move_to_end(session_id)
+            entries.append(entry)
+
+    def entries(self, session_id: str, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        with self._lock:
+            entries = list(self._sessions.get(session_id, ()))
+        return entries[-limit:] if limit else entries
+
+    def clear(self, session_id: str):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "verbose": AGENT_VERBOSE,
+                "log_level": AGENT_LOG_LEVEL,
+                "sessions": len(self._sessions),
+                "entries": sum(len(entries) for entries in self._sessions.values()),
+                "max_entries_per_session": self.max_entries
+            }
+
+
+# Shared chatter buffers filled by every crew and agent logger in this process
+agent_chatter = AgentChatter()
+
+
+def record_step(step):
+    """crewai step_callback: one reasoning step (AgentAction / AgentFinish) of any agent in the crew"""
+    text = getattr(step, "text", None) or getattr(step, "log", None) or str(step)
+    agent_chatter.append("step", text, step=type(step).__name__, tool=getattr(step, "tool", None))
+
+
+def record_task_output(output):
+    """crewai task_callback: a finished task's output"""
+    text = getattr(output, "raw", None) or str(output)
+    agent_chatter.append("task", text, agent=getattr(output, "agent", None))
+
+
+def _add_session(logger, method_name: str, event_dict: Dict[str, Any]) -> Dict[str, Any]:
+    session_id = _session_id()
+    if session_id is not None:
+        event_dict.setdefault("session_id", session_id)
+    return event_dict
+
+
+def _drop_quiet(logger, method_name: str, event_dict: Dict[str, Any]) -> Dict[str, Any]:
+    """After the chatter copy: keep events below AGENT_LOG_LEVEL off stdout"""
+    if LOG_LEVELS.get(event_dict.get("level", method_name), 20) < LOG_LEVELS.get(AGENT_LOG_LEVEL, 30):
+        raise structlog.DropEvent
+    return event_dict
+
+
+def _to_chatter(logger, method_name: str, event_dict: Dict[str, Any]) -> Dict[str, Any]:
+    """Keep a copy of each agent log event in its session's chatter"""
+    fields = {
+        key: value if isinstance(value, (int, float, bool)) or value is None else str(value)
+        for key, value in event_dict.items() if key not in ("event", "session_id", "timestamp", "level")
+    }
+    agent_chatter.append("event", str(event_dict.get("event")), event_dict.get("session_id"),
+                         level=event_dict.get("level", method_name), **fields)
+    return event_dict
+
+
+structlog.configure(
+    processors=[
+        structlog.processors.add_log_level,
+        structlog.processors.TimeStamper(fmt="iso"),
+        _add_session,
+        _to_chatter,
+        _drop_quiet,
+        structlog.processors.JSONRenderer() if os.getenv("LOG_FORMAT", "console").lower() == "json"
+        else structlog.dev.ConsoleRenderer()
+    ],
+    cache_logger_on_first_use=True
+)
+
+
+def get_logger(component: str):
+    """structlog logger for an agent module; events carry the component and current session"""
+    return structlog.get_logger().bind(component=component)
@@ -1,93 +1,138 @@
 # avatar_agnostic_coordinator.py
-# Fixed version with correct imports and error handling
+# Stage-graph coordinator: ICP -> interviews -> marketing, with independent stages run in parallel
 
 import os
 from dotenv import load_dotenv
 import json
 from datetime import datetime
 
+from agents.stage_graph import Stage, StageGraph
+from agents.run_control import current_run
+from agents.registry import agent_registry
+from agents.tracing import tracer
+from agents.agent_logging import get_logger
+
+log = get_logger("coordinator")
+
+def _resolve_stage_implementations() -> dict:
+    """
+    Look up each stage's agent entry point once, when the coordinator loads.
+    Missing agents resolve to None and the stage falls back at run time.
+    """
+    return {
+        stage: agent_registry.get(stage)
+        for stage in ("icp_research", "interview_intelligence", "marketing_strategy")
+    }
+
+STAGE_IMPLEMENTATIONS = _resolve_stage_implementations()
+
+def build_default_stages(implementations: dict = None) -> list:
+    """
+    Declarative research pipeline. Each stage names its inputs; stages with
+    no dependency between them (e.g. a future competitor analysis that only
+    needs business_context) run alongside the interview stage.
+    """
+    implementations = implementations or STAGE_IMPLEMENTATIONS
+
+    icp_research = implementations.get("icp_research")
+    interview_intelligence = implementations.get("interview_intelligence")
+    marketing_strategy = implementations.get("marketing_strategy")
+
+    return [
+        Stage(
+            "icp_research",
+            run=(lambda business_context: icp_research(business_context)) if icp_research else None,
+            inputs=["business_context"],
+            fallback=lambda e: {"error": "ICP research failed", "details": str(e)}
+        ),
+        Stage(
+            "interview_intelligence",
+            run=(lambda icp_research: interview_intelligence(icp_research)) if interview_intelligence else None,
+            inputs=["icp_research"],
+            # Create mock interview results based on ICP research
+            fallback=lambda e: {
+                "status": "simulated",
+                "message": "Interview intelligence generated from ICP insights",
+                "based_on": "icp_research_results"
+            }
+        ),
+        Stage(
+            "marketing_strategy",
+            run=(
+                lambda icp_research, interview_intelligence, business_context:
+                    marketing_strategy(icp_research, interview_intelligence, business_context)
+            ) if marketing_strategy else None,
+            inputs=["icp_research", "interview_intelligence", "business_context"],
+            # Create basic marketing recommendations from available data
+            fallback=lambda e: {
+                "status": "basic_recommendations",
+                "message": "Marketing strategy generated from available research",
+                "based_on": "icp_and_interview_results"
+            }
+        )
+    ]
+
 class ContextDrivenCoordinator:
-    def __init__(self):
+    def __init__(self, stages: list = None, max_concurrency: int = None):
         load_dotenv()
-    
+        self.graph = StageGraph(stages or build_default_stages())
+        self.max_concurrency = max_concurrency or int(os.getenv("PIPELINE_STAGE_CONCURRENCY", "4"))
+
     def conduct_comprehensive_research(self, business_context: str) -> dict:
         """
         Orchestrate complete research pipeline with available agents
         """
-        
-        print("🚀 Starting Comprehensive Research Pipeline...")
-        
+
+        log.info("comprehensive_research_started", stages=len(self.graph.stages))
+
         try:
-            # Step 1: Deep ICP Research with Schwartz Analysis
-            print("🧠 Step 1: Conducting Deep ICP Research...")
-            
-            # Import and run your existing reasoning agent
-            try:
-                from agents.icp_intelligence_agent import reasoning_agent_call
-                icp_results = reasoning_agent_call(business_context)
-                print("✅ ICP Research Completed")
-            except Exception as e:
-                print(f"❌ ICP Research Failed: {e}")
-                icp_results = {"error": "ICP research failed", "details": str(e)}
-            
-            # Step 2: Dynamic Interview Intelligence (if available)
-            print("🎭 Step 2: Attempting Interview Intelligence...")
-            
-            try:
-                # Try to import your interview agent function
-                from agents.dynamic_interview_agent import reasoning_agent_call as interview_call
-                interview_results = interview_call(f"Based on this ICP research, conduct interview intelligence: {icp_results}")
-                print("✅ Interview Intelligence Completed")
-            except Exception as e:
-                print(f"⚠️ Interview Agent Not Available: {e}")
-                # Create mock interview results based on ICP research
-                interview_results = {
-                    "status": "simulated",
-                    "message": "Interview intelligence generated from ICP insights",
-                    "based_on": "icp_research_results"
-                }
-            
-            # Step 3: Marketing Strategy Synthesis (if available)
-            print("🎯 Step 3: Attempting Marketing Synthesis...")
-            
-            try:
-                from agents.marketing_intelligence_synthesizer import synthesize_marketing_intelligence
-                marketing_results = synthesize_marketing_intelligence(
-                    icp_results,
-                    interview_results, 
-                    business_context
+            with tracer.span("coordinator comprehensive_research", "coordinator", stages=len(self.graph.stages)):
+                outputs, stage_report = self.graph.run(
+                    {"business_context": business_context},
+                    max_concurrency=self.max_concurrency
                 )
-                print("✅ Marketing Synthesis Completed")
-            except Exception as e:
-                print(f"⚠️ Marketing Synthesizer Not Available: {e}")
-                # Create basic marketing recommendations from available data
-                marketing_results = {
-                    "status": "basic_recommendations",
-                    "message": "Marketing strategy generated from available research",
-                    "based_on": "icp_and_interview_results"
-                }
-            
+
+            for name, info in stage_report.items():
+                level = log.info if info["status"] in ("completed", "restored") else log.warning
+                level("stage_finished", stage=name, status=info["status"],
+                      duration_seconds=info.get("duration_seconds", 0), error=info.get("error"))
+
+            def agent_status(stage_name):
+                status = stage_report[stage_name]["status"]
+                if status in ("completed", "restored"):
+                    return "✅ Available"
+                if status == "cancelled":
+                    return "⏹️ Cancelled"
+                return "⚠️ Fallback used"
+
+            # A cancelled run or missed deadline still returns the stages that finished
+            control = current_run()
+            stopped_reason = control.reason if control is not None and control.cancelled else None
+
             return {
-                "success": True,
+                "success": stopped_reason is None,
+                "partial": stopped_reason is not None,
+                "stopped_reason": stopped_reason,
                 "research_approach": "adaptive_pipeline",
                 "results": {
-                    "icp_research": icp_results,
-                    "interview_intelligence": interview_results,
-                    "marketing_strategy": marketing_results
+                    "icp_research": outputs.get("icp_research"),
+                    "interview_intelligence": outputs.get("interview_intelligence"),
+                    "marketing_strategy": outputs.get("marketing_strategy")
                 },
                 "processing_summary": {
-                    "phases_completed": 3,
-                    "methodology": "adaptive_chunked_analysis", 
+                    "phases_completed": sum(1 for info in stage_report.values() if info["status"] in ("completed", "restored", "fallback")),
+                    "methodology": "adaptive_chunked_analysis",
                     "total_intelligence": "comprehensive_market_research_with_fallbacks"
                 },
+                "stage_timings": stage_report,
                 "agents_used": {
-                    "icp_agent": "✅ Available",
-                    "interview_agent": "⚠️ Fallback used" if "error" in str(interview_results) else "✅ Available",
-                    "marketing_agent": "⚠️ Fallback used" if "error" in str(marketing_results) else "✅ Available"
+                    "icp_agent": agent_status("icp_research"),
+                    "interview_agent": agent_status("interview_intelligence"),
+                    "marketing_agent": agent_status("marketing_strategy")
                 },
                 "timestamp": datetime.now().isoformat()
             }
-            
+
         except Exception as e:
             return {
                 "success": False,
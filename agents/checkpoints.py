@@ -0,0 +1,69 @@
+# checkpoints.py
+# Stage checkpoint scope - lets stages restore finished outputs and checkpoint new ones
+
+import contextvars
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Tuple
+
+from agents.agent_logging import get_logger
+from agents.metrics import STAGE_SECONDS
+from agents.run_control import RunCancelled
+from agents.tracing import tracer
+
+log = get_logger("checkpoints")
+
+_current_checkpoints = contextvars.ContextVar("stage_checkpoints", default=None)
+
+
+@contextmanager
+def checkpoint_scope(checkpoints):
+    """
+    Make `checkpoints` (anything with restore(stage) -> (found, output) and
+    save(stage, output)) active for everything run inside this block. Like the
+    run control, it follows work into to_thread, stage graph and fan-out threads.
+    """
+    token = _current_checkpoints.set(checkpoints)
+    try:
+        yield checkpoints
+    finally:
+        _current_checkpoints.reset(token)
+
+
+def current_checkpoints():
+    return _current_checkpoints.get()
+
+
+def restore_stage(stage: str) -> Tuple[bool, Any]:
+    """(True, output) if the stage finished in an earlier attempt of this session"""
+    checkpoints = _current_checkpoints.get()
+    if checkpoints is None:
+        return False, None
+    return checkpoints.restore(stage)
+
+
+def save_stage(stage: str, output: Any):
+    checkpoints = _current_checkpoints.get()
+    if checkpoints is not None:
+        checkpoints.save(stage, output)
+
+
+def checkpointed(stage: str, fn: Callable[..., Any], *args, **kwargs) -> Any:
+    """Return the stage's checkpointed output, or run it and checkpoint the result"""
+    found, output = restore_stage(stage)
+    if found:
+        log.info("stage_restored", stage=stage)
+        return output
+    started = time.monotonic()
+    status = "error"
+    try:
+        with tracer.span(f"stage {stage}", "stage"):
+            output = fn(*args, **kwargs)
+        status = "completed"
+    except RunCancelled:
+        status = "cancelled"
+        raise
+    finally:
+        STAGE_SECONDS.observe(time.monotonic() - started, stage=stage, status=status)
+    save_stage(stage, output)
+    return output
@@ -0,0 +1,71 @@
+# concurrency.py
+# Bounded fan-out for independent crews/agent calls
+
+import contextvars
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Any, Callable, Dict, Optional
+
+from agents.run_control import RunCancelled, check_cancelled, current_run
+
+
+def run_concurrently(tasks: Dict[str, Callable[[], Any]], max_concurrency: int = 3,
+                     timeout: Optional[float] = None) -> Dict[str, Dict[str, Any]]:
+    """
+    Run independent zero-argument callables on a bounded thread pool.
+
+    Each task's timeout is measured from when it actually starts, not from when
+    it was queued behind the concurrency cap. A timed-out task is abandoned (its
+    thread cannot be killed) and its eventual result is ignored. If the current
+    research run is cancelled, queued tasks are dropped and RunCancelled is raised;
+    running tasks stop at their next LLM request.
+
+    Returns {name: {"status": "completed" | "error" | "timeout" | "cancelled",
+                    "result" | "error": ..., "duration": seconds}}
+    """
+    outcomes: Dict[str, Dict[str, Any]] = {}
+    started_at: Dict[str, float] = {}
+
+    def _tracked(name, fn):
+        started_at[name] = time.monotonic()
+        return fn()
+
+    executor = ThreadPoolExecutor(max_workers=max(1, max_concurrency), thread_name_prefix="agent-fanout")
+    try:
+        pending = {}
+        for name, fn in tasks.items():
+            # Copy context so per-request contextvars follow the work into threads
+            context = contextvars.copy_context()
+            pending[executor.submit(context.run, _tracked, name, fn)] = name
+
+        poll = 0.5 if timeout or current_run() is not None else None
+        while pending:
+            done, _ = wait(pending, timeout=poll, return_when=FIRST_COMPLETED)
+            check_cancelled()
+
+            for future in done:
+                name = pending.pop(future)
+                duration = time.monotonic() - started_at.get(name, time.monotonic())
+                try:
+                    outcomes[name] = {"status": "completed", "result": future.result(), "duration": duration}
+                except RunCancelled as e:
+                    outcomes[name] = {"status": "cancelled", "error": str(e), "duration": duration}
+                except Exception as e:
+                    outcomes[name] = {"status": "error", "error": str(e), "duration": duration}
+
+            if timeout:
+                now = time.monotonic()
+                for future, name in list(pending.items()):
+                    if name in started_at and now - started_at[name] > timeout:
+                        pending.pop(future)
+                        future.cancel()
+                        outcomes[name] = {
+                            "status": "timeout",
+                            "error": f"Timed out after {timeout:.0f}s",
+                            "duration": now - started_at[name]
+                        }
+    finally:
+        # Don't wait on abandoned (timed-out) threads
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    return outcomes
@@ -0,0 +1,294 @@
+# context_budget.py
+# Token-aware budgeting for stage handoffs - counts with the model tokenizer, compresses extractively
+
+import json
+import math
+import os
+import re
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional
+
+from agents.agent_logging import get_logger
+
+log = get_logger("context_budget")
+
+try:
+    import tiktoken
+    TIKTOKEN_AVAILABLE = True
+except ImportError:
+    tiktoken = None
+    TIKTOKEN_AVAILABLE = False
+
+DEFAULT_MODEL = "gpt-4o-mini"
+
+# Token budgets for the data injected into each stage prompt (override with
+# CONTEXT_BUDGET_<STAGE>=tokens). Instructions and output templates are not counted.
+STAGE_BUDGETS = {
+    "icp_business_context": 8000,
+    "interview_context_extraction": 3000,
+    "persona_interview": 2000,
+    "group_interview": 4000,
+    "marketing_extraction": 3000,
+    "marketing_strategy": 3000,
+    "marketing_copy": 3000,
+    "synthesis": 1500,
+    "copy_tofu": 800,
+    "copy_mofu": 900,
+    "copy_bofu": 900
+}
+
+# Terms that mark the content later stages actually use: customer voice,
+# psychology and buying decisions
+HIGH_VALUE_TERMS = (
+    "pain", "fear", "frustrat", "desire", "want", "objection", "trigger", "belief",
+    "emotion", "language", "quote", "urgency", "trust", "decision", "buy", "price",
+    "competitor", "transformation", "identity", "insight", "persona", "motivation",
+    "hook", "headline", "awareness", "schwartz", "struggle", "goal"
+)
+
+OMISSION_MARKER = "[... {count} lower-priority section(s) omitted to fit the token budget ...]"
+
+
+def stage_budget(stage: str) -> int:
+    env_value = os.getenv(f"CONTEXT_BUDGET_{stage.upper()}")
+    if env_value:
+        return int(env_value)
+    return STAGE_BUDGETS[stage]
+
+
+@lru_cache(maxsize=16)
+def _encoding(model: str):
+    """The model's tiktoken encoding, or None when tiktoken or its encoding file is unavailable"""
+    if not TIKTOKEN_AVAILABLE:
+        return None
+    try:
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            # Claude and unknown models: cl100k is a close enough proxy for budgeting
+            return tiktoken.get_encoding("cl100k_base")
+    except Exception as e:
+        # tiktoken downloads encoding files on first use; offline hosts fall back to the estimate
+        log.warning("tokenizer_unavailable", model=model, fallback="estimate", error=str(e))
+        return None
+
+
+def count_tokens(text: str, model: str = DEFAULT_MODEL) -> int:
+    """Token count with the model's tokenizer (chars/4 estimate without tiktoken)"""
+    if not text:
+        return 0
+    encoding = _encoding(model)
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    return math.ceil(len(text) / 4)
+
+
+def render_value(value: Any) -> str:
+    """Render a stage output the way prompts embed it"""
+    if value is None:
+        return ""
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, indent=2, default=str)
+    return str(value)
+
+
+def split_sections(value: Any) -> List[str]:
+    """
+    Break a stage output into independently droppable sections: top-level
+    entries for dicts/lists, markdown headings or blank-line paragraphs for text.
+    """
+    if isinstance(value, dict):
+        return [f'"{key}": {render_value(item)}' for key, item in value.items()]
+    if isinstance(value, list):
+        return [render_value(item) for item in value]
+
+    text = render_value(value)
+    # A JSON object serialized to text (e.g. a crew result) splits like a dict
+    stripped = text.strip()
+    if stripped.startswith("{") and stripped.endswith("}"):
+        try:
+            parsed = json.loads(stripped)
+            if isinstance(parsed, dict) and parsed:
+                return split_sections(parsed)
+        except ValueError:
+            pass
+
+    sections = []
+    current: List[str] = []
+    for line in text.splitlines():
+        starts_heading = bool(re.match(r"^\s*(#{1,6}\s|\*\*[^*]+\*\*\s*:?\s*$|[A-Z][A-Z0-9 &/-]{4,}:?\s*$)", line))
+        if (starts_heading or not line.strip()) and any(part.strip() for part in current):
+            sections.append("\n".join(current).strip())
+            current = []
+        if line.strip():
+            current.append(line)
+    if any(part.strip() for part in current):
+        sections.append("\n".join(current).strip())
+    return sections
+
+
+def score_section(section: str, position: int, focus: Iterable[str] = ()) -> float:
+    """Higher is more valuable: customer-voice terms, quotes, headings, early position"""
+    lowered = section.lower()
+    words = max(1, len(lowered.split()))
+    term_hits = sum(lowered.count(term) for term in HIGH_VALUE_TERMS)
+    focus_hits = sum(lowered.count(term.lower()) for term in focus)
+    quotes = len(re.findall(r'"[^"\n]{12,}"', section))
+    heading = 1.0 if re.match(r"^\s*(#{1,6}\s|\*\*|[A-Z][A-Z0-9 &/-]{4,}:?\s*$)", section) else 0.0
+
+    density = (term_hits + 2 * focus_hits + quotes) / math.sqrt(words)
+    return density + 0.5 * heading + 1.0 / (1 + 0.15 * position)
+
+
+def _truncate_to_tokens(text: str, max_tokens: int, model: str) -> str:
+    """Cut at a line or sentence boundary so the result fits max_tokens"""
+    if max_tokens <= 0:
+        return ""
+    if count_tokens(text, model) <= max_tokens:
+        return text
+    pieces = re.split(r"(?<=[\n.!?])\s+", text)
+    kept = []
+    used = 0
+    for piece in pieces:
+        cost = count_tokens(piece, model) + 1
+        if used + cost > max_tokens:
+            break
+        kept.append(piece)
+        used += cost
+    if kept:
+        return " ".join(kept) + " [...]"
+    encoding = _encoding(model)
+    if encoding is not None:
+        return encoding.decode(encoding.encode(text, disallowed_special=())[:max_tokens]) + " [...]"
+    return text[:max_tokens * 4] + " [...]"
+
+
+def compress_to_budget(value: Any, max_tokens: int, model: str = DEFAULT_MODEL,
+                       focus: Iterable[str] = ()) -> str:
+    """
+    Fit a value into max_tokens. Content that already fits is returned as is;
+    otherwise the highest-value sections are kept in their original order and
+    the rest are replaced by an omission marker.
+    """
+    text = render_value(value)
+    if max_tokens <= 0:
+        return ""
+    if count_tokens(text, model) <= max_tokens:
+        return text
+
+    sections = split_sections(value)
+    costs = [count_tokens(section, model) for section in sections]
+    ranked = sorted(
+        range(len(sections)),
+        key=lambda index: score_section(sections[index], index, focus),
+        reverse=True
+    )
+
+    # Every kept section may be followed by an omission marker and a separator
+    marker_cost = count_tokens(OMISSION_MARKER.format(count=len(sections)), model) + 2
+    available = max_tokens - marker_cost
+    if available <= 0:
+        # No section fits next to its marker; a budget this small only has room for the marker
+        marker = OMISSION_MARKER.format(count=len(sections))
+        return marker if count_tokens(marker, model) <= max_tokens else ""
+
+    selected = set()
+    used = 0
+    for index in ranked:
+        cost = costs[index] + marker_cost
+        if used + cost <= available:
+            selected.add(index)
+            used += cost
+
+    if not selected:
+        # Even the best section is too large on its own - keep its head
+        best = ranked[0]
+        return _truncate_to_tokens(sections[best], available, model)
+
+    output = []
+    omitted = 0
+    for index, section in enumerate(sections):
+        if index in selected:
+            if omitted:
+                output.append(OMISSION_MARKER.format(count=omitted))
+                omitted = 0
+            output.append(section)
+        else:
+            omitted += 1
+    if omitted:
+        output.append(OMISSION_MARKER.format(count=omitted))
+    return "\n\n".join(output)
+
+
+class ContextBudget:
+    """
+    Splits one token budget across the named inputs of a stage prompt.
+
+    Inputs that fit inside their weighted share keep their full text and hand
+    the unused remainder to the others (water-filling); only inputs larger
+    than their final share are compressed.
+    """
+
+    def __init__(self, max_tokens: int, model: str = DEFAULT_MODEL):
+        self.max_tokens = max_tokens
+        self.model = model
+        self._sections: Dict[str, Dict[str, Any]] = {}
+        self.stats: Dict[str, Dict[str, Any]] = {}
+
+    def add(self, name: str, value: Any, weight: float = 1.0, focus: Iterable[str] = ()) -> "ContextBudget":
+        self._sections[name] = {
+            "value": value,
+            "weight": weight,
+            "focus": tuple(focus),
+            "tokens": count_tokens(render_value(value), self.model)
+        }
+        return self
+
+    def allocate(self) -> Dict[str, str]:
+        budgets: Dict[str, int] = {}
+        remaining = self.max_tokens
+        active = dict(self._sections)
+
+        while active:
+            total_weight = sum(section["weight"] for section in active.values()) or 1.0
+            fits = {
+                name: section for name, section in active.items()
+                if section["tokens"] <= remaining * section["weight"] / total_weight
+            }
+            if not fits:
+                for name, section in active.items():
+                    budgets[name] = int(remaining * section["weight"] / total_weight)
+                break
+            for name, section in fits.items():
+                budgets[name] = section["tokens"]
+                remaining -= section["tokens"]
+                active.pop(name)
+
+        rendered = {}
+        for name, section in self._sections.items():
+            if section["tokens"] <= budgets[name]:
+                text = render_value(section["value"])
+            else:
+                text = compress_to_budget(section["value"], budgets[name], self.model, section["focus"])
+            rendered[name] = text
+            self.stats[name] = {
+                "tokens": section["tokens"],
+                "budget": budgets[name],
+                "compressed": section["tokens"] > budgets[name]
+            }
+        return rendered
+
+
+def budget_sections(stage: str, model: str = DEFAULT_MODEL, weights: Optional[Dict[str, float]] = None,
+                    **sections) -> Dict[str, str]:
+    """Allocate the stage's token budget across keyword sections; returns rendered text per section"""
+    weights = weights or {}
+    budget = ContextBudget(stage_budget(stage), model)
+    for name, value in sections.items():
+        budget.add(name, value, weight=weights.get(name, 1.0))
+    rendered = budget.allocate()
+
+    compressed = [name for name, info in budget.stats.items() if info["compressed"]]
+    if compressed:
+        log.info("context_compressed", stage=stage, sections=compressed, max_tokens=budget.max_tokens)
+    return rendered
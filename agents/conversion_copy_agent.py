@@ -2,23 +2,29 @@
 # Tactical conversion copy generator based on deep market research
 
 from crewai import Agent, Task, Crew
-from langchain_openai import ChatOpenAI
+from agents.llm_gateway import llm_gateway
+from agents.llm_cache import cached_kickoff
+from agents.context_budget import budget_sections
+from agents.checkpoints import checkpointed
+from agents.agent_logging import AGENT_VERBOSE, get_logger, record_step, record_task_output
 import json
 
+log = get_logger("conversion_copy")
+
 class ConversionCopyAgent:
     def __init__(self):
         # Use different temperatures for different copy types
-        self.tofu_llm = ChatOpenAI(
+        self.tofu_llm = llm_gateway.chat_model(
             model="gpt-4o-mini",
             temperature=0.8  # Higher creativity for hooks/headlines
         )
         
-        self.mofu_llm = ChatOpenAI(
+        self.mofu_llm = llm_gateway.chat_model(
             model="gpt-4o-mini", 
             temperature=0.6  # Balanced for persuasion
         )
         
-        self.bofu_llm = ChatOpenAI(
+        self.bofu_llm = llm_gateway.chat_model(
             model="gpt-4o-mini",
             temperature=0.4  # Lower for conversion precision
         )
@@ -28,16 +34,17 @@ class ConversionCopyAgent:
         Generate micro-testable conversion assets from research insights
         """
         
-        print("🎯 Generating Tactical Conversion Assets...")
+        log.info("conversion_assets_started")
         
+        # Each phase is checkpointed, so a resumed session skips the ones already done
         # Phase 1: TOFU Micro-Test Assets (MintCRO Style)
-        tofu_assets = self.create_tofu_microtests(research_data, business_context)
+        tofu_assets = checkpointed("copy_tofu", self.create_tofu_microtests, research_data, business_context)
         
         # Phase 2: MOFU Conversion Mechanisms
-        mofu_assets = self.create_mofu_conversion_mechanisms(research_data, tofu_assets)
+        mofu_assets = checkpointed("copy_mofu", self.create_mofu_conversion_mechanisms, research_data, tofu_assets)
         
         # Phase 3: BOFU High-Converting Copy
-        bofu_assets = self.create_bofu_conversion_copy(research_data, mofu_assets)
+        bofu_assets = checkpointed("copy_bofu", self.create_bofu_conversion_copy, research_data, mofu_assets)
         
         return {
             "tofu_microtests": tofu_assets,
@@ -50,6 +57,12 @@ class ConversionCopyAgent:
         """
         Create MintCRO/Curt Maly style micro-budget test assets
         """
+        inputs = budget_sections(
+            "copy_tofu",
+            weights={"research": 3},
+            research=research_data,
+            business_context=business_context
+        )
         
         tofu_agent = Agent(
             role="Elite TOFU Conversion Specialist",
@@ -60,16 +73,13 @@ Every headline you write is a testable hypothesis based on psychological trigger
 
 You write hooks that feel like the prospect's internal monologue, headlines that challenge assumptions, and angles that make competitors' approaches look amateur.""",
             llm=self.tofu_llm,
-            verbose=True,
+            verbose=AGENT_VERBOSE,
             allow_delegation=False
         )
         
         tofu_task = Task(
             description=f"""
-            Create MICRO-TESTABLE TOFU assets using this research:
-            
-            RESEARCH INSIGHTS: {str(research_data)[:2000]}
-            BUSINESS CONTEXT: {business_context}
+            Create MICRO-TESTABLE TOFU assets using the research provided below:
             
             TACTICAL REQUIREMENTS:
             
@@ -108,6 +118,9 @@ You write hooks that feel like the prospect's internal monologue, headlines that
             - Test duration: 3-5 days
             
             Use exact customer language from research. Make each test hypothesis crystal clear.
+            
+            RESEARCH INSIGHTS: {inputs["research"]}
+            BUSINESS CONTEXT: {inputs["business_context"]}
             """,
             
             expected_output="""
@@ -163,15 +176,23 @@ You write hooks that feel like the prospect's internal monologue, headlines that
         tofu_crew = Crew(
             agents=[tofu_agent],
             tasks=[tofu_task],
-            verbose=True
+            verbose=AGENT_VERBOSE,
+            step_callback=record_step,
+            task_callback=record_task_output
         )
         
-        return tofu_crew.kickoff()
+        return cached_kickoff(tofu_crew)
     
     def create_mofu_conversion_mechanisms(self, research_data, tofu_results):
         """
         Create MOFU conversion mechanisms for engaged prospects
         """
+        inputs = budget_sections(
+            "copy_mofu",
+            weights={"research": 2},
+            research=research_data,
+            tofu=tofu_results
+        )
         
         mofu_agent = Agent(
             role="Elite MOFU Conversion Architect", 
@@ -182,16 +203,13 @@ You design conversion mechanisms like Eugene Schwartz and Gary Halbert - underst
 
 Your mechanisms don't just educate - they systematically dismantle objections while building emotional commitment to the solution.""",
             llm=self.mofu_llm,
-            verbose=True,
+            verbose=AGENT_VERBOSE,
             allow_delegation=False
         )
         
         mofu_task = Task(
             description=f"""
-            Design MOFU conversion mechanisms based on:
-            
-            RESEARCH DATA: {str(research_data)[:2000]}
-            TOFU RESULTS: {str(tofu_results)[:1000]}
+            Design MOFU conversion mechanisms based on the research and TOFU results provided below.
             
             CREATE HIGH-CONVERTING MOFU ASSETS:
             
@@ -225,6 +243,9 @@ Your mechanisms don't just educate - they systematically dismantle objections wh
             - Psychological reasoning
             - Expected conversion rates
             - Success metrics
+            
+            RESEARCH DATA: {inputs["research"]}
+            TOFU RESULTS: {inputs["tofu"]}
             """,
             
             expected_output="""
@@ -282,15 +303,23 @@ Your mechanisms don't just educate - they systematically dismantle objections wh
         mofu_crew = Crew(
             agents=[mofu_agent],
             tasks=[mofu_task],
-            verbose=True
+            verbose=AGENT_VERBOSE,
+            step_callback=record_step,
+            task_callback=record_task_output
         )
         
-        return mofu_crew.kickoff()
+        return cached_kickoff(mofu_crew)
     
     def create_bofu_conversion_copy(self, research_data, mofu_results):
         """
         Create BOFU high-converting copy for ready-to-buy prospects
         """
+        inputs = budget_sections(
+            "copy_bofu",
+            weights={"research": 2},
+            research=research_data,
+            mofu=mofu_results
+        )
         
         bofu_agent = Agent(
             role="Elite BOFU Conversion Closer",
@@ -301,16 +330,13 @@ You write like the greatest closers in history - David Ogilvy's precision, Gary
 
 You create offers so compelling and risk-free that prospects feel foolish not to take action immediately.""",
             llm=self.bofu_llm,
-            verbose=True,
+            verbose=AGENT_VERBOSE,
             allow_delegation=False
         )
         
         bofu_task = Task(
             description=f"""
-            Create BOFU high-converting copy based on:
-            
-            RESEARCH INSIGHTS: {str(research_data)[:2000]}
-            MOFU MECHANISMS: {str(mofu_results)[:1000]}
+            Create BOFU high-converting copy based on the research and MOFU mechanisms provided below.
             
             WRITE CONVERSION COPY THAT CLOSES:
             
@@ -352,6 +378,9 @@ You create offers so compelling and risk-free that prospects feel foolish not to
             - Social proof close
             
             Expected conversion rates: 25-40% for qualified traffic
+            
+            RESEARCH INSIGHTS: {inputs["research"]}
+            MOFU MECHANISMS: {inputs["mofu"]}
             """,
             
             expected_output="""
@@ -413,10 +442,12 @@ You create offers so compelling and risk-free that prospects feel foolish not to
         bofu_crew = Crew(
             agents=[bofu_agent],
             tasks=[bofu_task],
-            verbose=True
+            verbose=AGENT_VERBOSE,
+            step_callback=record_step,
+            task_callback=record_task_output
         )
         
-        return bofu_crew.kickoff()
+        return cached_kickoff(bofu_crew)
 
 # Main function for integration
 def generate_tactical_conversion_assets(research_data, business_context):
@@ -0,0 +1,143 @@
+# crew_llm.py
+# crewai LLM whose OpenAI clients come from the gateway - crew traffic shares the limiter, tracing and backends
+
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+from hashlib import md5
+from typing import Dict
+
+import httpx
+import openai
+import portalocker
+from crewai.llms.providers.openai.completion import OpenAICompletion
+from crewai_core import lock_store
+
+from agents.run_control import RunCancelled, check_cancelled
+
+
+class CrewRunCancelled(openai.OpenAIError):
+    """
+    RunCancelled raised inside a crew SDK client's transport. The SDK wraps
+    and retries any other transport exception as a connection error, but
+    passes OpenAIErrors straight through, so the cancellation isn't retried.
+    """
+
+    def __init__(self, cancelled: RunCancelled):
+        super().__init__(str(cancelled))
+        self.cancelled = cancelled
+
+
+class CancellableTransport(httpx.BaseTransport):
+    """Stops crew requests (including rate limiter waits) once their run is cancelled"""
+
+    def __init__(self, transport: httpx.BaseTransport):
+        self._transport = transport
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        try:
+            check_cancelled()
+            return self._transport.handle_request(request)
+        except RunCancelled as e:
+            raise CrewRunCancelled(e) from e
+
+    def close(self):
+        self._transport.close()
+
+
+class AsyncCancellableTransport(httpx.AsyncBaseTransport):
+    def __init__(self, transport: httpx.AsyncBaseTransport):
+        self._transport = transport
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        try:
+            check_cancelled()
+            return await self._transport.handle_async_request(request)
+        except RunCancelled as e:
+            raise CrewRunCancelled(e) from e
+
+    async def aclose(self):
+        await self._transport.aclose()
+
+
+class GatewayCompletion(OpenAICompletion):
+    """
+    crewai's native OpenAI LLM, built on the gateway's SDK clients.
+
+    crewai turns whatever `llm` an Agent is given into its own LLM and
+    builds fresh OpenAI clients from its settings, so an http_client handed
+    to a langchain model never reaches the wire. Supplying the clients here
+    keeps every crew request on the gateway's transport stack: pooled
+    connections, the provider rate limiter, tracing/metrics and the
+    fake/record/replay backends.
+
+    A cancelled run is checked before each call and surfaces as RunCancelled,
+    not as the connection error crewai would otherwise report.
+    """
+
+    def _build_sync_client(self):
+        from agents.llm_gateway import llm_gateway
+        return llm_gateway.crew_client(asynchronous=False)
+
+    def _build_async_client(self):
+        from agents.llm_gateway import llm_gateway
+        return llm_gateway.crew_client(asynchronous=True)
+
+    def call(self, *args, **kwargs):
+        check_cancelled()
+        try:
+            return super().call(*args, **kwargs)
+        except CrewRunCancelled as e:
+            raise e.cancelled from None
+
+    async def acall(self, *args, **kwargs):
+        check_cancelled()
+        try:
+            return await super().acall(*args, **kwargs)
+        except CrewRunCancelled as e:
+            raise e.cancelled from None
+
+
+class CrewStoreLocks:
+    """
+    Lock backend for crewai's own stores, queueing this process's threads in memory.
+
+    Every Crew.kickoff clears and rewrites crewai's kickoff task-output SQLite
+    file under a named lock. The default lock is a portalocker file lock whose
+    waiters poll it every 0.25s, so concurrent crews in one process lost up to
+    a poll interval per handoff and were served in no particular order. Here
+    threads wait on a per-name threading lock (no polling), and only the thread
+    holding it takes the same file lock, which still excludes other processes.
+    """
+
+    def __init__(self):
+        self._locks: Dict[str, threading.Lock] = {}
+        self._guard = threading.Lock()
+        self.installed = False
+
+    def _thread_lock(self, name: str) -> threading.Lock:
+        with self._guard:
+            return self._locks.setdefault(name, threading.Lock())
+
+    @contextmanager
+    def __call__(self, name: str, timeout: float = 120):
+        thread_lock = self._thread_lock(name)
+        if not thread_lock.acquire(timeout=timeout):
+            raise portalocker.exceptions.LockException(f"Timed out waiting for crewai lock '{name}'")
+        try:
+            # Same file as crewai's default backend, so processes without this backend are excluded too
+            channel = f"crewai:{md5(name.encode(), usedforsecurity=False).hexdigest()}"
+            with portalocker.Lock(os.path.join(tempfile.gettempdir(), f"{channel}.lock"), timeout=timeout):
+                yield
+        finally:
+            thread_lock.release()
+
+    def install(self):
+        if not self.installed:
+            lock_store.set_lock_backend(self)
+            self.installed = True
+
+
+# Installed by the gateway when it creates the first crew LLM
+crew_store_locks = CrewStoreLocks()
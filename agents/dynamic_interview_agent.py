@@ -1,19 +1,53 @@
 from crewai import Agent, Task, Crew
-from langchain_openai import ChatOpenAI
+from agents.llm_gateway import llm_gateway
+from agents.llm_cache import cached_kickoff
+from agents.concurrency import run_concurrently
+from agents.context_budget import budget_sections
+from agents.run_control import RunCancelled
+from agents.agent_logging import AGENT_VERBOSE, get_logger, record_step, record_task_output
 # Remove: from langchain_anthropic import ChatAnthropic
 import json
 import os
+import re
+
+log = get_logger("interview_intelligence")
+
+# Static extraction instructions - kept ahead of the research data as a cacheable prefix
+CONTEXT_EXTRACTION_INSTRUCTIONS = """
+Analyze the research data provided below and extract the key context for follow-up interviews.
+
+Extract and return ONLY a valid JSON object:
+{
+    "business_type": "B2B or B2C",
+    "target_customer": "Primary customer description",
+    "industry": "Industry context",
+    "customer_context": "What defines the customer (professional context for B2B, lifestyle for B2C)",
+    "company_offering": "What the company offers",
+    "key_challenges": ["Top 3 challenges customers face"],
+    "psychological_drivers": ["Top 3 psychological motivations"],
+    "decision_context": "How customers make decisions"
+}
+
+Use exact language from the research data.
+"""
 
 class DynamicInterviewAgent:
-    def __init__(self):
-        # GPT-4o-mini for everything
-        self.interview_llm = ChatOpenAI(
+    def __init__(self, fan_out=None, max_concurrency=None, interview_timeout=None):
+        # Interview mode - one small crew per persona, run concurrently
+        if fan_out is None:
+            fan_out = os.getenv("INTERVIEW_FAN_OUT", "true").lower() == "true"
+        self.fan_out = fan_out
+        self.max_concurrency = max_concurrency or int(os.getenv("INTERVIEW_CONCURRENCY", "4"))
+        self.interview_timeout = interview_timeout or float(os.getenv("INTERVIEW_TIMEOUT_SECONDS", "600"))
+        
+        # GPT-4o-mini for everything (shared, pooled clients from the gateway)
+        self.interview_llm = llm_gateway.chat_model(
             model="gpt-4o-mini",
             temperature=0.3
         )
         
         # Persona creation with same model
-        self.persona_llm = ChatOpenAI(
+        self.persona_llm = llm_gateway.chat_model(
             model="gpt-4o-mini",
             temperature=0.4
         )
@@ -53,53 +87,40 @@ class DynamicInterviewAgent:
     def extract_context_from_research(self, research_results):
         """Extract context from research results using AI"""
         try:
+            research_data = budget_sections("interview_context_extraction", research=research_results)["research"]
             extraction_prompt = f"""
-            Analyze this research data and extract the key context for follow-up interviews:
-            
             RESEARCH DATA:
-            {json.dumps(research_results, indent=2) if isinstance(research_results, dict) else str(research_results)}
-            
-            Extract and return ONLY a valid JSON object:
-            {{
-                "business_type": "B2B or B2C",
-                "target_customer": "Primary customer description",
-                "industry": "Industry context",
-                "customer_context": "What defines the customer (professional context for B2B, lifestyle for B2C)",
-                "company_offering": "What the company offers",
-                "key_challenges": ["Top 3 challenges customers face"],
-                "psychological_drivers": ["Top 3 psychological motivations"],
-                "decision_context": "How customers make decisions"
-            }}
-            
-            Use exact language from the research data.
+            {research_data}
             """
             
-            context_response = self.interview_llm.invoke(extraction_prompt)
-            
-            if hasattr(context_response, 'content'):
-                context_text = context_response.content
-            else:
-                context_text = str(context_response)
+            context_text = llm_gateway.complete(
+                extraction_prompt,
+                model="gpt-4o-mini",
+                temperature=0.3,
+                cached_prefix=CONTEXT_EXTRACTION_INSTRUCTIONS
+            ).text
             
             # Extract JSON from response
             try:
-                import re
-                json_match = re.search(r'\{.*\}', context_text, re.DOTALL)
-                if json_match:
-                    context = json.loads(json_match.group())
-                else:
-                    context = json.loads(context_text)
-                
-                return context
+                return self._extract_json(context_text)
                 
             except json.JSONDecodeError:
-                print(f"Failed to parse context extraction: {context_text}")
+                log.warning("context_extraction_unparseable", response=context_text[:500])
                 return self._create_fallback_context()
             
+        except RunCancelled:
+            raise
         except Exception as e:
-            print(f"Error extracting context: {e}")
+            log.error("context_extraction_failed", error=str(e))
             return self._create_fallback_context()
     
+    def _extract_json(self, text):
+        """Parse the outermost JSON object from an LLM/crew response"""
+        json_match = re.search(r'\{.*\}', text, re.DOTALL)
+        if json_match:
+            return json.loads(json_match.group())
+        return json.loads(text)
+    
     def _create_fallback_context(self):
         """Create fallback context if extraction fails"""
         return {
@@ -148,7 +169,7 @@ CONTEXT:
 Create personas that feel like real people with genuine complexity and authentic motivations. Each persona should be someone who would realistically be a customer and would provide unique insights in interviews.""",
             
             llm=self.persona_llm,
-            verbose=True,
+            verbose=AGENT_VERBOSE,
             allow_delegation=False
         )
     
@@ -169,7 +190,7 @@ Extract deep insights about {context['target_customer']}s for marketing intellig
 You conduct natural conversations that reveal genuine insights about customer psychology, pain points, and buying behavior.""",
             
             llm=self.interview_llm,
-            verbose=True,
+            verbose=AGENT_VERBOSE,
             allow_delegation=False
         )
     
@@ -189,7 +210,7 @@ When given a persona profile, you become that person completely:
 You make interviews feel like conversations with real people, revealing authentic insights about customer psychology.""",
             
             llm=self.interview_llm,
-            verbose=True,
+            verbose=AGENT_VERBOSE,
             allow_delegation=False
         )
     
@@ -275,9 +296,15 @@ You make interviews feel like conversations with real people, revealing authenti
     
     def create_interview_task(self, context, personas_data, contextualized_questions):
         """Create task for conducting multiple interviews"""
+        inputs = budget_sections(
+            "group_interview",
+            weights={"personas": 2},
+            questions=contextualized_questions,
+            personas=personas_data
+        )
         return Task(
             description=f"""
-            CONDUCT MULTIPLE INTERVIEW SESSIONS with {context['target_customer']} personas
+            CONDUCT MULTIPLE INTERVIEW SESSIONS with the {context['target_customer']} personas listed below
             
             INTERVIEW MISSION:
             Extract marketing intelligence through natural conversations that reveal:
@@ -286,9 +313,6 @@ You make interviews feel like conversations with real people, revealing authenti
             • Trust-building requirements and credibility factors
             • Buying triggers and timing considerations
             
-            PERSONAS TO INTERVIEW:
-            {personas_data}
-            
             INTERVIEW APPROACH:
             For each persona, conduct 2-3 different interview sessions:
             
@@ -307,9 +331,6 @@ You make interviews feel like conversations with real people, revealing authenti
             - Learn from their successes and disappointments
             - Understand what creates trust vs. skepticism
             
-            INTERVIEW QUESTIONS TO USE:
-            {json.dumps(contextualized_questions, indent=2)}
-            
             INSIGHT EXTRACTION REQUIREMENTS:
             For each interview, capture:
             ✅ Exact quotes and authentic language patterns
@@ -318,6 +339,12 @@ You make interviews feel like conversations with real people, revealing authenti
             ✅ Decision-making factors and timing
             ✅ Trust-building elements that resonate
             ✅ Competitive positioning opportunities
+            
+            INTERVIEW QUESTIONS TO USE:
+            {inputs["questions"]}
+            
+            PERSONAS TO INTERVIEW:
+            {inputs["personas"]}
             """,
             
             expected_output=f"""
@@ -410,51 +437,280 @@ You make interviews feel like conversations with real people, revealing authenti
             agent=self.create_interview_conductor(context)
         )
     
+    def parse_personas(self, personas_result):
+        """Extract the persona list from the persona crew output (empty if unparseable)"""
+        try:
+            personas_data = self._extract_json(str(personas_result))
+        except (json.JSONDecodeError, TypeError):
+            return []
+        
+        personas = personas_data.get("personas", []) if isinstance(personas_data, dict) else []
+        return self.number_personas(personas)
+    
+    def number_personas(self, personas):
+        """Drop non-dict entries and give every persona a unique persona_id (missing or repeated ids are renumbered)"""
+        personas = [persona for persona in personas if isinstance(persona, dict)]
+        # First occurrences keep their id; the rest are numbered around every id already in use
+        keep = {}
+        for index, persona in enumerate(personas):
+            if persona.get("persona_id"):
+                keep.setdefault(persona["persona_id"], index)
+        taken = set(keep)
+        number = 0
+        for index, persona in enumerate(personas):
+            if keep.get(persona.get("persona_id")) == index:
+                continue
+            number += 1
+            while f"persona_{number:03d}" in taken:
+                number += 1
+            persona["persona_id"] = f"persona_{number:03d}"
+            taken.add(persona["persona_id"])
+        return personas
+    
+    def create_persona_interview_task(self, context, persona, contextualized_questions):
+        """Create task for interviewing a single persona"""
+        inputs = budget_sections(
+            "persona_interview",
+            weights={"persona": 2},
+            questions=contextualized_questions,
+            persona=persona
+        )
+        return Task(
+            description=f"""
+            CONDUCT INTERVIEW SESSIONS with ONE {context['target_customer']} persona
+            
+            INTERVIEW MISSION:
+            Extract marketing intelligence through natural conversations that reveal:
+            • Authentic emotional language and pain expressions
+            • Real objections and decision-making psychology  
+            • Trust-building requirements and credibility factors
+            • Buying triggers and timing considerations
+            
+            INTERVIEW APPROACH:
+            Conduct 3 different interview sessions with this persona:
+            
+            **Session A: Problem-Focused** (Emotional, frustrated state)
+            **Session B: Solution-Oriented** (Analytical, evaluative state)  
+            **Session C: Experience-Based** (Reflective, storytelling state)
+            
+            INSIGHT EXTRACTION REQUIREMENTS:
+            ✅ Exact quotes and authentic language patterns
+            ✅ Emotional expressions and intensity levels  
+            ✅ Specific objections and concerns raised
+            ✅ Decision-making factors and timing
+            ✅ Trust-building elements that resonate
+            
+            INTERVIEW QUESTIONS TO USE:
+            {inputs["questions"]}
+            
+            PERSONA TO INTERVIEW:
+            {inputs["persona"]}
+            """,
+            
+            expected_output=f"""
+            Interview intelligence for this persona in JSON format:
+            
+            {{
+              "persona_interview": {{
+                "persona_id": "{persona.get('persona_id', 'persona')}",
+                "persona_summary": "[Brief persona description]",
+                "interview_sessions": [
+                  {{
+                    "session_type": "Problem-Focused / Solution-Oriented / Experience-Based",
+                    "emotional_state": "[Emotional state during the session]",
+                    "key_insights": {{"[insight category]": ["[Exact language captured]"]}},
+                    "interview_highlights": [
+                      {{
+                        "question": "[Question asked]",
+                        "response": "[Authentic response with exact language]",
+                        "insight": "[Marketing insight from this exchange]",
+                        "emotional_intensity": "[1-10 scale]"
+                      }}
+                    ]
+                  }}
+                ],
+                "persona_intelligence": {{
+                  "consistent_patterns": ["[What they said across all sessions]"],
+                  "authentic_voice": ["[Most genuine language captured]"],
+                  "marketing_angles": ["[Best approaches for this persona type]"]
+                }}
+              }},
+              "marketing_intelligence": {{
+                "universal_pain_language": ["[Pain expressions]"],
+                "common_objections": ["[Objections raised]"],
+                "decision_triggers": ["[Factors that drive action]"],
+                "trust_requirements": ["[Credibility builders]"],
+                "campaign_opportunities": ["[Marketing angles revealed]"]
+              }},
+              "campaign_ready_insights": {{
+                "headline_concepts": ["[Headlines using authentic customer language]"],
+                "pain_point_messaging": ["[Problem descriptions in their voice]"],
+                "objection_handling": ["[Responses to specific concerns raised]"]
+              }}
+            }}
+            """,
+            
+            agent=self.create_interview_conductor(context)
+        )
+    
+    def interview_persona(self, context, persona, contextualized_questions):
+        """Run one small interview crew for a single persona"""
+        interview_task = self.create_persona_interview_task(context, persona, contextualized_questions)
+        interview_crew = Crew(
+            agents=[
+                self.create_interview_conductor(context),
+                self.create_persona_simulator(context)
+            ],
+            tasks=[interview_task],
+            verbose=AGENT_VERBOSE,
+            step_callback=record_step,
+            task_callback=record_task_output
+        )
+        return cached_kickoff(interview_crew)
+    
+    @staticmethod
+    def _well_formed_interview(interview):
+        """Whether a parsed interview has the dict shape merge_persona_interviews reads"""
+        if not isinstance(interview, dict):
+            return False
+        if not isinstance(interview.get("persona_interview", interview), dict):
+            return False
+        return all(isinstance(interview.get(section, {}), dict)
+                   for section in ("marketing_intelligence", "campaign_ready_insights"))
+    
+    def merge_persona_interviews(self, personas, outcomes):
+        """Merge per-persona transcripts (outcomes keyed by the persona's list index) into the interview_intelligence structure"""
+        merged = {
+            "interview_summary": {
+                "total_personas": len(personas),
+                "sessions_per_persona": "2-3 different interview sessions",
+                "total_interviews": 0,
+                "insight_quality": "",
+                "execution_mode": "parallel_per_persona"
+            },
+            "persona_interviews": [],
+            "marketing_intelligence": {},
+            "campaign_ready_insights": {}
+        }
+        failed = []
+        
+        for index, persona in enumerate(personas):
+            persona_id = persona["persona_id"]
+            outcome = outcomes[index]
+            
+            if outcome["status"] != "completed":
+                failed.append(persona_id)
+                merged["persona_interviews"].append({
+                    "persona_id": persona_id,
+                    "error": f"Interview {outcome['status']}: {outcome['error']}"
+                })
+                continue
+            
+            try:
+                interview = self._extract_json(str(outcome["result"]))
+            except json.JSONDecodeError:
+                interview = None
+            if not self._well_formed_interview(interview):
+                # Keep the raw transcript rather than dropping the persona
+                merged["persona_interviews"].append({"persona_id": persona_id, "raw_transcript": str(outcome["result"])})
+                continue
+            
+            persona_interview = interview.get("persona_interview", interview)
+            persona_interview.setdefault("persona_id", persona_id)
+            merged["persona_interviews"].append(persona_interview)
+            sessions = persona_interview.get("interview_sessions", [])
+            merged["interview_summary"]["total_interviews"] += len(sessions) if isinstance(sessions, list) else 0
+            
+            # Union the cross-persona insight lists, preserving first-seen order
+            for section in ("marketing_intelligence", "campaign_ready_insights"):
+                for key, values in interview.get(section, {}).items():
+                    bucket = merged[section].setdefault(key, [])
+                    for value in values if isinstance(values, list) else [values]:
+                        if value not in bucket:
+                            bucket.append(value)
+        
+        completed = len(personas) - len(failed)
+        merged["interview_summary"]["insight_quality"] = f"{completed}/{len(personas)} persona interviews completed"
+        if failed:
+            merged["interview_summary"]["failed_personas"] = failed
+        
+        return merged
+    
+    def conduct_parallel_interviews(self, context, personas, contextualized_questions):
+        """Fan out one interview crew per persona on a bounded pool"""
+        personas = self.number_personas(personas)
+        log.info("persona_interviews_started", personas=len(personas), max_concurrency=self.max_concurrency)
+        
+        # Keyed by position - persona ids come from the LLM and can't be trusted to be unique
+        tasks = {
+            index: lambda persona=persona: self.interview_persona(context, persona, contextualized_questions)
+            for index, persona in enumerate(personas)
+        }
+        
+        outcomes = run_concurrently(
+            tasks,
+            max_concurrency=self.max_concurrency,
+            timeout=self.interview_timeout
+        )
+        
+        return self.merge_persona_interviews(personas, outcomes)
+    
     def execute_interview_intelligence(self, research_results):
         """Execute the complete interview intelligence process"""
         
-        print("🎭 Starting Interview Intelligence Process...")
+        log.info("interview_intelligence_started")
         
         # Step 1: Extract context from research
-        print("📋 Step 1: Extracting context from research findings...")
         context = self.extract_context_from_research(research_results)
-        print(f"   Target Customer: {context['target_customer']}")
-        print(f"   Industry: {context.get('industry', 'Business')}")
-        print(f"   Context: {context['customer_context']}")
+        log.info("context_extracted", target_customer=context["target_customer"],
+                 industry=context.get("industry", "Business"), customer_context=context["customer_context"])
         
         # Step 2: Contextualize interview questions
-        print("❓ Step 2: Adapting interview questions...")
+        log.info("questions_contextualizing")
         contextualized_questions = self.contextualize_questions(context)
         
         # Step 3: Generate personas
-        print("👥 Step 3: Creating realistic customer personas...")
+        log.info("personas_generating")
         persona_task = self.create_persona_task(context)
         persona_crew = Crew(
             agents=[self.create_persona_generator(context)],
             tasks=[persona_task],
-            verbose=True
+            verbose=AGENT_VERBOSE,
+            step_callback=record_step,
+            task_callback=record_task_output
         )
-        personas_result = persona_crew.kickoff()
+        personas_result = cached_kickoff(persona_crew)
         
         # Step 4: Conduct interviews
-        print("🎤 Step 4: Conducting multiple interview sessions...")
-        interview_task = self.create_interview_task(context, personas_result, contextualized_questions)
-        interview_crew = Crew(
-            agents=[
-                self.create_interview_conductor(context),
-                self.create_persona_simulator(context)
-            ],
-            tasks=[interview_task],
-            verbose=True
-        )
-        interview_results = interview_crew.kickoff()
+        log.info("interviews_started")
+        personas = self.parse_personas(personas_result) if self.fan_out else []
+        
+        if personas:
+            interview_results = self.conduct_parallel_interviews(context, personas, contextualized_questions)
+            methodology = "Parallel per-persona interview crews, multiple sessions per persona"
+        else:
+            if self.fan_out:
+                log.warning("personas_unparseable", fallback="single_interview_crew")
+            interview_task = self.create_interview_task(context, personas_result, contextualized_questions)
+            interview_crew = Crew(
+                agents=[
+                    self.create_interview_conductor(context),
+                    self.create_persona_simulator(context)
+                ],
+                tasks=[interview_task],
+                verbose=AGENT_VERBOSE,
+                step_callback=record_step,
+                task_callback=record_task_output
+            )
+            interview_results = cached_kickoff(interview_crew)
+            methodology = "Multiple sessions per persona with different emotional states and focuses"
         
         return {
             "context_extracted": context,
             "personas_created": personas_result,
             "interview_intelligence": interview_results,
             "process_summary": f"Interview intelligence for {context['target_customer']} in {context.get('industry', 'business')}",
-            "methodology": "Multiple sessions per persona with different emotional states and focuses",
+            "methodology": methodology,
             "marketing_readiness": "Authentic language and objection handling insights ready for campaigns"
         }
 
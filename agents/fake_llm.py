@@ -0,0 +1,432 @@
+# fake_llm.py
+# Deterministic stand-in for the OpenAI/Anthropic APIs - canned stage outputs with simulated latency
+
+import asyncio
+import hashlib
+import json
+import math
+import os
+import random
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+
+# Crew agents (ReAct prompts) only accept answers in this shape
+CREW_ANSWER_PREFIX = "Thought: I now know the final answer\nFinal Answer: "
+
+CONTEXT_JSON = {
+    "business_type": "B2B",
+    "target_customer": "Independent financial advisors",
+    "industry": "Wealth management",
+    "customer_context": "Solo and small-team advisory practices moving away from commission sales",
+    "company_offering": "Practice growth coaching and fee-only transition programs",
+    "key_challenges": ["Unpredictable income", "Compliance overhead", "Winning client trust without a big brand"],
+    "psychological_drivers": ["Independence", "Professional respect", "Financial security for their family"],
+    "decision_context": "Decides alone after peer recommendations and a low-risk trial"
+}
+
+MARKETING_JSON = {
+    "core_message": "Build the fee-only practice you wanted when you got into this business",
+    "primary_pain_points": ["My income swings every quarter", "Compliance eats my evenings", "Clients compare me to robo-advisors"],
+    "primary_desires": ["Predictable recurring revenue", "Clients who refer friends", "Time back for family"],
+    "emotional_triggers": ["Fear of falling behind", "Pride in independence", "Relief from sales pressure"],
+    "trust_factors": ["Advisors who made the switch", "Transparent pricing", "Compliance-reviewed materials"],
+    "objections": ["I can't afford a revenue dip", "My clients won't pay fees", "I've tried coaching before"],
+    "transformation": {"from": "Chasing commissions month to month", "to": "Running a calm, fee-only practice"},
+    "unique_value": "A transition plan built around keeping revenue flat during the switch",
+    "urgency_factors": ["Fee compression is accelerating", "Clients are asking about fees now"],
+    "social_proof_needs": ["Before/after revenue charts", "Peer advisor testimonials"]
+}
+
+PERSONAS_JSON = {
+    "context": {
+        "target_customer": "Independent financial advisors",
+        "industry": "Wealth management",
+        "customer_context": "Solo advisory practices"
+    },
+    "personas": [
+        {
+            "persona_id": f"persona_00{index + 1}",
+            "persona_type": persona_type,
+            "name": name,
+            "demographics": {"age": str(age), "background": background, "situation": situation},
+            "psychology": {"primary_emotion": emotion, "core_fear": fear, "core_desire": desire},
+            "communication_style": style
+        }
+        for index, (persona_type, name, age, background, situation, emotion, fear, desire, style) in enumerate([
+            ("Struggling advisor", "Dana R.", 41, "Ex-wirehouse rep", "Income down 20% since going independent",
+             "frustration", "Losing the house", "Stable monthly revenue", "Direct, numbers-first"),
+            ("Ambitious advisor", "Marcus T.", 34, "Second-generation planner", "Growing fast but burning out",
+             "impatience", "Plateauing", "A practice that scales without him", "Energetic, skims details"),
+            ("Experienced advisor", "Linda K.", 58, "25 years in practice", "Considering succession options",
+             "skepticism", "Being sold to", "A legacy clients trust", "Measured, asks for proof"),
+            ("Overwhelmed advisor", "Priya S.", 46, "Solo practice, two staff", "Drowning in compliance work",
+             "anxiety", "An audit finding", "Simplicity", "Warm, needs reassurance")
+        ])
+    ]
+}
+
+ICP_MARKDOWN = """# Ideal Customer Profile
+
+## Customer Psychology
+Independent advisors feel **trapped** between commission targets and *client trust*.
+- Pain: unpredictable income
+- Pain: compliance overhead
+- Desire: fee-only independence
+
+## Voice of Customer
+> "I tell clients to plan for the long run while I worry about next month."
+> "I didn't go independent to become a compliance clerk."
+
+## Awareness Level
+Problem-aware: they know commissions are the issue, not yet which transition model fits.
+
+## Campaign-Ready Insights
+1. Lead with revenue stability during the switch
+2. Use peer advisors as proof, not brand claims
+3. Offer a low-risk diagnostic before any program
+"""
+
+INTERVIEW_MARKDOWN = """## Interview Session 1 - Dana R. (frustrated)
+**Interviewer:** Walk me through your worst month this year.
+**Dana:** "March. Two clients moved to a robo-advisor and my payout dropped by a third."
+
+## Interview Session 2 - Dana R. (hopeful)
+**Interviewer:** What would a good year look like?
+**Dana:** "Same clients, same hours, but I know in January what I'll earn in December."
+
+### Key Language
+- "I know in January what I'll earn in December"
+- "I didn't sign up to be a salesperson"
+
+### Objections
+- "Fee-only sounds great until the first quarter with no commissions"
+"""
+
+STRATEGY_MARKDOWN = """# Master Marketing Strategy
+
+## Positioning
+The transition partner for advisors who want fee-only revenue without a revenue cliff.
+
+## Messaging Pillars
+1. Predictability - recurring revenue from existing relationships
+2. Proof - advisors who already made the switch
+3. Simplicity - compliance-ready materials included
+
+## Channel Plan
+- LinkedIn thought leadership aimed at independent advisors
+- Peer webinars with advisors two years past their transition
+"""
+
+COPY_MARKDOWN = """# Marketing Copy
+
+## Headline
+Keep your clients. Lose the commission treadmill.
+
+## Email 1 - The revenue cliff
+Subject: The quarter every advisor fears
+Most advisors who switch to fee-only lose revenue for two quarters. Ours don't - here's why.
+
+## Ad Variant A
+"I know in January what I'll earn in December." - Dana R., independent advisor
+"""
+
+TOFU_MARKDOWN = """# TOFU Micro-Tests
+
+## Test 1 - Pain hook
+- Hook: "Your income shouldn't depend on this month's product quota."
+- Budget: $5/day for 3 days
+- Success metric: CTR above 1.2%
+
+## Test 2 - Identity hook
+- Hook: "For advisors who went independent to serve clients, not quotas."
+- Budget: $5/day for 3 days
+- Success metric: CTR above 1.0%
+"""
+
+MOFU_MARKDOWN = """# MOFU Conversion Mechanisms
+
+## Lead Magnet
+Fee-Only Transition Calculator - shows month-by-month revenue during the switch.
+
+## Nurture Sequence
+1. Calculator results and what they mean
+2. Case study: Dana's first fee-only year
+3. Invitation to a 20-minute practice diagnostic
+"""
+
+BOFU_MARKDOWN = """# BOFU Conversion Copy
+
+## Sales Page Headline
+Switch to fee-only without a single down quarter.
+
+## Guarantee
+If your revenue dips below your commission baseline in the first six months, we coach you free until it recovers.
+
+## Call to Action
+Book your practice diagnostic - 20 minutes, no pitch.
+"""
+
+GENERIC_MARKDOWN = """## Analysis
+Independent advisors want predictable revenue and respect; proof from peers outweighs brand claims.
+- Pain: income volatility
+- Desire: independence with stability
+"""
+
+# (stage, marker phrases - any one in the lower-cased prompt selects the stage, output)
+# First match wins, so instruction-level markers come before generic ones
+CANNED_OUTPUTS: List[Tuple[str, Tuple[str, ...], Any]] = [
+    ("context_extraction", ("extract the key context for follow-up interviews",), CONTEXT_JSON),
+    ("marketing_extraction", ("extract key marketing intelligence",), MARKETING_JSON),
+    ("personas", ("personas for interview simulation",), PERSONAS_JSON),
+    ("interviews", ("conduct interview sessions", "conducting multiple interviews", "interview sessions"), INTERVIEW_MARKDOWN),
+    ("copy_tofu", ("micro-testable tofu",), TOFU_MARKDOWN),
+    ("copy_mofu", ("mofu conversion mechanisms",), MOFU_MARKDOWN),
+    ("copy_bofu", ("bofu high-converting copy",), BOFU_MARKDOWN),
+    ("marketing_strategy", ("master marketing strategy",), STRATEGY_MARKDOWN),
+    ("marketing_copy", ("high-converting marketing copy",), COPY_MARKDOWN),
+    ("icp_research", ("comprehensive icp research", "awareness_analysis", "psychology_analysis", "market_strategy"), ICP_MARKDOWN),
+]
+
+
+def canned_output(prompt: str) -> Tuple[str, str]:
+    """(stage, text) for a prompt; JSON stages return their JSON serialized"""
+    lowered = prompt.lower()
+    for stage, markers, output in CANNED_OUTPUTS:
+        if any(marker in lowered for marker in markers):
+            return stage, json.dumps(output, indent=2) if not isinstance(output, str) else output
+    return "generic", GENERIC_MARKDOWN
+
+
+def estimate_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+class FakeLLMBackend:
+    """
+    Builds provider-shaped responses (OpenAI chat completions, Anthropic
+    messages, streamed or not) from the canned outputs, with simulated
+    timing: time to first token from a log-normal distribution around
+    FAKE_LLM_LATENCY_MS, then completion tokens at a log-normally jittered
+    FAKE_LLM_TOKENS_PER_SECOND. Timing draws are seeded from FAKE_LLM_SEED
+    and the prompt, so a given prompt always takes the same time.
+    FAKE_LLM_TIME_SCALE scales every delay (0 = no waiting at all).
+    """
+
+    def __init__(self, latency_ms: float = None, latency_sigma: float = None, tokens_per_second: float = None,
+                 token_rate_sigma: float = None, time_scale: float = None, seed: str = None):
+        self.latency_ms = latency_ms if latency_ms is not None else float(os.getenv("FAKE_LLM_LATENCY_MS", "400"))
+        self.latency_sigma = latency_sigma if latency_sigma is not None else float(os.getenv("FAKE_LLM_LATENCY_SIGMA", "0.5"))
+        self.tokens_per_second = tokens_per_second or float(os.getenv("FAKE_LLM_TOKENS_PER_SECOND", "80"))
+        self.token_rate_sigma = token_rate_sigma if token_rate_sigma is not None else float(os.getenv("FAKE_LLM_TOKEN_RATE_SIGMA", "0.2"))
+        self.time_scale = time_scale if time_scale is not None else float(os.getenv("FAKE_LLM_TIME_SCALE", "1.0"))
+        self.seed = seed if seed is not None else os.getenv("FAKE_LLM_SEED", "0")
+
+    def timing(self, prompt: str) -> Tuple[float, float]:
+        """(seconds to first token, seconds per completion token) for this prompt"""
+        digest = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+        rng = random.Random(f"{self.seed}:{digest}")
+        first_token = self.latency_ms / 1000.0 * math.exp(rng.gauss(0, self.latency_sigma))
+        rate = self.tokens_per_second * math.exp(rng.gauss(0, self.token_rate_sigma))
+        return first_token * self.time_scale, self.time_scale / rate
+
+    def respond(self, request: httpx.Request, body: bytes):
+        """(status, headers, chunks, delays) - delays[i] is the wait before chunks[i]"""
+        try:
+            payload = json.loads(body or b"{}")
+        except ValueError:
+            return self._error(400, "Request body is not JSON")
+
+        path = request.url.path
+        if path.endswith("/chat/completions"):
+            provider = "openai"
+        elif path.endswith("/messages"):
+            provider = "anthropic"
+        else:
+            return self._error(404, f"Fake LLM backend has no route for {path}")
+
+        prompt = _prompt_text(payload, provider)
+        stage, text = canned_output(prompt)
+        if "final answer:" in prompt.lower():
+            text = CREW_ANSWER_PREFIX + text
+        usage = (estimate_tokens(prompt), estimate_tokens(text))
+        first_token, per_token = self.timing(prompt)
+        model = payload.get("model", "fake-model")
+
+        if payload.get("stream"):
+            pieces = [text[i:i + 64] for i in range(0, len(text), 64)] or [""]
+            build = _openai_stream if provider == "openai" else _anthropic_stream
+            chunks = build(model, pieces, usage)
+            # First token after the initial latency, then each piece at the token rate; framing events are free
+            piece_delay = per_token * 16
+            delays = [first_token] + [piece_delay if index < len(pieces) else 0.0 for index in range(1, len(chunks))]
+            return 200, {"content-type": "text/event-stream", "x-fake-llm-stage": stage}, chunks, delays
+
+        build = _openai_completion if provider == "openai" else _anthropic_message
+        chunk = json.dumps(build(model, text, usage)).encode("utf-8")
+        return 200, {"content-type": "application/json", "x-fake-llm-stage": stage}, [chunk], [first_token + per_token * usage[1]]
+
+    def _error(self, status: int, message: str):
+        chunk = json.dumps({"error": {"type": "invalid_request_error", "message": message}}).encode("utf-8")
+        return status, {"content-type": "application/json"}, [chunk], [0.0]
+
+
+def _prompt_text(payload: Dict[str, Any], provider: str) -> str:
+    parts = []
+    system = payload.get("system")
+    if isinstance(system, str):
+        parts.append(system)
+    elif isinstance(system, list):
+        parts.extend(block.get("text", "") for block in system if isinstance(block, dict))
+    for message in payload.get("messages", []):
+        content = message.get("content")
+        if isinstance(content, str):
+            parts.append(content)
+        elif isinstance(content, list):
+            parts.extend(block.get("text", "") for block in content if isinstance(block, dict))
+    return "\n".join(parts)
+
+
+def _response_id(prefix: str, text: str) -> str:
+    return f"{prefix}_fake_{hashlib.sha256(text.encode('utf-8')).hexdigest()[:24]}"
+
+
+def _openai_usage(usage: Tuple[int, int]) -> Dict[str, Any]:
+    return {
+        "prompt_tokens": usage[0],
+        "completion_tokens": usage[1],
+        "total_tokens": usage[0] + usage[1],
+        "prompt_tokens_details": {"cached_tokens": 0}
+    }
+
+
+def _openai_completion(model: str, text: str, usage: Tuple[int, int]) -> Dict[str, Any]:
+    return {
+        "id": _response_id("chatcmpl", text),
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "system_fingerprint": "fake_llm",
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": text},
+            "logprobs": None,
+            "finish_reason": "stop"
+        }],
+        "usage": _openai_usage(usage)
+    }
+
+
+def _sse(data: Dict[str, Any], event: Optional[str] = None) -> bytes:
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data)}\n\n".encode("utf-8")
+
+
+def _openai_stream(model: str, pieces: List[str], usage: Tuple[int, int]) -> List[bytes]:
+    response_id = _response_id("chatcmpl", "".join(pieces))
+    base = {"id": response_id, "object": "chat.completion.chunk", "created": int(time.time()), "model": model}
+    chunks = [
+        _sse(dict(base, choices=[{"index": 0, "delta": {"role": "assistant", "content": piece} if index == 0
+                                  else {"content": piece}, "finish_reason": None}]))
+        for index, piece in enumerate(pieces)
+    ]
+    chunks.append(_sse(dict(base, choices=[{"index": 0, "delta": {}, "finish_reason": "stop"}])))
+    chunks.append(_sse(dict(base, choices=[], usage=_openai_usage(usage))))
+    chunks.append(b"data: [DONE]\n\n")
+    return chunks
+
+
+def _anthropic_usage(usage: Tuple[int, int]) -> Dict[str, int]:
+    return {
+        "input_tokens": usage[0],
+        "output_tokens": usage[1],
+        "cache_read_input_tokens": 0,
+        "cache_creation_input_tokens": 0
+    }
+
+
+def _anthropic_message(model: str, text: str, usage: Tuple[int, int]) -> Dict[str, Any]:
+    return {
+        "id": _response_id("msg", text),
+        "type": "message",
+        "role": "assistant",
+        "model": model,
+        "content": [{"type": "text", "text": text}],
+        "stop_reason": "end_turn",
+        "stop_sequence": None,
+        "usage": _anthropic_usage(usage)
+    }
+
+
+def _anthropic_stream(model: str, pieces: List[str], usage: Tuple[int, int]) -> List[bytes]:
+    deltas = [
+        _sse({"type": "content_block_delta", "index": 0, "delta": {"type": "text_delta", "text": piece}},
+             "content_block_delta")
+        for piece in pieces
+    ]
+    # message_start and content_block_start go out together with the first piece
+    opening = (
+        _sse({"type": "message_start", "message": _anthropic_message(model, "", (usage[0], 0))}, "message_start")
+        + _sse({"type": "content_block_start", "index": 0, "content_block": {"type": "text", "text": ""}},
+               "content_block_start")
+    )
+    return [opening + deltas[0]] + deltas[1:] + [
+        _sse({"type": "content_block_stop", "index": 0}, "content_block_stop"),
+        _sse({"type": "message_delta", "delta": {"stop_reason": "end_turn", "stop_sequence": None},
+              "usage": {"output_tokens": usage[1]}}, "message_delta"),
+        _sse({"type": "message_stop"}, "message_stop")
+    ]
+
+
+class _FakeStream(httpx.SyncByteStream):
+
+    def __init__(self, chunks: List[bytes], delays: List[float]):
+        self._chunks = chunks
+        self._delays = delays
+
+    def __iter__(self):
+        for chunk, delay in zip(self._chunks, self._delays):
+            if delay > 0:
+                time.sleep(delay)
+            yield chunk
+
+
+class _AsyncFakeStream(httpx.AsyncByteStream):
+
+    def __init__(self, chunks: List[bytes], delays: List[float]):
+        self._chunks = chunks
+        self._delays = delays
+
+    async def __aiter__(self):
+        for chunk, delay in zip(self._chunks, self._delays):
+            if delay > 0:
+                await asyncio.sleep(delay)
+            yield chunk
+
+
+class FakeLLMTransport(httpx.BaseTransport, httpx.AsyncBaseTransport):
+    """
+    httpx transport serving every LLM API request from FakeLLMBackend, in
+    place of the network transport (LLM_BACKEND=fake). Everything above it -
+    SDK clients, crews, the rate limiter, tracing and metrics - runs as usual.
+    Non-streamed responses wait out the whole simulated latency before the
+    headers; streamed ones deliver each piece as it is "generated".
+    """
+
+    def __init__(self, backend: FakeLLMBackend = None):
+        self.backend = backend or FakeLLMBackend()
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        status, headers, chunks, delays = self.backend.respond(request, request.read())
+        if headers["content-type"] != "text/event-stream":
+            time.sleep(delays[0])
+            delays = [0.0]
+        return httpx.Response(status, headers=headers, stream=_FakeStream(chunks, delays), request=request)
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        status, headers, chunks, delays = self.backend.respond(request, await request.aread())
+        if headers["content-type"] != "text/event-stream":
+            await asyncio.sleep(delays[0])
+            delays = [0.0]
+        return httpx.Response(status, headers=headers, stream=_AsyncFakeStream(chunks, delays), request=request)
@@ -1,16 +1,29 @@
 from crewai import Agent, Task, Crew
 from crewai_tools import WebsiteSearchTool, SerperDevTool
-from langchain_openai import ChatOpenAI
+from agents.llm_gateway import llm_gateway
+from agents.llm_cache import cached_kickoff
+from agents.concurrency import run_concurrently
+from agents.context_budget import budget_sections
+from agents.agent_logging import AGENT_VERBOSE, get_logger, record_step, record_task_output
 import json
 import os
 
+log = get_logger("icp_intelligence")
+
 class ChunkedReasoningAgent:
-    def __init__(self):
-        self.reasoning_llm = ChatOpenAI(
+    def __init__(self, parallel=None, max_concurrency=None, chunk_timeout=None):
+        self.reasoning_llm = llm_gateway.chat_model(
             model="gpt-4o-mini",
             temperature=0.2
         )
         
+        # Chunk execution mode - chunks are independent, so run them concurrently by default
+        if parallel is None:
+            parallel = os.getenv("ICP_CHUNK_PARALLEL", "true").lower() == "true"
+        self.parallel = parallel
+        self.max_concurrency = max_concurrency or int(os.getenv("ICP_CHUNK_CONCURRENCY", "3"))
+        self.chunk_timeout = chunk_timeout or float(os.getenv("ICP_CHUNK_TIMEOUT_SECONDS", "600"))
+        
         # Tools
         self.web_search = SerperDevTool()
         self.website_tool = WebsiteSearchTool()
@@ -81,19 +94,20 @@ You must stay focused ONLY on your specialty area to ensure depth within token l
             
             tools=[self.web_search, self.website_tool],
             llm=self.reasoning_llm,
-            verbose=True,
+            verbose=AGENT_VERBOSE,
             allow_delegation=False
         )
     
     def create_chunk_task(self, business_context, industry_context, chunk_focus):
         """Create focused task for specific analysis chunk"""
         
+        # Static instructions first, business context last, so every request
+        # for the same chunk shares a cacheable prompt prefix
+        context_text = budget_sections("icp_business_context", context=business_context)["context"]
         chunk_prompts = {
             "Awareness_Analysis": f"""
             AWARENESS LEVEL & BELIEF SYSTEM ANALYSIS ONLY
             
-            BUSINESS CONTEXT: {json.dumps(business_context, indent=2)}
-            
             FOCUS: Analyze ONLY awareness levels and belief systems
             
             SCHWARTZ AWARENESS ANALYSIS:
@@ -133,13 +147,13 @@ You must stay focused ONLY on your specialty area to ensure depth within token l
             - Complete 5-step reasoning chain
             - Customer voice quote
             - Copy strategy implication
+            
+            BUSINESS CONTEXT: {context_text}
             """,
             
             "Psychology_Analysis": f"""
             CUSTOMER PSYCHOLOGY & DECISION ANALYSIS ONLY
             
-            BUSINESS CONTEXT: {json.dumps(business_context, indent=2)}
-            
             FOCUS: Deep psychological drivers and decision psychology
             
             CORE IDENTITY ANALYSIS:
@@ -169,13 +183,13 @@ You must stay focused ONLY on your specialty area to ensure depth within token l
             - Stated desires (3-4 with reasoning chains)
             - Underlying desires (3-4 with reasoning chains)
             - Latent needs (2-3 with reasoning chains)
+            
+            BUSINESS CONTEXT: {context_text}
             """,
             
             "Market_Strategy": f"""
             MARKET SOPHISTICATION & COPY STRATEGY ONLY
             
-            BUSINESS CONTEXT: {json.dumps(business_context, indent=2)}
-            
             FOCUS: Market sophistication assessment and copy strategy
             
             MARKET SOPHISTICATION ASSESSMENT:
@@ -210,6 +224,8 @@ You must stay focused ONLY on your specialty area to ensure depth within token l
             - MOFU messaging strategy (with reasoning)
             - BOFU messaging strategy (with reasoning)
             - Objection handling strategy (with reasoning)
+            
+            BUSINESS CONTEXT: {context_text}
             """
         }
         
@@ -238,11 +254,11 @@ You must stay focused ONLY on your specialty area to ensure depth within token l
     def execute_chunked_analysis(self, business_context):
         """Execute analysis in chunks to stay within token limits"""
         
-        print("🧠 Executing Chunked Reasoning Analysis...")
+        log.info("chunked_analysis_started")
         
         # Detect industry context
         industry_context = self.detect_industry_context(business_context)
-        print(f"📊 Industry Context: {industry_context}")
+        log.info("industry_context_detected", industry_context=industry_context)
         
         # Define analysis chunks
         chunks = [
@@ -251,32 +267,67 @@ You must stay focused ONLY on your specialty area to ensure depth within token l
             "Market_Strategy"        # Market sophistication + copy strategy
         ]
         
-        results = {}
-        
-        # Execute each chunk separately
-        for chunk in chunks:
-            print(f"🔍 Processing {chunk.replace('_', ' ')}...")
-            
-            # Create focused task
-            task = self.create_chunk_task(business_context, industry_context, chunk)
-            
-            # Execute chunk analysis
-            crew = Crew(
-                agents=[self.create_chunked_analysis_agent(industry_context, chunk)],
-                tasks=[task],
-                verbose=True
-            )
-            
-            chunk_result = crew.kickoff()
-            results[chunk] = chunk_result
+        if self.parallel:
+            results = self.execute_chunks_concurrently(business_context, industry_context, chunks)
+        else:
+            results = {}
             
-            print(f"✅ {chunk.replace('_', ' ')} completed")
+            # Execute each chunk separately
+            for chunk in chunks:
+                log.info("chunk_started", chunk=chunk)
+                results[chunk] = self.run_chunk(business_context, industry_context, chunk)
+                log.info("chunk_completed", chunk=chunk)
         
         # Synthesize results
         synthesized_results = self.synthesize_chunked_results(results, industry_context)
         
         return synthesized_results
     
+    def run_chunk(self, business_context, industry_context, chunk):
+        """Run a single analysis chunk in its own crew"""
+        
+        # Create focused task
+        task = self.create_chunk_task(business_context, industry_context, chunk)
+        
+        # Execute chunk analysis
+        crew = Crew(
+            agents=[self.create_chunked_analysis_agent(industry_context, chunk)],
+            tasks=[task],
+            verbose=AGENT_VERBOSE,
+            step_callback=record_step,
+            task_callback=record_task_output
+        )
+        
+        return cached_kickoff(crew)
+    
+    def execute_chunks_concurrently(self, business_context, industry_context, chunks):
+        """Run independent chunks simultaneously, bounded by max_concurrency with per-chunk timeouts"""
+        
+        log.info("chunks_started", chunks=len(chunks), max_concurrency=self.max_concurrency,
+                 timeout_seconds=self.chunk_timeout)
+        
+        outcomes = run_concurrently(
+            {
+                chunk: (lambda chunk=chunk: self.run_chunk(business_context, industry_context, chunk))
+                for chunk in chunks
+            },
+            max_concurrency=self.max_concurrency,
+            timeout=self.chunk_timeout
+        )
+        
+        results = {}
+        for chunk in chunks:
+            outcome = outcomes[chunk]
+            if outcome["status"] == "completed":
+                results[chunk] = outcome["result"]
+                log.info("chunk_completed", chunk=chunk, duration_seconds=round(outcome["duration"], 1))
+            else:
+                # Keep the other chunks - a failed chunk is reported in place
+                results[chunk] = {"error": f"{chunk} {outcome['status']}", "details": outcome["error"]}
+                log.error("chunk_failed", chunk=chunk, status=outcome["status"], error=str(outcome["error"]))
+        
+        return results
+    
     def synthesize_chunked_results(self, chunk_results, industry_context):
         """Synthesize chunked results into coherent analysis"""
         
@@ -305,33 +356,12 @@ You must stay focused ONLY on your specialty area to ensure depth within token l
             }
         }
 
-def reasoning_agent_call(business_context):
-    """
-    LangChain-powered research agent with session isolation
-    """
-    import os
-    from langchain_openai import ChatOpenAI
-    from langchain.prompts import PromptTemplate
-    from langchain.chains import LLMChain
-    
-    # Create fresh LLM for each call (prevents contamination)
-    llm = ChatOpenAI(
-        model="gpt-4o-mini",
-        temperature=0.3,
-        openai_api_key=os.getenv("OPENAI_API_KEY")
-    )
-    
-    # Enhanced prompt with session isolation
-    prompt_template = PromptTemplate(
-        input_variables=["business_context"],
-        template="""
+# Static research instructions - sent as the cacheable prefix ahead of the context
+REASONING_INSTRUCTIONS = """
 SESSION ISOLATION: This is a completely fresh research analysis. You have NO memory of previous research sessions.
 
 CRITICAL: Ignore any previous research about financial advisors, Axiom Planning, or other businesses.
 
-BUSINESS CONTEXT TO ANALYZE:
-{business_context}
-
 Conduct comprehensive ICP research with Eugene Schwartz-level psychological depth:
 
 1. CUSTOMER PSYCHOLOGY ANALYSIS
@@ -354,10 +384,11 @@ Conduct comprehensive ICP research with Eugene Schwartz-level psychological dept
    - Messaging angles
    - Conversion psychology
 
-Focus EXCLUSIVELY on the business context provided above. Provide journal-level psychological insights that would make clients say "how did you know that?"
+Focus EXCLUSIVELY on the business context provided below. Provide journal-level psychological insights that would make clients say "how did you know that?"
 """
-    )
-    
+
+def build_reasoning_prompt(business_context):
+    """Render the per-request part of the ICP research prompt"""
     # Handle different input formats (keeping your existing logic)
     if isinstance(business_context, str):
         context_input = business_context
@@ -365,8 +396,30 @@ Focus EXCLUSIVELY on the business context provided above. Provide journal-level
         # If it's a dict, extract the comprehensive context
         context_input = business_context.get('comprehensive_context', str(business_context))
     
-    # Create and execute chain
-    chain = LLMChain(llm=llm, prompt=prompt_template)
-    result = chain.run(business_context=context_input)
-    
-    return result
+    context_input = budget_sections("icp_business_context", context=context_input)["context"]
+    return f"BUSINESS CONTEXT TO ANALYZE:\n{context_input}"
+
+def reasoning_agent_call(business_context):
+    """
+    ICP research agent with session isolation (blocking, for crew/thread callers)
+    """
+    # Every call is a fresh single-turn request, so sessions never share history
+    response = llm_gateway.complete(
+        build_reasoning_prompt(business_context),
+        model="gpt-4o-mini",
+        temperature=0.3,
+        cached_prefix=REASONING_INSTRUCTIONS
+    )
+    return response.text
+
+async def reasoning_agent_call_async(business_context):
+    """
+    ICP research agent with session isolation (awaitable, for the API event loop)
+    """
+    response = await llm_gateway.acomplete(
+        build_reasoning_prompt(business_context),
+        model="gpt-4o-mini",
+        temperature=0.3,
+        cached_prefix=REASONING_INSTRUCTIONS
+    )
+    return response.text
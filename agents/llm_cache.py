@@ -0,0 +1,275 @@
+# llm_cache.py
+# Content-addressed on-disk cache for LLM responses and crew outputs (LRU, size-capped)
+
+import asyncio
+import contextvars
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+
+from agents.run_control import check_cancelled, current_run
+from agents.tracing import tracer
+
+# Per-request opt-out; copied into worker threads with the rest of the context
+_cache_enabled = contextvars.ContextVar("llm_cache_enabled", default=True)
+
+
+@contextmanager
+def cache_scope(enabled: bool = True):
+    """Enable or bypass the cache for everything run inside this block"""
+    token = _cache_enabled.set(enabled)
+    try:
+        yield
+    finally:
+        _cache_enabled.reset(token)
+
+
+class LLMResponseCache:
+    """
+    Responses are stored as JSON files named by the SHA-256 of everything that
+    determines the output (model, temperature, system prompt, message...).
+    Entries are fanned out into two-character subdirectories. Total size is
+    capped; when it is exceeded the least recently used entries are evicted.
+    File mtimes double as the access clock, so LRU order survives restarts.
+    """
+
+    def __init__(self, directory: str = None, max_bytes: int = None, enabled: bool = None):
+        self.directory = directory or os.getenv("LLM_CACHE_DIR", ".llm_cache")
+        self.max_bytes = max_bytes or int(float(os.getenv("LLM_CACHE_MAX_MB", "512")) * 1024 * 1024)
+        if enabled is None:
+            enabled = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+        self.enabled = enabled
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._index: Optional[OrderedDict] = None
+        self._total_bytes = 0
+
+    # ---- keys / paths ----
+
+    @staticmethod
+    def make_key(**parts) -> str:
+        payload = json.dumps(parts, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.json")
+
+    def active(self) -> bool:
+        return self.enabled and _cache_enabled.get()
+
+    def _load_index(self):
+        """
+        Scan the cache directory once to rebuild LRU order and total size.
+        Runs on first use (off the event loop on the async path) and outside the
+        lock, so other threads' lookups aren't held up by the walk.
+        """
+        if self._index is not None:
+            return
+        entries = []
+        if os.path.isdir(self.directory):
+            for root, _, files in os.walk(self.directory):
+                for filename in files:
+                    if filename.endswith(".json"):
+                        try:
+                            stat = os.stat(os.path.join(root, filename))
+                        except OSError:
+                            continue
+                        entries.append((stat.st_mtime, filename[:-5], stat.st_size))
+        entries.sort()
+        with self._lock:
+            if self._index is None:
+                self._index = OrderedDict((key, size) for _, key, size in entries)
+                self._total_bytes = sum(self._index.values())
+
+    # ---- get / set ----
+    # The lock only guards the in-memory index; file reads, writes and deletes happen outside it.
+    # Event-loop callers use aget / aset, which run the file IO on a worker thread.
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        if not self.active():
+            return None
+        self._load_index()
+        with self._lock:
+            if key not in self._index:
+                self.misses += 1
+                return None
+        path = self._path(key)
+        try:
+            with open(path, "r") as f:
+                entry = json.load(f)
+            os.utime(path, None)
+        except (OSError, ValueError):
+            with self._lock:
+                self._total_bytes -= self._index.pop(key, 0)
+                self.misses += 1
+            return None
+        with self._lock:
+            if key in self._index:
+                self._index.move_to_end(key)
+            self.hits += 1
+        return entry
+
+    def set(self, key: str, value: Dict[str, Any]):
+        if not self.active():
+            return
+        self._load_index()
+        path = self._path(key)
+        data = json.dumps(value, default=str)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+        size = len(data.encode("utf-8"))
+        with self._lock:
+            self._total_bytes += size - self._index.pop(key, 0)
+            self._index[key] = size
+            evicted = self._evict()
+        for evicted_key in evicted:
+            try:
+                os.remove(self._path(evicted_key))
+            except OSError:
+                pass
+
+    async def aget(self, key: str) -> Optional[Dict[str, Any]]:
+        if not self.active():
+            return None
+        return await asyncio.to_thread(self.get, key)
+
+    async def aset(self, key: str, value: Dict[str, Any]):
+        if self.active():
+            await asyncio.to_thread(self.set, key, value)
+
+    def _evict(self) -> List[str]:
+        """Drop least recently used keys from the index (caller holds the lock); returns them for file removal"""
+        evicted = []
+        while self._total_bytes > self.max_bytes and len(self._index) > 1:
+            key, size = self._index.popitem(last=False)
+            self._total_bytes -= size
+            self.evictions += 1
+            evicted.append(key)
+        return evicted
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "evictions": self.evictions,
+            "entries": len(self._index) if self._index is not None else None,
+            "size_bytes": self._total_bytes,
+            "max_bytes": self.max_bytes
+        }
+
+
+# Shared cache used by the gateway and crew kickoffs
+llm_cache = LLMResponseCache()
+
+
+# Crews with an agent sampling hotter than this are meant to vary from run to run; they are never cached
+CREW_CACHE_MAX_TEMPERATURE = float(os.getenv("LLM_CACHE_MAX_TEMPERATURE", "0.5"))
+
+
+def _describe_llm(llm) -> Dict[str, Any]:
+    return {
+        "model": getattr(llm, "model_name", None) or getattr(llm, "model", None) or str(llm),
+        "temperature": getattr(llm, "temperature", None)
+    }
+
+
+def _tool_names(tools) -> List[str]:
+    return sorted(getattr(tool, "name", None) or type(tool).__name__ for tool in tools or [])
+
+
+def _describe_context(task) -> List[Dict[str, Any]]:
+    """Upstream tasks a task reads; their outputs (if already produced, e.g. by an earlier crew) are part of its prompt"""
+    context = task.context if isinstance(getattr(task, "context", None), list) else []
+    return [
+        {
+            "description": upstream.description,
+            "output": getattr(upstream.output, "raw", None) if getattr(upstream, "output", None) is not None else None
+        }
+        for upstream in context
+    ]
+
+
+def _cacheable_crew(crew) -> bool:
+    temperatures = [getattr(agent.llm, "temperature", None) for agent in crew.agents]
+    return all(temperature is None or temperature <= CREW_CACHE_MAX_TEMPERATURE for temperature in temperatures)
+
+
+def _successful_output(output, text: str) -> bool:
+    """A kickoff worth replaying: non-empty output from every task, and the run wasn't stopped meanwhile"""
+    control = current_run()
+    if control is not None and control.cancelled:
+        return False
+    tasks_output = getattr(output, "tasks_output", None) or []
+    return bool(text.strip()) and all(str(getattr(task, "raw", "") or "").strip() for task in tasks_output)
+
+
+def cached_kickoff(crew) -> str:
+    """
+    Kick off a crew through the cache.
+
+    The key covers every task prompt (with the upstream task context it reads),
+    the agent definitions, their tools and LLM settings. Only successful
+    outputs of crews sampling at or below LLM_CACHE_MAX_TEMPERATURE are
+    stored; creative crews run fresh every time. Returns the crew's text
+    output (str) whether it was cached or not, which also keeps results
+    JSON-serializable downstream.
+    """
+    if not _cacheable_crew(crew):
+        return _kickoff(crew, None)
+    key = llm_cache.make_key(
+        kind="crew",
+        tasks=[
+            {
+                "description": task.description,
+                "expected_output": task.expected_output,
+                "agent": getattr(task.agent, "role", None),
+                "context": _describe_context(task),
+                "tools": _tool_names(getattr(task, "tools", None))
+            }
+            for task in crew.tasks
+        ],
+        agents=[
+            {
+                "role": agent.role,
+                "goal": agent.goal,
+                "backstory": agent.backstory,
+                "llm": _describe_llm(agent.llm),
+                "tools": _tool_names(getattr(agent, "tools", None))
+            }
+            for agent in crew.agents
+        ]
+    )
+    return _kickoff(crew, key)
+
+
+def _kickoff(crew, key: Optional[str]) -> str:
+    roles = [agent.role for agent in crew.agents]
+    with tracer.span(f"crew {', '.join(roles)}", "crew", agents=len(roles), tasks=len(crew.tasks)) as span:
+        cached = llm_cache.get(key) if key is not None else None
+        if span is not None:
+            span.set(cached=cached is not None, cacheable=key is not None)
+        if cached is not None:
+            return cached["text"]
+
+        check_cancelled()
+        started = time.monotonic()
+        output = crew.kickoff()
+        text = str(output)
+        if key is not None and _successful_output(output, text):
+            llm_cache.set(key, {"text": text, "elapsed_seconds": round(time.monotonic() - started, 3)})
+        return text
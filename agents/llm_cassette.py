@@ -0,0 +1,478 @@
+# llm_cassette.py
+# Record real LLM API exchanges to a cassette and replay them offline at original or accelerated timing
+
+import asyncio
+import codecs
+import hashlib
+import ipaddress
+import json
+import os
+import socket
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+
+from agents.agent_logging import get_logger
+from agents.tracing import current_span, tracer
+
+log = get_logger("llm_cassette")
+
+DEFAULT_CASSETTE_PATH = "data/cassettes/llm.jsonl"
+
+# Response headers worth replaying: the body format and what the rate limiter adapts to
+KEPT_HEADERS = ("content-type", "retry-after", "request-id", "x-request-id")
+KEPT_HEADER_PREFIXES = ("x-ratelimit-", "anthropic-ratelimit-")
+
+
+def request_key(request: httpx.Request) -> str:
+    """
+    Identifies a request by method, path and JSON body (keys sorted), so the
+    same prompt to the same model with the same options matches across runs.
+    """
+    body = request.content
+    try:
+        body = json.dumps(json.loads(body), sort_keys=True, separators=(",", ":")).encode("utf-8")
+    except ValueError:
+        pass
+    digest = hashlib.sha256()
+    digest.update(f"{request.method} {request.url.path}\n".encode("utf-8"))
+    digest.update(body)
+    return digest.hexdigest()
+
+
+def _kept_headers(headers: httpx.Headers) -> Dict[str, str]:
+    return {
+        name: value for name, value in headers.items()
+        if name in KEPT_HEADERS or name.startswith(KEPT_HEADER_PREFIXES)
+    }
+
+
+def _usage_from_sse(text: str) -> Dict[str, Optional[int]]:
+    """Prompt/completion tokens reported in an OpenAI or Anthropic event stream"""
+    prompt = completion = None
+    for line in text.splitlines():
+        if not line.startswith("data: "):
+            continue
+        try:
+            event = json.loads(line[6:])
+        except ValueError:
+            continue
+        if not isinstance(event, dict):
+            continue
+        usage = event.get("usage") or (event.get("message") or {}).get("usage") or {}
+        prompt = usage.get("prompt_tokens", usage.get("input_tokens", prompt))
+        completion = usage.get("completion_tokens", usage.get("output_tokens", completion))
+    return {"prompt_tokens": prompt, "completion_tokens": completion}
+
+
+def _usage(content_type: str, text: str) -> Dict[str, Optional[int]]:
+    if "event-stream" in content_type:
+        return _usage_from_sse(text)
+    try:
+        usage = json.loads(text).get("usage") or {}
+    except (ValueError, AttributeError):
+        return {"prompt_tokens": None, "completion_tokens": None}
+    return {
+        "prompt_tokens": usage.get("prompt_tokens", usage.get("input_tokens")),
+        "completion_tokens": usage.get("completion_tokens", usage.get("output_tokens"))
+    }
+
+
+def _span_context() -> Dict[str, Optional[str]]:
+    """Session and innermost pipeline stage the current LLM request belongs to"""
+    span = current_span()
+    session_id = span.trace.trace_id if span is not None else None
+    while span is not None and span.kind != "stage":
+        span = tracer.open_span(span.parent_id)
+    return {"session_id": session_id, "stage": span.name[len("stage "):] if span is not None else None}
+
+
+class CassetteWriter:
+    """Appends one JSON line per recorded exchange to the cassette file"""
+
+    def __init__(self, path: str = None):
+        self.path = path or os.getenv("LLM_CASSETTE_PATH", DEFAULT_CASSETTE_PATH)
+        self._lock = threading.Lock()
+        self.recorded = 0
+
+    def write(self, entry: Dict[str, Any]):
+        line = json.dumps(entry, ensure_ascii=False) + "\n"
+        with self._lock:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line)
+            self.recorded += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {"path": self.path, "recorded": self.recorded}
+
+
+class _Recording:
+    """
+    One exchange being recorded. The body is kept as text chunks together
+    with when each arrived (seconds after the response headers), so a replay
+    reproduces both the content and the streaming cadence.
+    """
+
+    def __init__(self, writer: CassetteWriter, request: httpx.Request, started: float):
+        self.writer = writer
+        self.request = request
+        self.started = started
+        self.context = _span_context()
+        self.response: Optional[httpx.Response] = None
+        self.headers_at = 0.0
+        self.chunks: List[str] = []
+        self.offsets: List[float] = []
+        # Chunks can split a multi-byte character; the decoder carries it over to the next one
+        self._decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        self.closed = False
+
+    def received(self, response: httpx.Response):
+        self.response = response
+        self.headers_at = time.perf_counter()
+
+    def feed(self, chunk: bytes):
+        self.chunks.append(self._decoder.decode(chunk))
+        self.offsets.append(round(time.perf_counter() - self.headers_at, 6))
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        tail = self._decoder.decode(b"", final=True)
+        if tail:
+            self.chunks.append(tail)
+            self.offsets.append(round(time.perf_counter() - self.headers_at, 6))
+        try:
+            payload = json.loads(self.request.content)
+        except ValueError:
+            payload = self.request.content.decode("utf-8", errors="replace")
+        content_type = self.response.headers.get("content-type", "")
+        self.writer.write({
+            "key": request_key(self.request),
+            "recorded_at": datetime.now().isoformat(),
+            **self.context,
+            "method": self.request.method,
+            "url": str(self.request.url),
+            "model": payload.get("model") if isinstance(payload, dict) else None,
+            "request": payload,
+            "status": self.response.status_code,
+            "headers": _kept_headers(self.response.headers),
+            "headers_seconds": round(self.headers_at - self.started, 6),
+            "duration_seconds": round(time.perf_counter() - self.started, 6),
+            **_usage(content_type, "".join(self.chunks)),
+            "chunks": self.chunks,
+            "offsets": self.offsets
+        })
+
+
+class _RecordingStream(httpx.SyncByteStream):
+
+    def __init__(self, stream, recording: _Recording):
+        self._stream = stream
+        self._recording = recording
+
+    def __iter__(self):
+        for chunk in self._stream:
+            self._recording.feed(chunk)
+            yield chunk
+
+    def close(self):
+        try:
+            self._stream.close()
+        finally:
+            self._recording.close()
+
+
+class _AsyncRecordingStream(httpx.AsyncByteStream):
+
+    def __init__(self, stream, recording: _Recording):
+        self._stream = stream
+        self._recording = recording
+
+    async def __aiter__(self):
+        async for chunk in self._stream:
+            self._recording.feed(chunk)
+            yield chunk
+
+    async def aclose(self):
+        try:
+            await self._stream.aclose()
+        finally:
+            self._recording.close()
+
+
+def _identity(request: httpx.Request):
+    # Record uncompressed bodies so the cassette stays readable text
+    request.headers["accept-encoding"] = "identity"
+
+
+class RecordingTransport(httpx.BaseTransport, httpx.AsyncBaseTransport):
+    """
+    Wraps the network transport (LLM_BACKEND=record): every LLM API request
+    goes out as usual and the exchange - request body, status, headers,
+    body chunks with their arrival times and token usage - is appended to
+    the cassette once the response body is closed.
+    """
+
+    def __init__(self, transport, writer: CassetteWriter = None):
+        self._transport = transport
+        self.writer = writer or CassetteWriter()
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        request.read()
+        _identity(request)
+        recording = _Recording(self.writer, request, time.perf_counter())
+        response = self._transport.handle_request(request)
+        recording.received(response)
+        return httpx.Response(
+            status_code=response.status_code,
+            headers=response.headers,
+            stream=_RecordingStream(response.stream, recording),
+            extensions=response.extensions
+        )
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        await request.aread()
+        _identity(request)
+        recording = _Recording(self.writer, request, time.perf_counter())
+        response = await self._transport.handle_async_request(request)
+        recording.received(response)
+        return httpx.Response(
+            status_code=response.status_code,
+            headers=response.headers,
+            stream=_AsyncRecordingStream(response.stream, recording),
+            extensions=response.extensions
+        )
+
+    def close(self):
+        self._transport.close()
+
+    async def aclose(self):
+        await self._transport.aclose()
+
+
+class Cassette:
+    """
+    Recorded exchanges indexed by request key. A prompt sent several times
+    gets its recorded responses in order; once those run out the last one
+    repeats. `path` may be a cassette file or a directory of them.
+    """
+
+    def __init__(self, path: str = None):
+        self.path = path or os.getenv("LLM_CASSETTE_PATH", DEFAULT_CASSETTE_PATH)
+        self._entries: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        self._served: Dict[str, int] = defaultdict(int)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.missed: List[Dict[str, Any]] = []
+        self._load()
+
+    def _files(self) -> List[str]:
+        if os.path.isdir(self.path):
+            return sorted(
+                os.path.join(self.path, name) for name in os.listdir(self.path) if name.endswith(".jsonl")
+            )
+        return [self.path] if os.path.exists(self.path) else []
+
+    def _load(self):
+        files = self._files()
+        if not files:
+            log.warning("cassette_missing", path=self.path, effect="every request will miss")
+        for file_path in files:
+            with open(file_path, encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self._entries[entry["key"]].append(entry)
+        log.info("cassette_loaded", path=self.path, exchanges=sum(len(entries) for entries in self._entries.values()))
+
+    def next(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entries = self._entries.get(key)
+            if not entries:
+                self.misses += 1
+                return None
+            index = self._served[key]
+            self._served[key] += 1
+            self.hits += 1
+            return entries[min(index, len(entries) - 1)]
+
+    def miss(self, request: httpx.Request):
+        context = _span_context()
+        with self._lock:
+            self.missed.append({"method": request.method, "url": str(request.url), **context})
+        log.warning("cassette_miss", method=request.method, path=request.url.path, stage=context["stage"] or "unknown")
+
+    def unused(self) -> int:
+        """Recorded exchanges no request has replayed (yet)"""
+        with self._lock:
+            return sum(max(0, len(entries) - self._served.get(key, 0)) for key, entries in self._entries.items())
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "path": self.path,
+            "exchanges": sum(len(entries) for entries in self._entries.values()),
+            "hits": self.hits,
+            "misses": self.misses,
+            "unused": self.unused(),
+            "recorded_llm_seconds": round(sum(
+                entry.get("duration_seconds", 0.0) for entries in self._entries.values() for entry in entries
+            ), 3)
+        }
+
+
+def _delays(entry: Dict[str, Any], speed: float) -> Tuple[float, List[float]]:
+    """(wait before the headers, wait before each chunk) at `speed` times the recorded pace"""
+    if speed <= 0:
+        return 0.0, [0.0] * len(entry["chunks"])
+    offsets = entry.get("offsets") or [0.0] * len(entry["chunks"])
+    gaps = [max(0.0, offset - previous) / speed for previous, offset in zip([0.0] + offsets, offsets)]
+    return entry.get("headers_seconds", 0.0) / speed, gaps
+
+
+class _ReplayStream(httpx.SyncByteStream):
+
+    def __init__(self, chunks: List[bytes], delays: List[float]):
+        self._chunks = chunks
+        self._delays = delays
+
+    def __iter__(self):
+        for chunk, delay in zip(self._chunks, self._delays):
+            if delay > 0:
+                time.sleep(delay)
+            yield chunk
+
+
+class _AsyncReplayStream(httpx.AsyncByteStream):
+
+    def __init__(self, chunks: List[bytes], delays: List[float]):
+        self._chunks = chunks
+        self._delays = delays
+
+    async def __aiter__(self):
+        for chunk, delay in zip(self._chunks, self._delays):
+            if delay > 0:
+                await asyncio.sleep(delay)
+            yield chunk
+
+
+class ReplayTransport(httpx.BaseTransport, httpx.AsyncBaseTransport):
+    """
+    Serves every LLM API request from a cassette instead of the network
+    (LLM_BACKEND=replay), with the recorded status, headers and body chunks
+    at the recorded timing divided by LLM_REPLAY_SPEED (1 = original pace,
+    10 = ten times faster, 0 = no waiting). A request that was never
+    recorded - a changed prompt, model or option - gets a 404, so the SDK
+    raises instead of the run quietly diverging.
+    """
+
+    def __init__(self, cassette: Cassette = None, speed: float = None):
+        self.cassette = cassette or Cassette()
+        self.speed = speed if speed is not None else float(os.getenv("LLM_REPLAY_SPEED", "1"))
+
+    def _replay(self, request: httpx.Request):
+        """(status, headers, chunks, wait before headers, wait before each chunk)"""
+        entry = self.cassette.next(request_key(request))
+        if entry is None:
+            self.cassette.miss(request)
+            body = json.dumps({"error": {
+                "type": "cassette_miss",
+                "message": f"No recorded exchange for this {request.url.path} request in {self.cassette.path}"
+            }}).encode("utf-8")
+            return 404, {"content-type": "application/json"}, [body], 0.0, [0.0]
+        first, gaps = _delays(entry, self.speed)
+        chunks = [chunk.encode("utf-8") for chunk in entry["chunks"]]
+        return entry["status"], entry["headers"], chunks, first, gaps
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        request.read()
+        status, headers, chunks, first, gaps = self._replay(request)
+        if first > 0:
+            time.sleep(first)
+        return httpx.Response(status, headers=headers, stream=_ReplayStream(chunks, gaps), request=request)
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        await request.aread()
+        status, headers, chunks, first, gaps = self._replay(request)
+        if first > 0:
+            await asyncio.sleep(first)
+        return httpx.Response(status, headers=headers, stream=_AsyncReplayStream(chunks, gaps), request=request)
+
+
+def _is_local(address) -> bool:
+    if not isinstance(address, tuple):
+        # Unix domain sockets
+        return True
+    host = str(address[0]).split("%")[0]
+    try:
+        ip = ipaddress.ip_address(host)
+    except ValueError:
+        return host in ("", "localhost")
+    # Unspecified addresses are what servers resolve to bind, not a destination
+    return ip.is_loopback or ip.is_unspecified
+
+
+class NetworkGuard:
+    """
+    Fails outbound connections while replaying (LLM_BACKEND=replay). The
+    cassette stands in for the LLM APIs, so anything that still reaches the
+    network - a client the gateway didn't build, a crew tool, telemetry -
+    means the replay isn't offline. Loopback and unix sockets stay allowed.
+    """
+
+    def __init__(self):
+        self.blocked: List[Dict[str, Any]] = []
+        self._installed = False
+        self._lock = threading.Lock()
+
+    def install(self):
+        with self._lock:
+            if self._installed:
+                return
+            self._installed = True
+            guard = self
+            connect, connect_ex = socket.socket.connect, socket.socket.connect_ex
+            getaddrinfo = socket.getaddrinfo
+
+            def guarded_connect(sock, address):
+                guard.check(address)
+                return connect(sock, address)
+
+            def guarded_connect_ex(sock, address):
+                guard.check(address)
+                return connect_ex(sock, address)
+
+            def guarded_getaddrinfo(host, port, *args, **kwargs):
+                # Name lookups are network traffic too (and fail before any connect offline)
+                if host is not None:
+                    guard.check((host.decode() if isinstance(host, bytes) else host, port))
+                return getaddrinfo(host, port, *args, **kwargs)
+
+            socket.socket.connect = guarded_connect
+            socket.socket.connect_ex = guarded_connect_ex
+            socket.getaddrinfo = guarded_getaddrinfo
+
+    def check(self, address):
+        if _is_local(address):
+            return
+        context = _span_context()
+        with self._lock:
+            self.blocked.append({"address": f"{address[0]}:{address[1]}", **context})
+        log.warning("replay_network_blocked", address=f"{address[0]}:{address[1]}", stage=context["stage"] or "unknown")
+        raise ConnectionRefusedError(f"Network access is blocked while replaying a cassette ({address[0]}:{address[1]})")
+
+    def blocked_count(self) -> int:
+        with self._lock:
+            return len(self.blocked)
+
+
+# Installed by the gateway (and the replay script) once a run is served from a cassette
+network_guard = NetworkGuard()
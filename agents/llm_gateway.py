@@ -0,0 +1,449 @@
+# llm_gateway.py
+# Shared LLM gateway - pooled async Anthropic/OpenAI clients used by every agent
+
+import asyncio
+import os
+import threading
+from typing import Any, Callable, Dict, Optional
+
+import httpx
+
+from agents.context_budget import count_tokens
+from agents.llm_cache import llm_cache
+from agents.metrics import record_tokens
+from agents.rate_limiter import (AsyncRateLimitedTransport, RateLimitedTransport, is_low_priority, rate_limiter,
+                                 with_priority)
+from agents.run_control import check_cancelled, current_run
+from agents.tracing import AsyncTracedTransport, TracedTransport, current_span, tracer
+
+DEFAULT_OPENAI_MODEL = "gpt-4o-mini"
+DEFAULT_CLAUDE_MODEL = "claude-3-5-sonnet-20241022"
+
+# Anthropic doesn't cache a prefix shorter than this many tokens (Haiku models: 2048);
+# a cache_control marker on a shorter one is silently ignored
+ANTHROPIC_MIN_CACHEABLE_TOKENS = 1024
+ANTHROPIC_HAIKU_MIN_CACHEABLE_TOKENS = 2048
+
+# Receives each text delta of a streamed completion (called on the gateway loop thread)
+DeltaCallback = Callable[[str], None]
+
+
+class LLMResponse:
+    """Text plus provider metadata returned by every gateway call"""
+
+    def __init__(self, text: str, provider: str, model: str, usage: Optional[Dict[str, int]] = None,
+                 cached: bool = False):
+        self.text = text
+        self.provider = provider
+        self.model = model
+        self.usage = usage or {}
+        self.cached = cached
+
+    def __str__(self):
+        return self.text
+
+
+class LLMGateway:
+    """
+    Process-wide gateway that owns the provider clients.
+
+    AsyncAnthropic / AsyncOpenAI clients sit on a shared, kept-alive httpx
+    connection pool and run on a dedicated event loop thread. Coroutine callers
+    (FastAPI handlers) await `acomplete`; synchronous callers (agent code running
+    inside crew worker threads) use `complete`. Both reuse the same connections,
+    so no call pays for client construction or a fresh TLS handshake.
+    """
+
+    def __init__(self, max_connections: int = None, keepalive_expiry: float = None, timeout: float = None):
+        self.max_connections = max_connections or int(os.getenv("LLM_MAX_CONNECTIONS", "20"))
+        self.keepalive_expiry = keepalive_expiry or float(os.getenv("LLM_KEEPALIVE_SECONDS", "120"))
+        self.timeout = timeout or float(os.getenv("LLM_TIMEOUT_SECONDS", "600"))
+        # SDK retries on 429 wait out the limiter's retry-after pause instead of failing to a fallback
+        self.max_retries = int(os.getenv("LLM_MAX_RETRIES", "4"))
+        # "live" talks to the providers; "fake" serves canned outputs locally (benchmarks, offline runs);
+        # "record" talks to the providers and saves every exchange to a cassette, "replay" serves them back
+        self.backend = os.getenv("LLM_BACKEND", "live").lower()
+        self._cassette = None
+
+        # Reentrant: building a crew LLM asks for its SDK client under the same lock
+        self._lock = threading.RLock()
+        self._loop = None
+        self._thread = None
+        self._clients: Dict[str, Any] = {}
+        self._chat_models: Dict[tuple, Any] = {}
+        self._sync_http_client = None
+        self._crew_clients: Dict[bool, Any] = {}
+
+    # ---- connection pool / loop management ----
+
+    def _limits(self):
+        return httpx.Limits(
+            max_connections=self.max_connections,
+            max_keepalive_connections=self.max_connections,
+            keepalive_expiry=self.keepalive_expiry
+        )
+
+    def _http_transport(self, asynchronous: bool):
+        """Innermost transport: the network (possibly recorded), or a fake backend or cassette standing in for it"""
+        if self.backend == "fake":
+            from agents.fake_llm import FakeLLMTransport
+            return FakeLLMTransport()
+        if self.backend in ("record", "replay"):
+            from agents.llm_cassette import Cassette, CassetteWriter, RecordingTransport, ReplayTransport, network_guard
+            # Sync and async transports share one cassette
+            if self.backend == "replay":
+                # Everything must come from the cassette; a connection that reaches the network fails
+                network_guard.install()
+                self._cassette = self._cassette or Cassette()
+                return ReplayTransport(self._cassette)
+            self._cassette = self._cassette or CassetteWriter()
+        if asynchronous:
+            transport = httpx.AsyncHTTPTransport(limits=self._limits())
+        else:
+            transport = httpx.HTTPTransport(limits=self._limits())
+        return RecordingTransport(transport, self._cassette) if self.backend == "record" else transport
+
+    def _api_key(self, variable: str) -> Optional[str]:
+        # Offline backends need no credentials, but the SDKs refuse to build clients without one
+        return os.getenv(variable) or (None if self.backend in ("live", "record") else f"{self.backend}-llm")
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(
+                    target=self._loop.run_forever,
+                    name="llm-gateway-loop",
+                    daemon=True
+                )
+                self._thread.start()
+            return self._loop
+
+    def _client(self, provider: str):
+        """Lazily build the async SDK client for a provider (gateway loop only)"""
+        client = self._clients.get(provider)
+        if client is not None:
+            return client
+
+        # Every request draws from the process-wide provider/model rate limiter and is traced
+        transport = AsyncTracedTransport(
+            AsyncRateLimitedTransport(self._http_transport(asynchronous=True), rate_limiter)
+        )
+        http_client = httpx.AsyncClient(transport=transport, timeout=self.timeout)
+        if provider == "anthropic":
+            import anthropic
+            client = anthropic.AsyncAnthropic(
+                api_key=self._api_key("ANTHROPIC_API_KEY"),
+                http_client=http_client,
+                max_retries=self.max_retries
+            )
+        elif provider == "openai":
+            import openai
+            client = openai.AsyncOpenAI(
+                api_key=self._api_key("OPENAI_API_KEY"),
+                http_client=http_client,
+                max_retries=self.max_retries
+            )
+        else:
+            raise ValueError(f"Unknown LLM provider: {provider}")
+
+        self._clients[provider] = client
+        return client
+
+    # ---- completions ----
+
+    @staticmethod
+    def _cacheable_prefix(model: str, system_blocks: list) -> bool:
+        """Whether the static blocks are long enough for Anthropic to cache them"""
+        minimum = ANTHROPIC_HAIKU_MIN_CACHEABLE_TOKENS if "haiku" in model else ANTHROPIC_MIN_CACHEABLE_TOKENS
+        return count_tokens("".join(block["text"] for block in system_blocks), model) >= minimum
+
+    async def _complete(self, prompt: str, provider: str, model: str, temperature: float,
+                        system: Optional[str], max_tokens: int, cached_prefix: Optional[str],
+                        on_delta: Optional[DeltaCallback] = None) -> LLMResponse:
+        client = self._client(provider)
+
+        if provider == "anthropic":
+            # Static system prompt + prefix go first as a cacheable block;
+            # only the per-request message is reprocessed on a cache hit.
+            system_blocks = []
+            if system:
+                system_blocks.append({"type": "text", "text": system})
+            if cached_prefix:
+                system_blocks.append({"type": "text", "text": cached_prefix})
+            if system_blocks and self._cacheable_prefix(model, system_blocks):
+                system_blocks[-1]["cache_control"] = {"type": "ephemeral"}
+
+            request = dict(
+                model=model,
+                max_tokens=max_tokens,
+                temperature=temperature,
+                messages=[{"role": "user", "content": prompt}]
+            )
+            if system_blocks:
+                request["system"] = system_blocks
+            if on_delta is None:
+                response = await client.messages.create(**request)
+            else:
+                async with client.messages.stream(**request) as stream:
+                    async for text in stream.text_stream:
+                        on_delta(text)
+                    response = await stream.get_final_message()
+            text = "".join(block.text for block in response.content if getattr(block, "type", "text") == "text")
+            cache_read = getattr(response.usage, "cache_read_input_tokens", None) or 0
+            cache_write = getattr(response.usage, "cache_creation_input_tokens", None) or 0
+            usage = {
+                # Anthropic reports input_tokens excluding cache reads/writes
+                "input_tokens": response.usage.input_tokens + cache_read + cache_write,
+                "cached_input_tokens": cache_read,
+                "cache_write_input_tokens": cache_write,
+                "uncached_input_tokens": response.usage.input_tokens + cache_write,
+                "output_tokens": response.usage.output_tokens
+            }
+            return LLMResponse(text, provider, model, usage)
+
+        # OpenAI caches identical prompt prefixes automatically, so keep the
+        # static parts (system, prefix) ahead of the per-request content.
+        messages = []
+        if system:
+            messages.append({"role": "system", "content": system})
+        if cached_prefix:
+            messages.append({"role": "system", "content": cached_prefix})
+        messages.append({"role": "user", "content": prompt})
+        request = dict(model=model, temperature=temperature, max_tokens=max_tokens, messages=messages)
+        if on_delta is None:
+            response = await client.chat.completions.create(**request)
+            text = response.choices[0].message.content or ""
+            response_usage = response.usage
+        else:
+            parts = []
+            response_usage = None
+            stream = await client.chat.completions.create(
+                stream=True,
+                stream_options={"include_usage": True},
+                **request
+            )
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    parts.append(chunk.choices[0].delta.content)
+                    on_delta(chunk.choices[0].delta.content)
+                if getattr(chunk, "usage", None) is not None:
+                    response_usage = chunk.usage
+            text = "".join(parts)
+
+        usage = {}
+        if response_usage is not None:
+            details = getattr(response_usage, "prompt_tokens_details", None)
+            cached_tokens = (getattr(details, "cached_tokens", None) or 0) if details else 0
+            usage = {
+                "input_tokens": response_usage.prompt_tokens,
+                "cached_input_tokens": cached_tokens,
+                "uncached_input_tokens": response_usage.prompt_tokens - cached_tokens,
+                "output_tokens": response_usage.completion_tokens
+            }
+        return LLMResponse(text, provider, model, usage)
+
+    def _resolve_defaults(self, provider: str, model: Optional[str], max_tokens: Optional[int]):
+        if model is None:
+            model = DEFAULT_CLAUDE_MODEL if provider == "anthropic" else DEFAULT_OPENAI_MODEL
+        if max_tokens is None:
+            max_tokens = 4096
+        return model, max_tokens
+
+    def _cache_key(self, prompt: str, provider: str, model: str, temperature: float,
+                   system: Optional[str], max_tokens: int, cached_prefix: Optional[str]) -> str:
+        return llm_cache.make_key(
+            kind="completion",
+            provider=provider,
+            model=model,
+            temperature=temperature,
+            system=system,
+            prefix=cached_prefix,
+            message=prompt,
+            max_tokens=max_tokens
+        )
+
+    def _cached_response(self, entry: Optional[Dict[str, Any]], provider: str, model: str) -> Optional[LLMResponse]:
+        if entry is None:
+            return None
+        return LLMResponse(entry["text"], provider, model, entry.get("usage"), cached=True)
+
+    def _span(self, provider: str, model: str, max_tokens: int, on_delta: Optional[DeltaCallback]):
+        return tracer.span(f"llm {model}", "llm", provider=provider, model=model,
+                           max_tokens=max_tokens, streamed=on_delta is not None)
+
+    def _traced(self, span, response: LLMResponse, streamed: bool = False) -> LLMResponse:
+        """Record a finished call's tokens, cache status and retries on its span"""
+        if streamed and not response.cached:
+            # Streamed (SSE) bodies aren't parsed by the traced transport, so count their tokens here
+            record_tokens(response.provider, response.model,
+                          response.usage.get("input_tokens"), response.usage.get("output_tokens"))
+        if span is not None:
+            span.set(
+                cached=response.cached,
+                prompt_tokens=response.usage.get("input_tokens"),
+                completion_tokens=response.usage.get("output_tokens"),
+                cached_prompt_tokens=response.usage.get("cached_input_tokens"),
+                retries=max(0, span.attributes.get("http_attempts", 1) - 1)
+            )
+        return response
+
+    def _submit(self, prompt: str, provider: str, model: str, temperature: float,
+                system: Optional[str], max_tokens: int, cached_prefix: Optional[str],
+                on_delta: Optional[DeltaCallback] = None):
+        coroutine = self._complete(prompt, provider, model, temperature, system, max_tokens, cached_prefix, on_delta)
+        # The gateway loop doesn't share the caller's context; carry the call's span and priority over
+        coroutine = tracer.within(current_span(), with_priority(is_low_priority(), coroutine))
+        return asyncio.run_coroutine_threadsafe(coroutine, self._ensure_loop())
+
+    async def acomplete(self, prompt: str, provider: str = "openai", model: Optional[str] = None,
+                        temperature: float = 0.3, system: Optional[str] = None,
+                        max_tokens: Optional[int] = None, cached_prefix: Optional[str] = None,
+                        on_delta: Optional[DeltaCallback] = None) -> LLMResponse:
+        """
+        Awaitable completion; never blocks the caller's event loop.
+        `cached_prefix` is static instruction text sent ahead of `prompt` and
+        marked for provider-side prompt caching once it (with `system`) reaches
+        the provider's minimum cacheable length. With `on_delta` the response
+        is streamed and each text delta is passed to it as it arrives.
+        """
+        model, max_tokens = self._resolve_defaults(provider, model, max_tokens)
+        with self._span(provider, model, max_tokens, on_delta) as span:
+            key = self._cache_key(prompt, provider, model, temperature, system, max_tokens, cached_prefix)
+            # Cache file IO (and the first directory scan) runs off the event loop
+            cached = self._cached_response(await llm_cache.aget(key), provider, model)
+            if cached is not None:
+                if on_delta is not None:
+                    on_delta(cached.text)
+                return self._traced(span, cached)
+
+            check_cancelled()
+            future = asyncio.wrap_future(
+                self._submit(prompt, provider, model, temperature, system, max_tokens, cached_prefix, on_delta)
+            )
+            # Cancelling the wrapped future cancels the in-flight request on the gateway loop
+            control = current_run()
+            response = await (control.await_future(future) if control is not None else future)
+            await llm_cache.aset(key, {"text": response.text, "usage": response.usage})
+            return self._traced(span, response, streamed=on_delta is not None)
+
+    def complete(self, prompt: str, provider: str = "openai", model: Optional[str] = None,
+                 temperature: float = 0.3, system: Optional[str] = None,
+                 max_tokens: Optional[int] = None, cached_prefix: Optional[str] = None,
+                 on_delta: Optional[DeltaCallback] = None) -> LLMResponse:
+        """Blocking completion for synchronous agent code (same arguments as acomplete)"""
+        model, max_tokens = self._resolve_defaults(provider, model, max_tokens)
+        with self._span(provider, model, max_tokens, on_delta) as span:
+            key = self._cache_key(prompt, provider, model, temperature, system, max_tokens, cached_prefix)
+            cached = self._cached_response(llm_cache.get(key), provider, model)
+            if cached is not None:
+                if on_delta is not None:
+                    on_delta(cached.text)
+                return self._traced(span, cached)
+
+            check_cancelled()
+            future = self._submit(prompt, provider, model, temperature, system, max_tokens, cached_prefix, on_delta)
+            control = current_run()
+            response = control.wait_future(future) if control is not None else future.result()
+            llm_cache.set(key, {"text": response.text, "usage": response.usage})
+            return self._traced(span, response, streamed=on_delta is not None)
+
+    # ---- crew LLMs ----
+
+    def crew_client(self, asynchronous: bool = False):
+        """
+        OpenAI SDK client for crew LLMs, on the same transport stack as the
+        gateway's own calls (backend, rate limiter, tracing). Crews drive the
+        model synchronously, so every crew agent shares one pooled keep-alive
+        httpx.Client; the async client only exists for crewai's async paths.
+        """
+        api_key = self._api_key("OPENAI_API_KEY")
+        if api_key is None:
+            # crewai defers building its clients until a key is configured
+            raise ValueError("OPENAI_API_KEY is required")
+        import openai
+        with self._lock:
+            client = self._crew_clients.get(asynchronous)
+            if client is not None:
+                return client
+            # Cancellation wraps the whole stack so a cancelled run never reaches the limiter or backend
+            from agents.crew_llm import AsyncCancellableTransport, CancellableTransport
+            if asynchronous:
+                http_client = httpx.AsyncClient(
+                    transport=AsyncCancellableTransport(AsyncTracedTransport(
+                        AsyncRateLimitedTransport(self._http_transport(asynchronous=True), rate_limiter)
+                    )),
+                    timeout=self.timeout
+                )
+                client = openai.AsyncOpenAI(api_key=api_key, http_client=http_client, max_retries=self.max_retries)
+            else:
+                if self._sync_http_client is None:
+                    self._sync_http_client = httpx.Client(
+                        transport=CancellableTransport(TracedTransport(
+                            RateLimitedTransport(self._http_transport(asynchronous=False), rate_limiter)
+                        )),
+                        timeout=self.timeout
+                    )
+                client = openai.OpenAI(api_key=api_key, http_client=self._sync_http_client,
+                                       max_retries=self.max_retries)
+            self._crew_clients[asynchronous] = client
+            return client
+
+    def chat_model(self, model: str = DEFAULT_OPENAI_MODEL, temperature: float = 0.3):
+        """
+        Shared crewai LLM for crew agents, cached per (model, temperature).
+        Its SDK clients come from `crew_client`, so crew requests are rate
+        limited, traced and served by the configured backend like any other.
+        """
+        key = (model, temperature)
+        with self._lock:
+            chat_model = self._chat_models.get(key)
+            if chat_model is None:
+                from agents.crew_llm import GatewayCompletion, crew_store_locks
+                crew_store_locks.install()
+                chat_model = GatewayCompletion(
+                    model=model,
+                    temperature=temperature,
+                    api_key=self._api_key("OPENAI_API_KEY"),
+                    max_retries=self.max_retries,
+                    timeout=self.timeout
+                )
+                self._chat_models[key] = chat_model
+            return chat_model
+
+    def backend_stats(self) -> Dict[str, Any]:
+        """Which backend serves LLM calls, plus cassette progress when recording or replaying"""
+        stats = {"backend": self.backend}
+        if self._cassette is not None:
+            stats["cassette"] = self._cassette.stats()
+        if self.backend == "replay":
+            from agents.llm_cassette import network_guard
+            stats["network_blocked"] = network_guard.blocked_count()
+        return stats
+
+    def close(self):
+        """Close pooled connections and stop the gateway loop"""
+        with self._lock:
+            loop, self._loop = self._loop, None
+            clients, self._clients = self._clients, {}
+            if self._sync_http_client is not None:
+                self._sync_http_client.close()
+                self._sync_http_client = None
+            # Crews run synchronously; the async crew client is dropped rather than closed from here
+            self._crew_clients = {}
+            self._chat_models = {}
+            # The next client starts from a freshly loaded cassette
+            self._cassette = None
+        if loop is None:
+            return
+
+        async def _close_clients():
+            for client in clients.values():
+                await client.close()
+
+        asyncio.run_coroutine_threadsafe(_close_clients(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+
+
+# Shared gateway used by every agent
+llm_gateway = LLMGateway()
@@ -1,16 +1,43 @@
 from crewai import Agent, Task, Crew
-from langchain_openai import ChatOpenAI
+from agents.llm_gateway import llm_gateway
+from agents.llm_cache import cached_kickoff
+from agents.context_budget import budget_sections
+from agents.agent_logging import AGENT_VERBOSE, get_logger, record_step, record_task_output
 import json
 
+log = get_logger("marketing_synthesis")
+
+# Static extraction instructions - kept ahead of the research data as a cacheable prefix
+MARKETING_EXTRACTION_INSTRUCTIONS = """
+Analyze the research and interview data provided below to extract KEY marketing intelligence.
+
+Extract and return ONLY a valid JSON object with:
+{
+    "core_message": "The single most powerful message",
+    "primary_pain_points": ["Top 3 pain points in customer language"],
+    "primary_desires": ["Top 3 desires in customer language"],
+    "emotional_triggers": ["Key emotional drivers"],
+    "trust_factors": ["What builds trust"],
+    "objections": ["Main objections to handle"],
+    "transformation": {
+        "from": "Current painful state",
+        "to": "Desired outcome state"
+    },
+    "unique_value": "What makes this solution different",
+    "urgency_factors": ["Why act now"],
+    "social_proof_needs": ["Types of proof that matter"]
+}
+"""
+
 class MarketingIntelligenceSynthesizer:
     def __init__(self):
         # Use same model as your other successful agents
-        self.marketing_llm = ChatOpenAI(
+        self.marketing_llm = llm_gateway.chat_model(
             model="gpt-4o-mini",
             temperature=0.7  # Balanced for strategic thinking
         )
         
-        self.copy_llm = ChatOpenAI(
+        self.copy_llm = llm_gateway.chat_model(
             model="gpt-4o-mini", 
             temperature=0.8  # Higher for creative copy
         )
@@ -35,41 +62,27 @@ class MarketingIntelligenceSynthesizer:
     
     def extract_marketing_intelligence(self, research_results, interview_results):
         """Extract key marketing data from research and interviews"""
+        inputs = budget_sections(
+            "marketing_extraction",
+            research=research_results,
+            interviews=interview_results
+        )
         extraction_prompt = f"""
-        Analyze this research and interview data to extract KEY marketing intelligence:
-        
         RESEARCH DATA:
-        {json.dumps(research_results, indent=2) if isinstance(research_results, dict) else str(research_results)[:3000]}
+        {inputs["research"]}
         
         INTERVIEW DATA:
-        {json.dumps(interview_results, indent=2) if isinstance(interview_results, dict) else str(interview_results)[:3000]}
-        
-        Extract and return ONLY a valid JSON object with:
-        {{
-            "core_message": "The single most powerful message",
-            "primary_pain_points": ["Top 3 pain points in customer language"],
-            "primary_desires": ["Top 3 desires in customer language"],
-            "emotional_triggers": ["Key emotional drivers"],
-            "trust_factors": ["What builds trust"],
-            "objections": ["Main objections to handle"],
-            "transformation": {{
-                "from": "Current painful state",
-                "to": "Desired outcome state"
-            }},
-            "unique_value": "What makes this solution different",
-            "urgency_factors": ["Why act now"],
-            "social_proof_needs": ["Types of proof that matter"]
-        }}
+        {inputs["interviews"]}
         """
         
-        response = self.marketing_llm.invoke(extraction_prompt)
+        content = llm_gateway.complete(
+            extraction_prompt,
+            model="gpt-4o-mini",
+            temperature=0.7,
+            cached_prefix=MARKETING_EXTRACTION_INSTRUCTIONS
+        ).text
         
         try:
-            if hasattr(response, 'content'):
-                content = response.content
-            else:
-                content = str(response)
-            
             # Extract JSON
             import re
             json_match = re.search(r'\{.*\}', content, re.DOTALL)
@@ -78,7 +91,7 @@ class MarketingIntelligenceSynthesizer:
             return json.loads(content)
             
         except Exception as e:
-            print(f"Error extracting intelligence: {e}")
+            log.error("intelligence_extraction_failed", error=str(e))
             return self._get_fallback_intelligence()
     
     def _get_fallback_intelligence(self):
@@ -115,7 +128,7 @@ STRATEGIC EXPERTISE:
 You excel at transforming complex research into simple, powerful marketing strategies that convert.""",
             
             llm=self.marketing_llm,
-            verbose=True,
+            verbose=AGENT_VERBOSE,
             allow_delegation=False
         )
     
@@ -137,21 +150,21 @@ You've written copy that has generated millions in revenue. You know that great
 enters the conversation already happening in the customer's mind.""",
             
             llm=self.copy_llm,
-            verbose=True,
+            verbose=AGENT_VERBOSE,
             allow_delegation=False
         )
     
     def create_strategy_task(self, marketing_intelligence, business_context):
         """Create task for marketing strategy development"""
+        inputs = budget_sections(
+            "marketing_strategy",
+            weights={"intelligence": 2},
+            intelligence=marketing_intelligence,
+            business_context=business_context
+        )
         return Task(
             description=f"""
-            Create a MASTER MARKETING STRATEGY based on deep customer insights
-            
-            MARKETING INTELLIGENCE:
-            {json.dumps(marketing_intelligence, indent=2)}
-            
-            BUSINESS CONTEXT:
-            {business_context}
+            Create a MASTER MARKETING STRATEGY based on the customer insights provided below
             
             DEVELOP COMPREHENSIVE STRATEGY:
             
@@ -180,6 +193,12 @@ enters the conversation already happening in the customer's mind.""",
                - 3 powerful campaign angles
                - Why each will resonate
                - How to execute each
+            
+            MARKETING INTELLIGENCE:
+            {inputs["intelligence"]}
+            
+            BUSINESS CONTEXT:
+            {inputs["business_context"]}
             """,
             
             expected_output="""
@@ -235,15 +254,14 @@ enters the conversation already happening in the customer's mind.""",
     
     def create_copywriting_task(self, strategy, marketing_intelligence):
         """Create task for copywriting"""
+        inputs = budget_sections(
+            "marketing_copy",
+            strategy=strategy,
+            intelligence=marketing_intelligence
+        )
         return Task(
             description=f"""
-            Write HIGH-CONVERTING MARKETING COPY based on strategy and customer insights
-            
-            MARKETING STRATEGY:
-            {strategy}
-            
-            CUSTOMER INTELLIGENCE:
-            {json.dumps(marketing_intelligence, indent=2)}
+            Write HIGH-CONVERTING MARKETING COPY based on the strategy and customer insights provided below
             
             CREATE THESE PRIORITY ASSETS:
             
@@ -281,6 +299,12 @@ enters the conversation already happening in the customer's mind.""",
             ✅ Emotion drives logic justifies
             ✅ Specific beats generic
             ✅ Show transformation, not information
+            
+            MARKETING STRATEGY:
+            {inputs["strategy"]}
+            
+            CUSTOMER INTELLIGENCE:
+            {inputs["intelligence"]}
             """,
             
             expected_output="""
@@ -343,34 +367,37 @@ enters the conversation already happening in the customer's mind.""",
     def synthesize_marketing_campaign(self, research_results, interview_results, business_context):
         """Main method to create complete marketing campaign"""
         
-        print("🎯 Starting Marketing Intelligence Synthesis...")
+        log.info("marketing_synthesis_started")
         
         # Step 1: Extract marketing intelligence
-        print("📊 Extracting marketing intelligence from research...")
         marketing_intelligence = self.extract_marketing_intelligence(
             research_results, 
             interview_results
         )
         
         # Step 2: Create marketing strategy
-        print("🧠 Developing marketing strategy...")
+        log.info("strategy_developing")
         strategy_task = self.create_strategy_task(marketing_intelligence, business_context)
         strategy_crew = Crew(
             agents=[self.create_strategy_synthesizer()],
             tasks=[strategy_task],
-            verbose=True
+            verbose=AGENT_VERBOSE,
+            step_callback=record_step,
+            task_callback=record_task_output
         )
-        strategy_results = strategy_crew.kickoff()
+        strategy_results = cached_kickoff(strategy_crew)
         
         # Step 3: Create marketing copy
-        print("✍️ Writing high-converting copy...")
+        log.info("copy_writing")
         copy_task = self.create_copywriting_task(strategy_results, marketing_intelligence)
         copy_crew = Crew(
             agents=[self.create_copywriting_specialist()],
             tasks=[copy_task],
-            verbose=True
+            verbose=AGENT_VERBOSE,
+            step_callback=record_step,
+            task_callback=record_task_output
         )
-        copy_results = copy_crew.kickoff()
+        copy_results = cached_kickoff(copy_crew)
         
         return {
             "marketing_intelligence": marketing_intelligence,
@@ -0,0 +1,198 @@
+# metrics.py
+# In-process Prometheus metrics - counters and histograms updated inline, gauges read at scrape time
+
+import bisect
+import math
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from agents.agent_logging import get_logger
+
+log = get_logger("metrics")
+
+# Bucket upper bounds (seconds); +Inf is implied
+REQUEST_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+LLM_BUCKETS = (0.25, 0.5, 1, 2, 5, 10, 20, 40, 80, 160, 320)
+STAGE_BUCKETS = (1, 5, 15, 30, 60, 120, 300, 600, 1200, 1800)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Tuple[str, ...], values: Tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class Counter:
+    """Monotonic counter per label set"""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labels: Iterable[str] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(labels)
+        self._values: Dict[Tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(labels.get(name, "") for name in self.label_names)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = list(self._values.items())
+        return [f"{self.name}{_labels(self.label_names, key)} {_number(value)}" for key, value in values]
+
+
+class Histogram:
+    """
+    Cumulative-bucket histogram per label set. `observe` is one bisect and
+    three additions under a lock, cheap enough for every request.
+    """
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labels: Iterable[str] = (), buckets: Iterable[float] = REQUEST_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        # label key -> [per-bucket counts (+Inf last), sum, count]
+        self._values: Dict[Tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(labels.get(name, "") for name in self.label_names)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = [(key, list(entry[0]), entry[1], entry[2]) for key, entry in self._values.items()]
+        lines = []
+        for key, counts, total, count in values:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (math.inf,), counts):
+                cumulative += bucket_count
+                le = 'le="' + _number(bound) + '"'
+                lines.append(f"{self.name}_bucket{_labels(self.label_names, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.label_names, key)} {round(total, 6)}")
+            lines.append(f"{self.name}_count{_labels(self.label_names, key)} {count}")
+        return lines
+
+
+# Scrape-time reading: returns {label values tuple: value}
+GaugeReader = Callable[[], Dict[Tuple, float]]
+
+
+class _Gauge:
+
+    def __init__(self, name: str, help_text: str, labels: Iterable[str], reader: GaugeReader, kind: str = "gauge"):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(labels)
+        self.reader = reader
+        self.kind = kind
+
+    def samples(self) -> List[str]:
+        try:
+            values = self.reader()
+        except Exception as e:
+            log.warning("metric_unavailable", metric=self.name, error=str(e))
+            return []
+        return [f"{self.name}{_labels(self.label_names, key)} {_number(value)}" for key, value in values.items()]
+
+
+class MetricsRegistry:
+    """
+    Every metric the process exposes, rendered in the Prometheus text
+    exposition format by `render`. Counters and histograms are updated where
+    things happen; values other components already track (queue depth,
+    limiter in-flight counts, cache hits) are registered as readers and only
+    computed when /metrics is scraped.
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help_text: str, labels: Iterable[str] = ()) -> Counter:
+        return self._register(Counter(name, help_text, labels))
+
+    def histogram(self, name: str, help_text: str, labels: Iterable[str] = (),
+                  buckets: Iterable[float] = REQUEST_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help_text, labels, buckets))
+
+    def gauge(self, name: str, help_text: str, reader: GaugeReader, labels: Iterable[str] = (),
+              kind: str = "gauge"):
+        """Value read at scrape time; kind="counter" for totals another component keeps"""
+        self._register(_Gauge(name, help_text, labels, reader, kind))
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.help_text}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+def single(value: Optional[float]) -> Dict[Tuple, float]:
+    """Reader result for an unlabelled gauge"""
+    return {(): value} if value is not None else {}
+
+
+# Shared registry rendered by /metrics
+metrics = MetricsRegistry()
+
+HTTP_REQUESTS = metrics.counter(
+    "http_requests_total", "HTTP requests by route template and status code", ("method", "route", "status")
+)
+HTTP_REQUEST_SECONDS = metrics.histogram(
+    "http_request_duration_seconds", "Time to response headers by route template", ("method", "route")
+)
+STAGE_SECONDS = metrics.histogram(
+    "research_stage_duration_seconds", "Pipeline stage run time (ICP, interviews, marketing, conversion copy)",
+    ("stage", "status"), STAGE_BUCKETS
+)
+LLM_REQUESTS = metrics.counter(
+    "llm_requests_total", "LLM API requests by provider, model and status code", ("provider", "model", "status")
+)
+LLM_REQUEST_SECONDS = metrics.histogram(
+    "llm_request_duration_seconds", "LLM API time to response headers", ("provider", "model"), LLM_BUCKETS
+)
+LLM_TOKENS = metrics.counter(
+    "llm_tokens_total", "Tokens processed by provider, model and type (prompt/completion)", ("provider", "model", "type")
+)
+
+
+def record_tokens(provider: str, model: str, prompt_tokens: Optional[int], completion_tokens: Optional[int]):
+    if prompt_tokens:
+        LLM_TOKENS.inc(prompt_tokens, provider=provider, model=model, type="prompt")
+    if completion_tokens:
+        LLM_TOKENS.inc(completion_tokens, provider=provider, model=model, type="completion")
@@ -0,0 +1,413 @@
+# rate_limiter.py
+# Process-wide LLM rate limiter - RPM/TPM budgets per provider+model with AIMD concurrency
+
+import asyncio
+import contextvars
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Optional, Tuple
+
+import httpx
+
+from agents.metrics import LLM_REQUEST_SECONDS, LLM_REQUESTS
+from agents.run_control import POLL_INTERVAL_SECONDS, check_cancelled
+from agents.tracing import current_span
+
+# Requests/tokens per minute per model unless overridden by <PROVIDER>_RPM / <PROVIDER>_TPM
+DEFAULT_LIMITS = {
+    "openai": {"rpm": 500, "tpm": 200000},
+    "anthropic": {"rpm": 50, "tpm": 40000}
+}
+
+PROVIDER_HOSTS = {
+    "api.openai.com": "openai",
+    "api.anthropic.com": "anthropic"
+}
+
+_low_priority = contextvars.ContextVar("llm_low_priority", default=False)
+
+
+@contextmanager
+def low_priority():
+    """LLM requests made inside this block (the batch lane) yield to interactive ones at the limiter"""
+    token = _low_priority.set(True)
+    try:
+        yield
+    finally:
+        _low_priority.reset(token)
+
+
+def is_low_priority() -> bool:
+    return _low_priority.get()
+
+
+async def with_priority(low: bool, awaitable):
+    """Await `awaitable` at the caller's priority (for coroutines handed to another loop)"""
+    token = _low_priority.set(low)
+    try:
+        return await awaitable
+    finally:
+        _low_priority.reset(token)
+
+
+class _ModelBucket:
+    """
+    Token buckets for requests and tokens plus an adaptive concurrency limit.
+
+    Concurrency follows AIMD: each healthy response adds 1/limit (about +1
+    per limit's worth of requests); a 429 halves it and pauses the bucket
+    for the provider's retry-after; a response much slower than the running
+    average trims it by 10%. Low-priority requests only take a slot while
+    no interactive request is waiting for one.
+    """
+
+    def __init__(self, key: Tuple[str, str], rpm: float, tpm: float, initial_concurrency: float,
+                 min_concurrency: float, max_concurrency: float, latency_factor: float):
+        self.key = key
+        self.rpm = rpm
+        self.tpm = tpm
+        self.requests_available = float(rpm)
+        self.tokens_available = float(tpm)
+        self.updated = time.monotonic()
+
+        self.limit = float(initial_concurrency)
+        self.min_concurrency = min_concurrency
+        self.max_concurrency = max_concurrency
+        self.latency_factor = latency_factor
+        self.latency_ewma: Optional[float] = None
+        self.last_decrease = 0.0
+        self.paused_until = 0.0
+
+        self.in_flight = 0
+        self.waiting = 0
+        self.waiting_low_priority = 0
+        self.requests = 0
+        self.throttled = 0
+        self.waited_seconds = 0.0
+
+    def _refill(self, now: float):
+        elapsed = now - self.updated
+        self.updated = now
+        self.requests_available = min(self.rpm, self.requests_available + elapsed * self.rpm / 60.0)
+        self.tokens_available = min(self.tpm, self.tokens_available + elapsed * self.tpm / 60.0)
+
+    def try_acquire(self, tokens: int, now: float, low_priority: bool = False) -> float:
+        """Take a slot and return 0, or return how long to wait before retrying"""
+        if now < self.paused_until:
+            return self.paused_until - now
+        if low_priority and self.waiting > self.waiting_low_priority:
+            return 0.05
+        self._refill(now)
+        if self.in_flight >= int(self.limit):
+            return 0.05
+        if self.requests_available < 1:
+            return (1 - self.requests_available) * 60.0 / self.rpm
+        cost = min(tokens, self.tpm)
+        if self.tokens_available < cost:
+            return (cost - self.tokens_available) * 60.0 / self.tpm
+
+        self.requests_available -= 1
+        self.tokens_available -= cost
+        self.in_flight += 1
+        self.requests += 1
+        return 0.0
+
+    def record_response(self, status_code: int, latency: float, retry_after: Optional[float], now: float):
+        if status_code == 429:
+            self.throttled += 1
+            self.limit = max(self.min_concurrency, self.limit / 2)
+            self.last_decrease = now
+            self.paused_until = max(self.paused_until, now + (retry_after if retry_after is not None else 1.0))
+            return
+        if status_code >= 500:
+            return
+
+        slow = self.latency_ewma is not None and latency > self.latency_factor * self.latency_ewma
+        self.latency_ewma = latency if self.latency_ewma is None else 0.8 * self.latency_ewma + 0.2 * latency
+        if slow and now - self.last_decrease > 5.0:
+            self.limit = max(self.min_concurrency, self.limit * 0.9)
+            self.last_decrease = now
+        else:
+            self.limit = min(self.max_concurrency, self.limit + 1.0 / self.limit)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "concurrency_limit": round(self.limit, 2),
+            "in_flight": self.in_flight,
+            "queue_depth": self.waiting,
+            "low_priority_queue_depth": self.waiting_low_priority,
+            "rpm": self.rpm,
+            "tpm": self.tpm,
+            "requests": self.requests,
+            "throttled_429": self.throttled,
+            "latency_ewma_seconds": round(self.latency_ewma, 3) if self.latency_ewma is not None else None,
+            "waited_seconds": round(self.waited_seconds, 3)
+        }
+
+
+class RateLimiter:
+    """
+    Shared limiter for every LLM request the process makes, keyed by
+    (provider, model). Sync callers (crew threads) block on a condition;
+    async callers (the gateway loop) sleep, so the loop is never blocked.
+    """
+
+    def __init__(self, enabled: bool = None):
+        if enabled is None:
+            enabled = os.getenv("LLM_RATE_LIMIT_ENABLED", "true").lower() == "true"
+        self.enabled = enabled
+        self.initial_concurrency = float(os.getenv("LLM_INITIAL_CONCURRENCY", "4"))
+        self.min_concurrency = float(os.getenv("LLM_MIN_CONCURRENCY", "1"))
+        self.max_concurrency = float(os.getenv("LLM_MAX_CONCURRENCY_PER_MODEL", "32"))
+        self.latency_factor = float(os.getenv("LLM_LATENCY_BACKOFF_FACTOR", "2.5"))
+        self._buckets: Dict[Tuple[str, str], _ModelBucket] = {}
+        self._lock = threading.Lock()
+        self._released = threading.Condition(self._lock)
+
+    def _bucket(self, provider: str, model: str) -> _ModelBucket:
+        key = (provider, model)
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            defaults = DEFAULT_LIMITS.get(provider, {"rpm": 60, "tpm": 100000})
+            prefix = provider.upper().replace(".", "_").replace("-", "_")
+            bucket = _ModelBucket(
+                key,
+                rpm=float(os.getenv(f"{prefix}_RPM", defaults["rpm"])),
+                tpm=float(os.getenv(f"{prefix}_TPM", defaults["tpm"])),
+                initial_concurrency=self.initial_concurrency,
+                min_concurrency=self.min_concurrency,
+                max_concurrency=self.max_concurrency,
+                latency_factor=self.latency_factor
+            )
+            self._buckets[key] = bucket
+        return bucket
+
+    def acquire(self, provider: str, model: str, tokens: int) -> Optional[_ModelBucket]:
+        """Blocking acquire for thread callers (gives up if their run is cancelled)"""
+        if not self.enabled:
+            return None
+        started = time.monotonic()
+        low = _low_priority.get()
+        with self._lock:
+            bucket = self._bucket(provider, model)
+            bucket.waiting += 1
+            bucket.waiting_low_priority += low
+            try:
+                while True:
+                    wait = bucket.try_acquire(tokens, time.monotonic(), low)
+                    if wait == 0:
+                        break
+                    self._released.wait(timeout=min(wait, POLL_INTERVAL_SECONDS))
+                    check_cancelled()
+            finally:
+                bucket.waiting -= 1
+                bucket.waiting_low_priority -= low
+                bucket.waited_seconds += time.monotonic() - started
+        return bucket
+
+    async def aacquire(self, provider: str, model: str, tokens: int) -> Optional[_ModelBucket]:
+        """Non-blocking acquire for event loop callers"""
+        if not self.enabled:
+            return None
+        started = time.monotonic()
+        low = _low_priority.get()
+        with self._lock:
+            bucket = self._bucket(provider, model)
+            bucket.waiting += 1
+            bucket.waiting_low_priority += low
+        try:
+            while True:
+                with self._lock:
+                    wait = bucket.try_acquire(tokens, time.monotonic(), low)
+                if wait == 0:
+                    break
+                await asyncio.sleep(min(wait, 1.0))
+        finally:
+            with self._lock:
+                bucket.waiting -= 1
+                bucket.waiting_low_priority -= low
+                bucket.waited_seconds += time.monotonic() - started
+        return bucket
+
+    def record_response(self, bucket: Optional[_ModelBucket], status_code: int, latency: float,
+                        retry_after: Optional[float] = None):
+        if bucket is None:
+            return
+        with self._lock:
+            bucket.record_response(status_code, latency, retry_after, time.monotonic())
+
+    def release(self, bucket: Optional[_ModelBucket]):
+        if bucket is None:
+            return
+        with self._lock:
+            bucket.in_flight -= 1
+            self._released.notify_all()
+
+    def queue_depth(self) -> int:
+        with self._lock:
+            return sum(bucket.waiting for bucket in self._buckets.values())
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "queue_depth": sum(bucket.waiting for bucket in self._buckets.values()),
+                "models": {f"{provider}:{model}": bucket.stats() for (provider, model), bucket in self._buckets.items()}
+            }
+
+
+# Shared limiter used by every pooled LLM client
+rate_limiter = RateLimiter()
+
+
+# ---- httpx integration ----
+
+def describe_request(request: httpx.Request) -> Tuple[str, str, int]:
+    """(provider, model, estimated tokens) for an outgoing LLM API request"""
+    provider = PROVIDER_HOSTS.get(request.url.host, request.url.host)
+    model, tokens = "unknown", 0
+    try:
+        body = request.content
+        payload = json.loads(body) if body else {}
+        model = payload.get("model", model)
+        # Prompt size estimate plus the completion budget (both count toward TPM)
+        tokens = len(body) // 4 + int(payload.get("max_tokens") or 0)
+    except (httpx.RequestNotRead, ValueError, AttributeError):
+        pass
+    return provider, model, tokens
+
+
+def _retry_after(response: httpx.Response) -> Optional[float]:
+    value = response.headers.get("retry-after")
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+class _ReleasingStream(httpx.SyncByteStream):
+    """Holds the concurrency slot until the (possibly streamed) body is closed"""
+
+    def __init__(self, stream, on_close):
+        self._stream = stream
+        self._on_close = on_close
+
+    def __iter__(self):
+        for chunk in self._stream:
+            yield chunk
+
+    def close(self):
+        try:
+            self._stream.close()
+        finally:
+            self._on_close()
+
+
+class _AsyncReleasingStream(httpx.AsyncByteStream):
+
+    def __init__(self, stream, on_close):
+        self._stream = stream
+        self._on_close = on_close
+
+    async def __aiter__(self):
+        async for chunk in self._stream:
+            yield chunk
+
+    async def aclose(self):
+        try:
+            await self._stream.aclose()
+        finally:
+            self._on_close()
+
+
+def _record_wait(queued: float):
+    """Note time spent waiting for the limiter on the request's trace span"""
+    span = current_span()
+    if span is not None:
+        span.set(rate_limit_wait_seconds=round(time.monotonic() - queued, 3))
+
+
+def _record_request(provider: str, model: str, status, latency: float):
+    LLM_REQUESTS.inc(provider=provider, model=model, status=status)
+    LLM_REQUEST_SECONDS.observe(latency, provider=provider, model=model)
+
+
+def _release_once(limiter: RateLimiter, bucket):
+    released = []
+
+    def _release():
+        if not released:
+            released.append(True)
+            limiter.release(bucket)
+    return _release
+
+
+class RateLimitedTransport(httpx.BaseTransport):
+    """httpx transport that draws every request from the shared limiter"""
+
+    def __init__(self, transport: httpx.BaseTransport, limiter: RateLimiter = None):
+        self._transport = transport
+        self._limiter = limiter or rate_limiter
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        provider, model, tokens = describe_request(request)
+        queued = time.monotonic()
+        bucket = self._limiter.acquire(provider, model, tokens)
+        _record_wait(queued)
+        release = _release_once(self._limiter, bucket)
+        started = time.monotonic()
+        try:
+            response = self._transport.handle_request(request)
+        except BaseException:
+            release()
+            _record_request(provider, model, "error", time.monotonic() - started)
+            raise
+        latency = time.monotonic() - started
+        self._limiter.record_response(bucket, response.status_code, latency, _retry_after(response))
+        _record_request(provider, model, response.status_code, latency)
+        return httpx.Response(
+            status_code=response.status_code,
+            headers=response.headers,
+            stream=_ReleasingStream(response.stream, release),
+            extensions=response.extensions
+        )
+
+    def close(self):
+        self._transport.close()
+
+
+class AsyncRateLimitedTransport(httpx.AsyncBaseTransport):
+    """Async counterpart of RateLimitedTransport for the gateway's SDK clients"""
+
+    def __init__(self, transport: httpx.AsyncBaseTransport, limiter: RateLimiter = None):
+        self._transport = transport
+        self._limiter = limiter or rate_limiter
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        provider, model, tokens = describe_request(request)
+        queued = time.monotonic()
+        bucket = await self._limiter.aacquire(provider, model, tokens)
+        _record_wait(queued)
+        release = _release_once(self._limiter, bucket)
+        started = time.monotonic()
+        try:
+            response = await self._transport.handle_async_request(request)
+        except BaseException:
+            release()
+            _record_request(provider, model, "error", time.monotonic() - started)
+            raise
+        latency = time.monotonic() - started
+        self._limiter.record_response(bucket, response.status_code, latency, _retry_after(response))
+        _record_request(provider, model, response.status_code, latency)
+        return httpx.Response(
+            status_code=response.status_code,
+            headers=response.headers,
+            stream=_AsyncReleasingStream(response.stream, release),
+            extensions=response.extensions
+        )
+
+    async def aclose(self):
+        await self._transport.aclose()
@@ -0,0 +1,101 @@
+# registry.py
+# Lazily imported agent entry points - keeps crewai/langchain/anthropic off the startup path
+
+import importlib
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+from agents.agent_logging import get_logger
+
+log = get_logger("agent_registry")
+
+
+class AgentRegistry:
+    """
+    Agent entry points by name, imported on first use.
+
+    Agent modules pull in crewai, crewai_tools, langchain_openai and the
+    provider SDKs, which takes seconds. Registering them here instead of
+    importing them in main.py lets the app answer /health and the static pages
+    immediately; `warm_up` imports everything in the background after
+    startup so the first research request doesn't pay for it either.
+
+    A failed import is remembered (and reported by `status`) instead of
+    retried on every call, matching the old import-time availability flags.
+    """
+
+    def __init__(self):
+        self._specs: Dict[str, tuple] = {}
+        self._loaded: Dict[str, Any] = {}
+        self._errors: Dict[str, str] = {}
+        self._load_seconds: Dict[str, float] = {}
+        self._lock = threading.RLock()
+        self.warmup_state = "not_started"
+
+    def register(self, name: str, module: str, attribute: Optional[str] = None):
+        """Register `module.attribute` (or the module itself) under `name`"""
+        self._specs[name] = (module, attribute)
+
+    def get(self, name: str) -> Optional[Callable]:
+        """The entry point, importing it if needed; None if it can't be imported"""
+        if name in self._loaded:
+            return self._loaded[name]
+        with self._lock:
+            if name not in self._loaded:
+                module_name, attribute = self._specs[name]
+                started = time.monotonic()
+                try:
+                    module = importlib.import_module(module_name)
+                    self._loaded[name] = getattr(module, attribute) if attribute else module
+                    log.info("agent_loaded", agent=name, module=module_name)
+                except Exception as e:
+                    log.warning("agent_unavailable", agent=name, module=module_name, error=str(e))
+                    self._errors[name] = str(e)
+                    self._loaded[name] = None
+                self._load_seconds[name] = round(time.monotonic() - started, 3)
+        return self._loaded[name]
+
+    def is_loaded(self, name: str) -> bool:
+        return name in self._loaded
+
+    def available(self, name: str) -> Optional[bool]:
+        """True/False once the import was attempted, None before (never imports)"""
+        if name not in self._loaded:
+            return None
+        return self._loaded[name] is not None
+
+    def warm_up(self):
+        """Import every registered entry point (run off the event loop)"""
+        self.warmup_state = "running"
+        started = time.monotonic()
+        for name in self._specs:
+            self.get(name)
+        self.warmup_state = "completed"
+        log.info("agent_warmup_finished", seconds=round(time.monotonic() - started, 1))
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "warmup": self.warmup_state,
+            "ready": self.warmup_state == "completed" or all(name in self._loaded for name in self._specs),
+            "agents": {
+                name: {
+                    "loaded": name in self._loaded,
+                    "available": self.available(name),
+                    "load_seconds": self._load_seconds.get(name),
+                    "error": self._errors.get(name)
+                }
+                for name in self._specs
+            }
+        }
+
+
+# Shared registry of agent entry points used by the API and the coordinator
+agent_registry = AgentRegistry()
+agent_registry.register("icp_research", "agents.icp_intelligence_agent", "reasoning_agent_call")
+agent_registry.register("icp_research_async", "agents.icp_intelligence_agent", "reasoning_agent_call_async")
+agent_registry.register("interview_intelligence", "agents.dynamic_interview_agent", "dynamic_interview_intelligence")
+agent_registry.register("marketing_strategy", "agents.marketing_intelligence_synthesizer", "synthesize_marketing_intelligence")
+agent_registry.register("conversion_copy", "agents.conversion_copy_agent", "generate_tactical_conversion_assets")
+agent_registry.register("comprehensive_research", "agents.avatar_agnostic_coordinator", "run_comprehensive_research")
+agent_registry.register("anthropic_sdk", "anthropic")
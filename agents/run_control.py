@@ -0,0 +1,178 @@
+# run_control.py
+# Per-session cancellation and deadlines, propagated through contextvars to stages, crews and LLM calls
+
+import asyncio
+import contextvars
+import os
+import threading
+import time
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from contextlib import contextmanager
+from typing import Callable, Dict, Optional
+
+CANCELLED = "cancelled"
+DEADLINE_EXCEEDED = "deadline_exceeded"
+
+# How often blocking waits wake up to check for cancellation
+POLL_INTERVAL_SECONDS = 0.25
+
+# How often a run asks its cancel_source whether another worker cancelled it
+REMOTE_CANCEL_POLL_SECONDS = float(os.getenv("REMOTE_CANCEL_POLL_SECONDS", "2.0"))
+
+
+class RunCancelled(Exception):
+    """Raised at the next checkpoint once a run is cancelled or past its deadline"""
+
+    def __init__(self, reason: str = CANCELLED):
+        super().__init__(f"Research run stopped: {reason}")
+        self.reason = reason
+
+
+class RunControl:
+    """
+    Cancellation flag plus optional deadline for one research run.
+
+    Code never has to be handed a RunControl explicitly: `run_scope` puts it
+    in a contextvar, which asyncio.to_thread, the stage graph and the fan-out
+    helpers copy into their worker threads. Checkpoints (`check_cancelled`)
+    sit before every crew kickoff and LLM request, and blocking waits poll it.
+
+    A cancel request can also come from another process (a DELETE handled by
+    a worker that isn't running the session): `cancel_source(session_id)`
+    returns the stored reason, or None, and is polled every
+    REMOTE_CANCEL_POLL_SECONDS while the run is checked.
+    """
+
+    def __init__(self, session_id: str, deadline_seconds: Optional[float] = None,
+                 cancel_source: Optional[Callable[[str], Optional[str]]] = None):
+        self.session_id = session_id
+        self.started = time.monotonic()
+        self.deadline = self.started + deadline_seconds if deadline_seconds else None
+        self.reason: Optional[str] = None
+        self._event = threading.Event()
+        self._cancel_source = cancel_source
+        self._polled_at = self.started
+
+    def cancel(self, reason: str = CANCELLED):
+        if self.reason is None:
+            self.reason = reason
+        self._event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        if self._event.is_set():
+            return True
+        now = time.monotonic()
+        if self.deadline is not None and now >= self.deadline:
+            self.cancel(DEADLINE_EXCEEDED)
+        elif self._cancel_source is not None and now - self._polled_at >= REMOTE_CANCEL_POLL_SECONDS:
+            self._polled_at = now
+            try:
+                reason = self._cancel_source(self.session_id)
+            except Exception as e:
+                # agent_logging reads the current run from this module, so import it here
+                from agents.agent_logging import get_logger
+                get_logger("run_control").warning("cancel_check_failed", session_id=self.session_id, error=str(e))
+                reason = None
+            if reason:
+                self.cancel(reason)
+        return self._event.is_set()
+
+    def remaining(self) -> Optional[float]:
+        if self.deadline is None:
+            return None
+        return max(0.0, self.deadline - time.monotonic())
+
+    def check(self):
+        if self.cancelled:
+            raise RunCancelled(self.reason)
+
+    def wait_future(self, future):
+        """Block on a concurrent.futures.Future, cancelling it if the run stops first"""
+        while True:
+            try:
+                return future.result(timeout=POLL_INTERVAL_SECONDS)
+            except FutureTimeoutError:
+                pass
+            if self.cancelled:
+                future.cancel()
+                raise RunCancelled(self.reason)
+
+    async def await_future(self, future):
+        """Await an asyncio future, cancelling it if the run stops first"""
+        while True:
+            done, _ = await asyncio.wait({future}, timeout=POLL_INTERVAL_SECONDS)
+            if done:
+                return future.result()
+            if self.cancelled:
+                future.cancel()
+                raise RunCancelled(self.reason)
+
+
+_current_run = contextvars.ContextVar("research_run", default=None)
+
+
+@contextmanager
+def run_scope(control: Optional[RunControl]):
+    """Make `control` the current run for everything executed inside this block"""
+    token = _current_run.set(control)
+    try:
+        yield control
+    finally:
+        _current_run.reset(token)
+
+
+def current_run() -> Optional[RunControl]:
+    return _current_run.get()
+
+
+def check_cancelled():
+    """Checkpoint: raise RunCancelled if the current run was cancelled (no-op outside a run)"""
+    control = _current_run.get()
+    if control is not None:
+        control.check()
+
+
+class RunRegistry:
+    """Active runs by session id, so API handlers can cancel them"""
+
+    def __init__(self, default_deadline_seconds: float = None):
+        self.default_deadline_seconds = default_deadline_seconds or float(
+            os.getenv("PIPELINE_DEADLINE_SECONDS", "1800")
+        )
+        self._runs: Dict[str, RunControl] = {}
+        self._lock = threading.Lock()
+
+    def start(self, session_id: str, deadline_seconds: Optional[float] = None,
+              cancel_source: Optional[Callable[[str], Optional[str]]] = None) -> RunControl:
+        control = RunControl(session_id, deadline_seconds or self.default_deadline_seconds, cancel_source)
+        with self._lock:
+            previous = self._runs.get(session_id)
+            self._runs[session_id] = control
+        if previous is not None:
+            previous.cancel()
+        return control
+
+    def get(self, session_id: str) -> Optional[RunControl]:
+        with self._lock:
+            return self._runs.get(session_id)
+
+    def cancel(self, session_id: str, reason: str = CANCELLED) -> bool:
+        control = self.get(session_id)
+        if control is None:
+            return False
+        control.cancel(reason)
+        return True
+
+    def finish(self, session_id: str, control: RunControl):
+        with self._lock:
+            if self._runs.get(session_id) is control:
+                del self._runs[session_id]
+
+    def active_count(self) -> int:
+        with self._lock:
+            return len(self._runs)
+
+
+# Shared registry used by the API and job runners
+active_runs = RunRegistry()
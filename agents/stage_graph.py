@@ -0,0 +1,179 @@
+# stage_graph.py
+# Declarative stage graph + scheduler for multi-agent research pipelines
+
+import contextvars
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from agents.agent_logging import get_logger
+from agents.checkpoints import current_checkpoints
+from agents.metrics import STAGE_SECONDS
+from agents.run_control import RunCancelled, current_run
+from agents.tracing import tracer
+
+log = get_logger("stage_graph")
+
+
+class Stage:
+    """
+    One pipeline stage.
+
+    `run` is called with keyword arguments named after `inputs` (initial inputs
+    or upstream stage names). If it raises and a `fallback` is given, the
+    fallback's return value (called with the exception) becomes the stage
+    output so downstream stages still run.
+    """
+
+    def __init__(self, name: str, run: Optional[Callable[..., Any]], inputs: Iterable[str] = (),
+                 fallback: Optional[Callable[[Exception], Any]] = None):
+        self.name = name
+        self.run = run
+        self.inputs = list(inputs)
+        self.fallback = fallback
+
+
+class StageGraph:
+    """Validated DAG of stages; runs every stage whose inputs are ready concurrently"""
+
+    def __init__(self, stages: List[Stage], initial_inputs: Iterable[str] = ("business_context",)):
+        self.stages = {stage.name: stage for stage in stages}
+        self.initial_inputs = set(initial_inputs)
+        self._validate()
+
+    def _validate(self):
+        known = self.initial_inputs | set(self.stages)
+        for stage in self.stages.values():
+            missing = [name for name in stage.inputs if name not in known]
+            if missing:
+                raise ValueError(f"Stage '{stage.name}' depends on unknown inputs: {missing}")
+
+        # Kahn's algorithm - every stage must become schedulable
+        resolved = set(self.initial_inputs)
+        remaining = dict(self.stages)
+        while remaining:
+            ready = [name for name, stage in remaining.items() if set(stage.inputs) <= resolved]
+            if not ready:
+                raise ValueError(f"Stage graph has a cycle among: {sorted(remaining)}")
+            for name in ready:
+                resolved.add(name)
+                remaining.pop(name)
+
+    def run(self, inputs: Dict[str, Any], max_concurrency: int = 4):
+        """
+        Execute the graph.
+
+        Returns (outputs, report) where outputs maps stage name -> output and
+        report maps stage name -> {"status", "started_at", "completed_at",
+        "duration_seconds", "error"}. Status is one of completed, restored
+        (output taken from a checkpoint of an earlier attempt), fallback,
+        error, skipped (an upstream stage errored without a fallback) or
+        cancelled (the research run was cancelled or hit its deadline; outputs
+        of stages that already finished are still returned).
+
+        When a checkpoint scope is active, completed stages are checkpointed
+        as they finish. Fallback outputs are not, so a resume retries them -
+        and neither is any stage that consumed one, directly or further
+        downstream, so its output is recomputed from the retried input.
+        """
+        values = dict(inputs)
+        report: Dict[str, Dict[str, Any]] = {name: {"status": "pending"} for name in self.stages}
+        pending = dict(self.stages)
+        running = {}
+        control = current_run()
+        checkpoints = current_checkpoints()
+        # Stages whose output is, or was computed from, a fallback output
+        degraded = set()
+
+        if checkpoints is not None:
+            for name in list(pending):
+                found, output = checkpoints.restore(name)
+                if found:
+                    values[name] = output
+                    report[name] = {"status": "restored", "duration_seconds": 0}
+                    pending.pop(name)
+                    now = time.time()
+                    tracer.record(f"stage {name}", "stage", now, now, status="restored")
+
+        executor = ThreadPoolExecutor(max_workers=max(1, max_concurrency), thread_name_prefix="stage")
+        try:
+            while pending or running:
+                if control is not None and control.cancelled:
+                    self._cancel_remaining(report, pending, running, control.reason)
+                    break
+                
+                # Skip stages whose upstream failed for good
+                for name, stage in list(pending.items()):
+                    if any(report.get(dep, {}).get("status") in ("error", "skipped", "cancelled") for dep in stage.inputs):
+                        report[name] = {"status": "skipped", "error": "Upstream stage failed"}
+                        pending.pop(name)
+
+                for name, stage in list(pending.items()):
+                    if all(dep in values for dep in stage.inputs):
+                        pending.pop(name)
+                        report[name] = {"status": "running", "started_at": datetime.now().isoformat()}
+                        context = contextvars.copy_context()
+                        running[executor.submit(context.run, self._run_stage, stage, values)] = name
+
+                if not running:
+                    break
+
+                done, _ = wait(running, timeout=0.5 if control is not None else None, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    status, output, error, duration = future.result()
+                    report[name].update({
+                        "status": status,
+                        "completed_at": datetime.now().isoformat(),
+                        "duration_seconds": round(duration, 3)
+                    })
+                    if error:
+                        report[name]["error"] = error
+                    if status not in ("error", "cancelled"):
+                        values[name] = output
+                    if status == "fallback" or any(dep in degraded for dep in self.stages[name].inputs):
+                        degraded.add(name)
+                    if status == "completed" and name not in degraded and checkpoints is not None:
+                        checkpoints.save(name, output)
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        outputs = {name: values[name] for name in self.stages if name in values}
+        return outputs, report
+
+    def _cancel_remaining(self, report, pending, running, reason):
+        """Mark unfinished stages cancelled; running threads stop at their next checkpoint"""
+        now = datetime.now().isoformat()
+        for name in pending:
+            report[name] = {"status": "cancelled", "error": reason}
+        for future, name in running.items():
+            future.cancel()
+            report[name].update({"status": "cancelled", "completed_at": now, "error": reason})
+        pending.clear()
+        running.clear()
+
+    def _run_stage(self, stage: Stage, values: Dict[str, Any]):
+        with tracer.span(f"stage {stage.name}", "stage", inputs=stage.inputs) as span:
+            status, output, error, duration = self._execute_stage(stage, values)
+            if span is not None:
+                span.status = status
+                span.error = error
+        STAGE_SECONDS.observe(duration, stage=stage.name, status=status)
+        return status, output, error, duration
+
+    def _execute_stage(self, stage: Stage, values: Dict[str, Any]):
+        started = time.monotonic()
+        try:
+            if stage.run is None:
+                raise RuntimeError(f"No implementation available for stage '{stage.name}'")
+            output = stage.run(**{name: values[name] for name in stage.inputs})
+            return "completed", output, None, time.monotonic() - started
+        except RunCancelled as e:
+            # No fallback for a cancelled run - the stage simply didn't finish
+            return "cancelled", None, e.reason, time.monotonic() - started
+        except Exception as e:
+            log.error("stage_failed", stage=stage.name, error=str(e), fallback=stage.fallback is not None)
+            if stage.fallback is None:
+                return "error", None, str(e), time.monotonic() - started
+            return "fallback", stage.fallback(e), str(e), time.monotonic() - started
@@ -0,0 +1,492 @@
+# tracing.py
+# Span tracing across endpoints, jobs, coordinator stages, crew kickoffs and LLM calls - JSONL per session
+
+import asyncio
+import contextvars
+import json
+import os
+import re
+import threading
+import time
+import uuid
+import zlib
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from agents.agent_logging import get_logger
+from agents.metrics import record_tokens
+from agents.run_control import RunCancelled
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+log = get_logger("tracing")
+
+
+class Span:
+    """One timed operation; children are spans started while it is current"""
+
+    def __init__(self, name: str, kind: str, trace: "_Trace", parent_id: Optional[str],
+                 attributes: Dict[str, Any], start: float = None):
+        self.name = name
+        self.kind = kind
+        self.trace = trace
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent_id
+        self.attributes = {key: value for key, value in attributes.items() if value is not None}
+        self.start = start if start is not None else time.time()
+        self.end_time: Optional[float] = None
+        self.status = "running"
+        self.error: Optional[str] = None
+
+    def set(self, **attributes):
+        self.attributes.update({key: value for key, value in attributes.items() if value is not None})
+
+    def add(self, key: str, amount: float = 1):
+        """Increment a counter attribute (HTTP attempts, tokens across requests, ...)"""
+        self.attributes[key] = self.attributes.get(key, 0) + amount
+
+    def to_dict(self) -> Dict[str, Any]:
+        end = self.end_time if self.end_time is not None else time.time()
+        return {
+            "trace_id": self.trace.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "kind": self.kind,
+            "start": round(self.start, 6),
+            "end": round(end, 6),
+            "duration_seconds": round(end - self.start, 6),
+            "status": self.status,
+            "error": self.error,
+            "attributes": self.attributes
+        }
+
+
+class _Trace:
+    """
+    The spans of one session. A trace can start before its session id is
+    known (an endpoint span opens before the handler creates the session);
+    finished spans are held until `bind` names it, and dropped if it never is.
+    """
+
+    def __init__(self, trace_id: Optional[str] = None):
+        self.trace_id = trace_id
+        self.pending: List[Span] = []
+
+
+_current_span = contextvars.ContextVar("trace_span", default=None)
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+class Tracer:
+    """
+    Writes finished spans to TRACE_DIR/<session_id>.jsonl, one JSON object per line.
+    `prune` deletes trace files past TRACE_RETENTION_DAYS and, oldest first,
+    beyond TRACE_MAX_MB in total.
+
+    The current span lives in a contextvar, so spans nest across
+    asyncio.to_thread, the stage graph and fan-out worker threads without
+    being passed around. Spans still running are kept in memory and
+    included by `load`, so an in-progress run can be inspected too.
+    """
+
+    def __init__(self, directory: str = None, enabled: bool = None):
+        if enabled is None:
+            enabled = os.getenv("TRACING_ENABLED", "true").lower() == "true"
+        self.enabled = enabled
+        self.directory = directory or os.getenv("TRACE_DIR", "data/traces")
+        self.retention_seconds = float(os.getenv("TRACE_RETENTION_DAYS", "14")) * 86400
+        self.max_bytes = int(float(os.getenv("TRACE_MAX_MB", "256")) * 1024 * 1024)
+        self._open: Dict[str, Span] = {}
+        self._lock = threading.Lock()
+
+    # ---- span lifecycle ----
+
+    def start_span(self, name: str, kind: str = "internal", trace_id: Optional[str] = None,
+                   start: float = None, **attributes) -> Optional[Span]:
+        """
+        Start a span under the current one. With `trace_id`, the span joins
+        that session's trace: under the current span if it belongs to the same
+        session (or to a trace not yet bound, which is bound now), otherwise
+        as the root of a new trace.
+        """
+        if not self.enabled:
+            return None
+        parent = _current_span.get()
+        trace = parent.trace if parent is not None else None
+        if trace_id is not None and (trace is None or trace.trace_id not in (None, trace_id)):
+            trace, parent = _Trace(trace_id), None
+        elif trace is None:
+            trace = _Trace()
+        if trace_id is not None and trace.trace_id is None:
+            self._bind_trace(trace, trace_id)
+
+        span = Span(name, kind, trace, parent.span_id if parent is not None else None, attributes, start)
+        with self._lock:
+            self._open[span.span_id] = span
+        return span
+
+    def end_span(self, span: Optional[Span], status: Optional[str] = None, error: Optional[str] = None,
+                 end: float = None):
+        """Finish a span. Without `status` it keeps a status set while it ran (e.g. a stage's "fallback"), else "ok"."""
+        if span is None or span.end_time is not None:
+            return
+        span.end_time = end if end is not None else time.time()
+        span.status = status or (span.status if span.status != "running" else "ok")
+        span.error = error or span.error
+        with self._lock:
+            self._open.pop(span.span_id, None)
+            if span.trace.trace_id is None:
+                span.trace.pending.append(span)
+                return
+        self._write(span.trace.trace_id, [span])
+
+    @contextmanager
+    def span(self, name: str, kind: str = "internal", trace_id: Optional[str] = None, **attributes):
+        """Context manager form of start_span/end_span; the span is current inside the block"""
+        span = self.start_span(name, kind, trace_id, **attributes)
+        if span is None:
+            yield None
+            return
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            cancelled = isinstance(e, (RunCancelled, asyncio.CancelledError))
+            self.end_span(span, "cancelled" if cancelled else "error", str(e) or type(e).__name__)
+            raise
+        finally:
+            _current_span.reset(token)
+            self.end_span(span)
+
+    def open_span(self, span_id: Optional[str]) -> Optional[Span]:
+        with self._lock:
+            return self._open.get(span_id) if span_id else None
+
+    def record(self, name: str, kind: str, start: float, end: float, status: str = "ok", **attributes):
+        """Add an already finished interval (e.g. time spent queued) under the current span"""
+        span = self.start_span(name, kind, start=start, **attributes)
+        self.end_span(span, status, end=end)
+
+    async def within(self, span: Optional[Span], awaitable):
+        """Await `awaitable` with `span` current (for coroutines handed to another loop)"""
+        token = _current_span.set(span)
+        try:
+            return await awaitable
+        finally:
+            _current_span.reset(token)
+
+    def bind(self, trace_id: str):
+        """Name the current trace after a session created inside it (e.g. by an endpoint)"""
+        span = _current_span.get()
+        if span is not None and span.trace.trace_id is None:
+            self._bind_trace(span.trace, trace_id)
+
+    def _bind_trace(self, trace: _Trace, trace_id: str):
+        with self._lock:
+            trace.trace_id = trace_id
+            pending, trace.pending = trace.pending, []
+        if pending:
+            self._write(trace_id, pending)
+
+    # ---- storage ----
+
+    def _path(self, trace_id: str) -> str:
+        return os.path.join(self.directory, re.sub(r"[^A-Za-z0-9_.-]", "_", trace_id) + ".jsonl")
+
+    def _write(self, trace_id: str, spans: List[Span]):
+        lines = "".join(json.dumps(span.to_dict(), default=str) + "\n" for span in spans)
+        try:
+            with self._lock:
+                os.makedirs(self.directory, exist_ok=True)
+                with open(self._path(trace_id), "a", encoding="utf-8") as handle:
+                    handle.write(lines)
+        except OSError as e:
+            log.warning("trace_write_failed", trace_id=trace_id, error=str(e))
+
+    def load(self, trace_id: str) -> List[Dict[str, Any]]:
+        """Every span recorded for a session (finished and still running), by start time"""
+        spans = []
+        try:
+            with open(self._path(trace_id), encoding="utf-8") as handle:
+                for line in handle:
+                    if line.strip():
+                        spans.append(json.loads(line))
+        except FileNotFoundError:
+            pass
+        with self._lock:
+            running = [span for span in self._open.values() if span.trace.trace_id == trace_id]
+        spans.extend(span.to_dict() for span in running)
+        spans.sort(key=lambda span: span["start"])
+        return spans
+
+    def clear(self, trace_id: str):
+        try:
+            os.remove(self._path(trace_id))
+        except FileNotFoundError:
+            pass
+
+    def prune(self, now: float = None) -> int:
+        """Delete expired trace files, then the oldest until the rest fit in max_bytes; returns how many were deleted"""
+        now = now if now is not None else time.time()
+        files = []
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return 0
+        for filename in names:
+            if not filename.endswith(".jsonl"):
+                continue
+            path = os.path.join(self.directory, filename)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+        with self._lock:
+            # Sessions with spans still running keep their trace whatever its age
+            active = {self._path(span.trace.trace_id) for span in self._open.values() if span.trace.trace_id}
+
+        files.sort()
+        total = sum(size for _, size, _ in files)
+        deleted = 0
+        for mtime, size, path in files:
+            if now - mtime <= self.retention_seconds and total <= self.max_bytes:
+                break
+            if path in active:
+                continue
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            deleted += 1
+        return deleted
+
+
+# Shared tracer used by the API, job workers and agents
+tracer = Tracer()
+
+
+# ---- httpx integration ----
+
+# Response bodies larger than this are not buffered for token usage
+MAX_USAGE_BODY_BYTES = 2 * 1024 * 1024
+
+
+_DECODE_ERRORS = (zlib.error, ValueError) + ((brotli.error,) if brotli is not None else ())
+
+
+def _decode_body(body: bytes, content_encoding: str) -> Optional[bytes]:
+    """Undo a response's Content-Encoding (gzip, deflate, br); None if a coding can't be decoded here"""
+    for coding in reversed([coding.strip().lower() for coding in content_encoding.split(",")]):
+        if coding in ("", "identity"):
+            continue
+        if coding in ("gzip", "x-gzip"):
+            body = zlib.decompressobj(16 + zlib.MAX_WBITS).decompress(body, MAX_USAGE_BODY_BYTES)
+        elif coding == "deflate":
+            try:
+                body = zlib.decompressobj().decompress(body, MAX_USAGE_BODY_BYTES)
+            except zlib.error:
+                # Some servers send raw deflate without the zlib header
+                body = zlib.decompressobj(-zlib.MAX_WBITS).decompress(body, MAX_USAGE_BODY_BYTES)
+        elif coding == "br" and brotli is not None:
+            body = brotli.decompress(body)
+        else:
+            return None
+    return body
+
+
+def _usage_from_body(body: bytes, content_encoding: str = "") -> Dict[str, int]:
+    """Prompt/completion tokens from an OpenAI or Anthropic JSON response body (as sent, possibly compressed)"""
+    try:
+        body = _decode_body(body, content_encoding)
+        if body is None:
+            return {}
+        usage = json.loads(body).get("usage") or {}
+    except _DECODE_ERRORS + (AttributeError,):
+        return {}
+    prompt = usage.get("prompt_tokens", usage.get("input_tokens"))
+    completion = usage.get("completion_tokens", usage.get("output_tokens"))
+    return {"prompt_tokens": prompt, "completion_tokens": completion}
+
+
+class _UsageCollector:
+    """
+    Buffers a JSON response body; when it is closed, counts the token usage
+    in llm_tokens_total and ends the request span (if any) with it.
+    """
+
+    def __init__(self, span: Optional[Span], response: httpx.Response, tracer: Tracer, provider: str, model: str):
+        self.span = span
+        self.tracer = tracer
+        self.provider = provider
+        self.model = model
+        self.parts: Optional[List[bytes]] = [] if "json" in response.headers.get("content-type", "") else None
+        # The transport sees the body as sent; the client decompresses it later
+        self.content_encoding = response.headers.get("content-encoding", "")
+        self.size = 0
+        self.closed = False
+
+    def feed(self, chunk: bytes):
+        if self.parts is not None:
+            self.size += len(chunk)
+            if self.size > MAX_USAGE_BODY_BYTES:
+                self.parts = None
+            else:
+                self.parts.append(chunk)
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        usage = _usage_from_body(b"".join(self.parts), self.content_encoding) if self.parts else {}
+        if usage:
+            record_tokens(self.provider, self.model, usage["prompt_tokens"], usage["completion_tokens"])
+        if self.span is None:
+            return
+        self.span.set(**usage)
+        parent = self.tracer.open_span(self.span.parent_id)
+        if parent is not None and parent.kind == "crew":
+            for key, value in usage.items():
+                if value:
+                    parent.add(key, value)
+        status_code = self.span.attributes.get("status_code", 0)
+        self.tracer.end_span(self.span, "error" if status_code >= 400 else "ok")
+
+
+class _TracedStream(httpx.SyncByteStream):
+
+    def __init__(self, stream, collector: _UsageCollector):
+        self._stream = stream
+        self._collector = collector
+
+    def __iter__(self):
+        for chunk in self._stream:
+            self._collector.feed(chunk)
+            yield chunk
+
+    def close(self):
+        try:
+            self._stream.close()
+        finally:
+            self._collector.close()
+
+
+class _AsyncTracedStream(httpx.AsyncByteStream):
+
+    def __init__(self, stream, collector: _UsageCollector):
+        self._stream = stream
+        self._collector = collector
+
+    async def __aiter__(self):
+        async for chunk in self._stream:
+            self._collector.feed(chunk)
+            yield chunk
+
+    async def aclose(self):
+        try:
+            await self._stream.aclose()
+        finally:
+            self._collector.close()
+
+
+def _describe(request: httpx.Request):
+    # rate_limiter imports this module for current_span, so import it lazily
+    from agents.rate_limiter import describe_request
+    provider, model, _ = describe_request(request)
+    return provider, model
+
+
+def _start_request_span(tracer: Tracer, provider: str, model: str) -> Optional[Span]:
+    """
+    Span for one HTTP request to an LLM API. Under a gateway `llm` span it is
+    one attempt of that call (the SDK retries show up as extra attempts);
+    anywhere else - crew agents calling the model through their own client -
+    the request is itself the LLM call.
+    """
+    parent = _current_span.get()
+    if parent is None:
+        return None
+    if parent.kind == "llm":
+        parent.add("http_attempts")
+        return tracer.start_span(f"{provider} attempt", "http", provider=provider, model=model)
+    parent.add("llm_requests")
+    return tracer.start_span(f"llm {model}", "llm", provider=provider, model=model)
+
+
+class TracedTransport(httpx.BaseTransport):
+    """
+    httpx transport that records a span per LLM API request and counts the
+    token usage of every JSON response (streamed calls are counted by the gateway)
+    """
+
+    def __init__(self, transport: httpx.BaseTransport, span_tracer: Tracer = None):
+        self._transport = transport
+        self._tracer = span_tracer or tracer
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        provider, model = _describe(request)
+        span = _start_request_span(self._tracer, provider, model)
+        token = _current_span.set(span) if span is not None else None
+        try:
+            response = self._transport.handle_request(request)
+        except BaseException as e:
+            self._tracer.end_span(span, "error", str(e) or type(e).__name__)
+            raise
+        finally:
+            if token is not None:
+                _current_span.reset(token)
+        if span is not None:
+            span.set(status_code=response.status_code)
+        collector = _UsageCollector(span, response, self._tracer, provider, model)
+        return httpx.Response(
+            status_code=response.status_code,
+            headers=response.headers,
+            stream=_TracedStream(response.stream, collector),
+            extensions=response.extensions
+        )
+
+    def close(self):
+        self._transport.close()
+
+
+class AsyncTracedTransport(httpx.AsyncBaseTransport):
+    """Async counterpart of TracedTransport for the gateway's SDK clients"""
+
+    def __init__(self, transport: httpx.AsyncBaseTransport, span_tracer: Tracer = None):
+        self._transport = transport
+        self._tracer = span_tracer or tracer
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        provider, model = _describe(request)
+        span = _start_request_span(self._tracer, provider, model)
+        token = _current_span.set(span) if span is not None else None
+        try:
+            response = await self._transport.handle_async_request(request)
+        except BaseException as e:
+            self._tracer.end_span(span, "error", str(e) or type(e).__name__)
+            raise
+        finally:
+            if token is not None:
+                _current_span.reset(token)
+        if span is not None:
+            span.set(status_code=response.status_code)
+        collector = _UsageCollector(span, response, self._tracer, provider, model)
+        return httpx.Response(
+            status_code=response.status_code,
+            headers=response.headers,
+            stream=_AsyncTracedStream(response.stream, collector),
+            extensions=response.extensions
+        )
+
+    async def aclose(self):
+        await self._transport.aclose()
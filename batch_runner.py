@@ -0,0 +1,280 @@
+# batch_runner.py
+# Resumable JSONL batch research - shared by POST /research/batch and the command line
+
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import re
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Tuple
+
+# Runs one record through the research pipeline and returns its result dict
+RecordRunner = Callable[[str, Dict[str, Any]], Awaitable[Dict[str, Any]]]
+
+DEFAULT_BATCH_DIR = os.getenv("BATCH_REPORTS_DIR", "reports/batches")
+
+# Record and batch ids become file and directory names, so only these characters are accepted
+ID_PATTERN = re.compile(r"[A-Za-z0-9_.-]{1,128}")
+
+
+def valid_id(value: str) -> bool:
+    """Safe as a file or directory name: ID_PATTERN and not just dots ("." / "..")"""
+    return bool(ID_PATTERN.fullmatch(value)) and value.strip(".") != ""
+
+
+def record_id_for(record: Dict[str, Any]) -> str:
+    """Stable id per record (explicit "id" field, else a content hash) so resumes line up"""
+    if record.get("id"):
+        return str(record["id"])
+    payload = json.dumps(record, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+def parse_jsonl(text: str) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """
+    Parse JSONL business contexts. Returns (records, errors); each record
+    needs a non-empty comprehensive_context, optional use_cache and id.
+    """
+    records, errors = [], []
+    seen = set()
+    for line_number, line in enumerate(text.splitlines(), start=1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            errors.append({"line": line_number, "error": f"Invalid JSON: {e}"})
+            continue
+        if not isinstance(record, dict) or not str(record.get("comprehensive_context", "")).strip():
+            errors.append({"line": line_number, "error": "Missing comprehensive_context"})
+            continue
+        record_id = record_id_for(record)
+        if not valid_id(record_id):
+            errors.append({"line": line_number,
+                           "error": "Invalid id: use 1-128 letters, digits, '_', '.' or '-'"})
+            continue
+        if record_id in seen:
+            errors.append({"line": line_number, "error": f"Duplicate record {record_id}"})
+            continue
+        seen.add(record_id)
+        records.append(dict(record, id=record_id))
+    return records, errors
+
+
+def canonical_records(records: List[Dict[str, Any]]) -> str:
+    """Order-independent serialization of a batch's full record contents"""
+    return "\n".join(sorted(json.dumps(record, sort_keys=True) for record in records))
+
+
+def batch_id_for(records: List[Dict[str, Any]]) -> str:
+    """
+    Same input -> same batch id, so resubmitting a file resumes it. The whole
+    record content is hashed, so editing a context under the same ids is a new batch.
+    """
+    digest = hashlib.sha256(canonical_records(records).encode("utf-8"))
+    return f"batch_{digest.hexdigest()[:16]}"
+
+
+class BatchInputMismatch(ValueError):
+    """Records submitted under a batch id whose stored input.jsonl holds different records"""
+
+
+class BatchRunner:
+    """
+    Runs a batch of records with bounded concurrency.
+
+    Layout under <output_dir>/<batch_id>/:
+      input.jsonl       the records (written once, used to resume)
+      checkpoint.jsonl  one line appended per finished record
+      results/<id>.json result per record
+      summary.json      counts, rewritten after every record
+
+    Completed records found in the checkpoint are skipped, so an interrupted
+    batch picks up where it stopped; failed records are retried.
+    """
+
+    def __init__(self, batch_id: str, run_record: RecordRunner, output_dir: str = None,
+                 max_concurrency: int = None):
+        if not valid_id(batch_id):
+            raise ValueError(f"Invalid batch id: {batch_id!r}")
+        self.batch_id = batch_id
+        self.run_record = run_record
+        self.directory = os.path.join(output_dir or DEFAULT_BATCH_DIR, batch_id)
+        self.max_concurrency = max_concurrency or int(os.getenv("BATCH_CONCURRENCY", "2"))
+        self._lock = asyncio.Lock()
+
+    # ---- paths ----
+
+    @property
+    def input_path(self) -> str:
+        return os.path.join(self.directory, "input.jsonl")
+
+    @property
+    def checkpoint_path(self) -> str:
+        return os.path.join(self.directory, "checkpoint.jsonl")
+
+    @property
+    def summary_path(self) -> str:
+        return os.path.join(self.directory, "summary.json")
+
+    def result_path(self, record_id: str) -> str:
+        return os.path.join(self.directory, "results", f"{record_id}.json")
+
+    # ---- state ----
+
+    def save_input(self, records: List[Dict[str, Any]]):
+        """Store the batch's records once; a resubmission must match them (BatchInputMismatch otherwise)"""
+        os.makedirs(self.directory, exist_ok=True)
+        if os.path.exists(self.input_path):
+            if canonical_records(self.load_input()) != canonical_records(records):
+                raise BatchInputMismatch(
+                    f"Batch {self.batch_id} already exists with different records; use a new batch id"
+                )
+            return
+        tmp_path = f"{self.input_path}.tmp"
+        with open(tmp_path, "w") as f:
+            for record in records:
+                f.write(json.dumps(record) + "\n")
+        os.replace(tmp_path, self.input_path)
+
+    def load_input(self) -> List[Dict[str, Any]]:
+        with open(self.input_path, "r") as f:
+            records, _ = parse_jsonl(f.read())
+        return records
+
+    def load_checkpoint(self) -> Dict[str, Dict[str, Any]]:
+        """Latest checkpoint entry per record id (a torn final line is ignored)"""
+        entries = {}
+        if os.path.exists(self.checkpoint_path):
+            with open(self.checkpoint_path, "r") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue
+                    entries[entry["record_id"]] = entry
+        return entries
+
+    def progress(self) -> Dict[str, Any]:
+        if os.path.exists(self.summary_path):
+            with open(self.summary_path, "r") as f:
+                return json.load(f)
+        return {"batch_id": self.batch_id, "status": "unknown"}
+
+    async def _record_finished(self, entry: Dict[str, Any], result: Dict[str, Any], summary: Dict[str, Any]):
+        os.makedirs(os.path.dirname(self.result_path(entry["record_id"])), exist_ok=True)
+        tmp_path = f"{self.result_path(entry['record_id'])}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(result, f, indent=2, default=str)
+        os.replace(tmp_path, self.result_path(entry["record_id"]))
+
+        async with self._lock:
+            # Append + fsync so a crash never loses a record that was reported done
+            with open(self.checkpoint_path, "a") as f:
+                f.write(json.dumps(entry) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            summary[entry["status"]] = summary.get(entry["status"], 0) + 1
+            summary["pending"] -= 1
+            summary["updated_at"] = datetime.now().isoformat()
+            self._write_summary(summary)
+
+    def _write_summary(self, summary: Dict[str, Any]):
+        tmp_path = f"{self.summary_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(summary, f, indent=2)
+        os.replace(tmp_path, self.summary_path)
+
+    # ---- execution ----
+
+    async def run(self, records: List[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Run (or resume) the batch; returns the final summary"""
+        if records is not None:
+            self.save_input(records)
+        records = self.load_input()
+
+        done = {
+            record_id for record_id, entry in self.load_checkpoint().items()
+            if entry["status"] == "completed"
+        }
+        todo = [record for record in records if record["id"] not in done]
+
+        summary = {
+            "batch_id": self.batch_id,
+            "status": "running",
+            "total": len(records),
+            "completed": len(done),
+            "failed": 0,
+            "pending": len(todo),
+            "resumed": bool(done),
+            "started_at": datetime.now().isoformat(),
+            "results_dir": os.path.join(self.directory, "results")
+        }
+        self._write_summary(summary)
+        print(f"📦 Batch {self.batch_id}: {len(todo)} to run, {len(done)} already done "
+              f"(max {self.max_concurrency} concurrent)")
+
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def _run_one(record):
+            async with semaphore:
+                started = datetime.now()
+                try:
+                    result = await self.run_record(record["id"], record)
+                    status = "completed" if result.get("status") == "completed" else "failed"
+                except Exception as e:
+                    result = {"status": "error", "error": str(e)}
+                    status = "failed"
+                entry = {
+                    "record_id": record["id"],
+                    "status": status,
+                    "session_id": result.get("session_id"),
+                    "error": result.get("error"),
+                    "duration_seconds": round((datetime.now() - started).total_seconds(), 3),
+                    "finished_at": datetime.now().isoformat()
+                }
+                await self._record_finished(entry, result, summary)
+                print(f"{'✅' if status == 'completed' else '❌'} Batch {self.batch_id} record {record['id']}: {status}")
+
+        await asyncio.gather(*(_run_one(record) for record in todo))
+
+        summary["status"] = "completed" if summary["failed"] == 0 else "completed_with_errors"
+        summary["finished_at"] = datetime.now().isoformat()
+        self._write_summary(summary)
+        return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run context analysis for every business context in a JSONL file")
+    parser.add_argument("input", help="JSONL file, one {\"comprehensive_context\": ...} record per line")
+    parser.add_argument("--batch-id", help="Resume or name a batch (default: derived from the input records)")
+    parser.add_argument("--output-dir", default=DEFAULT_BATCH_DIR, help="Directory for batch results")
+    parser.add_argument("--concurrency", type=int, default=None, help="Records processed at once")
+    args = parser.parse_args()
+    if args.batch_id and not valid_id(args.batch_id):
+        parser.error("--batch-id: use 1-128 letters, digits, '_', '.' or '-'")
+
+    with open(args.input, "r") as f:
+        records, errors = parse_jsonl(f.read())
+    for error in errors:
+        print(f"⚠️ Line {error['line']}: {error['error']}")
+    if not records:
+        raise SystemExit("No valid records to process")
+
+    # Imported here so argument errors don't pay for loading the agent stack
+    from main import run_batch_record
+
+    batch_id = args.batch_id or batch_id_for(records)
+    runner = BatchRunner(batch_id, run_batch_record, args.output_dir, args.concurrency)
+    try:
+        runner.save_input(records)
+    except BatchInputMismatch as e:
+        raise SystemExit(str(e))
+    summary = asyncio.run(runner.run())
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    main()
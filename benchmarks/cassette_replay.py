@@ -0,0 +1,146 @@
+# cassette_replay.py
+# Replay a recorded LLM cassette through the comprehensive research pipeline at several speeds
+#
+# Record (real API calls, LLM_BACKEND=record), either from the server or with this script:
+#     LLM_BACKEND=record LLM_CASSETTE_PATH=data/cassettes/advisors.jsonl uvicorn main:app
+#     python -m benchmarks.cassette_replay --record --cassette data/cassettes/advisors.jsonl --context-file context.txt
+# Replay offline (no API keys, no tokens spent):
+#     python -m benchmarks.cassette_replay --cassette data/cassettes/advisors.jsonl --context-file context.txt
+#         [--session SESSION_ID] [--speeds 1,10,0] [--outputs data/cassettes/advisors.outputs.json]
+#
+# Speed 1 replays every LLM call at its recorded latency (realistic wall-clock), higher speeds
+# compress it, and 0 removes it entirely - what remains is orchestration overhead (crewai,
+# langchain, coordinator). Replays are offline: any connection that leaves the machine is blocked.
+# Exits 1 when a request was never recorded (a prompt, model or option changed), when anything
+# tried to reach the network, or when the pipeline output differs from the saved outputs.
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+
+def configure_environment(args):
+    """Cassette backend and throwaway storage - must run before any app import"""
+    scratch = tempfile.mkdtemp(prefix="cassette_replay_")
+    os.environ["LLM_BACKEND"] = "record" if args.record else "replay"
+    os.environ["LLM_CASSETTE_PATH"] = args.cassette
+    # Every call must reach the cassette, not a response cached by an earlier speed
+    os.environ["LLM_CACHE_ENABLED"] = "false"
+    os.environ["LLM_CACHE_DIR"] = os.path.join(scratch, "llm_cache")
+    os.environ["TRACE_DIR"] = os.path.join(scratch, "traces")
+    return scratch
+
+
+def load_context(args) -> str:
+    if args.context_file:
+        with open(args.context_file, encoding="utf-8") as f:
+            return f.read()
+    from session_store import create_session_store
+    session = create_session_store().get(args.session)
+    if session is None:
+        sys.exit(f"Session {args.session} not found in {os.getenv('SESSION_DB_PATH', 'data/research.db')}")
+    return session["business_context"]["comprehensive_context"]
+
+
+# Parts of the pipeline result that change on every run regardless of the LLM outputs
+VOLATILE_KEYS = ("timestamp", "stage_timings")
+
+
+def canonical(result) -> str:
+    if isinstance(result, dict):
+        result = {key: value for key, value in result.items() if key not in VOLATILE_KEYS}
+    return json.dumps(result, sort_keys=True, default=str, indent=2)
+
+
+def differing_keys(expected: dict, actual: dict) -> list:
+    keys = set(expected) | set(actual)
+    return sorted(key for key in keys if canonical(expected.get(key)) != canonical(actual.get(key)))
+
+
+def run_once(context: str, speed: float = None):
+    """(result, wall seconds, cassette stats) for one pipeline run on a fresh gateway"""
+    from agents.avatar_agnostic_coordinator import run_comprehensive_research
+    from agents.llm_gateway import llm_gateway
+
+    if speed is not None:
+        os.environ["LLM_REPLAY_SPEED"] = str(speed)
+    # Drop the previous run's clients so the cassette and speed are picked up afresh
+    llm_gateway.close()
+    started = time.perf_counter()
+    result = run_comprehensive_research(context)
+    elapsed = time.perf_counter() - started
+    backend = llm_gateway.backend_stats()
+    stats = dict(backend.get("cassette", {}), network_blocked=backend.get("network_blocked", 0))
+    return result, elapsed, stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--cassette", required=True, help="Cassette file (or directory of .jsonl cassettes)")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--context-file", help="Business context the cassette was recorded with")
+    source.add_argument("--session", help="Take the business context from this stored session")
+    parser.add_argument("--record", action="store_true", help="Record a new cassette with real API calls")
+    parser.add_argument("--speeds", default="1,10,0", help="Comma-separated replay speeds (0 = no waiting)")
+    parser.add_argument("--outputs", help="Pipeline output to compare against (written if missing)")
+    args = parser.parse_args()
+
+    configure_environment(args)
+    context = load_context(args)
+    outputs_path = args.outputs or os.path.splitext(args.cassette.rstrip("/"))[0] + ".outputs.json"
+
+    if args.record:
+        result, elapsed, stats = run_once(context)
+        with open(outputs_path, "w", encoding="utf-8") as f:
+            f.write(canonical(result))
+        print(f"\n📼 Recorded {stats.get('recorded', 0)} LLM exchanges to {args.cassette} in {elapsed:.1f}s")
+        print(f"💾 Pipeline output written to {outputs_path}")
+        return 0
+
+    from agents.llm_cassette import network_guard
+    # Before the first pipeline import, so agent setup can't reach the network either
+    network_guard.install()
+
+    expected = None
+    if os.path.exists(outputs_path):
+        with open(outputs_path, encoding="utf-8") as f:
+            expected = json.load(f)
+
+    failed = False
+    rows = []
+    for speed in (float(value) for value in args.speeds.split(",")):
+        print(f"⏱️ Replaying at speed {speed:g}")
+        result, elapsed, stats = run_once(context, speed)
+        rows.append((speed, elapsed, stats))
+        if stats.get("misses") or stats.get("network_blocked"):
+            failed = True
+        actual = json.loads(canonical(result))
+        if expected is None:
+            with open(outputs_path, "w", encoding="utf-8") as f:
+                f.write(canonical(result))
+            print(f"💾 Pipeline output written to {outputs_path}")
+            expected = actual
+        elif actual != expected:
+            failed = True
+            changed = differing_keys(expected, actual) if isinstance(expected, dict) and isinstance(actual, dict) else ["(result)"]
+            print(f"❌ Output differs from {outputs_path}: {', '.join(changed)}")
+
+    print(f"\n{'speed':>6} {'wall s':>9} {'hits':>6} {'misses':>7} {'unused':>7} {'blocked':>8}")
+    for speed, elapsed, stats in rows:
+        print(f"{speed:>6g} {elapsed:>9.2f} {stats.get('hits', 0):>6} {stats.get('misses', 0):>7} "
+              f"{stats.get('unused', 0):>7} {stats.get('network_blocked', 0):>8}")
+    if rows:
+        print(f"\nRecorded LLM time in cassette: {rows[0][2].get('recorded_llm_seconds', 0)}s")
+
+    if failed:
+        print("\n❌ Replay diverged from the recording or reached the network")
+        return 1
+    print("\n✅ Every request replayed from the cassette with unchanged output")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
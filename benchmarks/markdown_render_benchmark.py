@@ -0,0 +1,89 @@
+# markdown_render_benchmark.py
+# Single-pass markdown renderer vs. the old re.sub chain, on deep intelligence reports of growing size
+#
+# Run from the repo root:  python -m benchmarks.markdown_render_benchmark [--repeat 20]
+
+import argparse
+import re
+import time
+import tracemalloc
+
+from deep_intelligence_formatter import format_deep_intelligence_report
+from markdown_renderer import render_markdown
+
+
+def legacy_markdown_to_html(markdown_content: str) -> str:
+    """The conversion deep_psychology_to_html used before the single-pass renderer"""
+    html_content = markdown_content
+    html_content = re.sub(r'^# (.+)$', r'<h1>\1</h1>', html_content, flags=re.MULTILINE)
+    html_content = re.sub(r'^## (.+)$', r'<h2>\1</h2>', html_content, flags=re.MULTILINE)
+    html_content = re.sub(r'^### (.+)$', r'<h3>\1</h3>', html_content, flags=re.MULTILINE)
+    html_content = re.sub(r'\*\*(.+?)\*\*', r'<strong>\1</strong>', html_content)
+    html_content = re.sub(r'\*(.+?)\*', r'<em>\1</em>', html_content)
+    html_content = re.sub(r'^- (.+)$', r'<li>\1</li>', html_content, flags=re.MULTILINE)
+    html_content = re.sub(r'^> (.+)$', r'<blockquote class="customer-voice">\1</blockquote>', html_content, flags=re.MULTILINE)
+    html_content = html_content.replace('\n\n', '</p><p>')
+    html_content = html_content.replace('\n', '<br>')
+    return f'<p>{html_content}</p>'
+
+
+SAMPLE_CONTEXT = """COMPANY NAME: Benchmark Advisors
+TARGET CUSTOMER: Mid-career financial advisors
+"""
+
+SAMPLE_RESEARCH = """
+Advisors feel *trapped* between commission targets and **client trust**.
+> "I tell clients to save while I worry about my own mortgage."
+- Pain: unpredictable income
+- Pain: compliance overhead
+- Desire: fee-only independence
+"""
+
+
+def build_report(scale: int) -> str:
+    """A formatter-generated report padded with `scale` copies of research-style sections"""
+    session_data = {
+        "session_id": "benchmark",
+        "business_context": {"comprehensive_context": SAMPLE_CONTEXT},
+        "agent_results": {"comprehensive_research": SAMPLE_RESEARCH * scale},
+        "created_at": "2025-01-01T00:00:00"
+    }
+    report = format_deep_intelligence_report(session_data)
+    sections = "".join(
+        f"\n## Segment {i}\n\n### Findings\n{SAMPLE_RESEARCH}\n1. First test\n2. Second test\n\n---\n"
+        for i in range(scale)
+    )
+    return report + sections
+
+
+def measure(fn, text: str, repeat: int):
+    fn(text)  # warm regex caches
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn(text)
+    per_call = (time.perf_counter() - started) / repeat
+
+    tracemalloc.start()
+    fn(text)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return per_call, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--scales", default="1,10,100,1000", help="Comma-separated report sizes")
+    args = parser.parse_args()
+
+    print(f"{'size':>10} {'legacy ms':>11} {'single-pass ms':>15} {'speedup':>8} {'legacy peak KB':>15} {'new peak KB':>12}")
+    for scale in (int(value) for value in args.scales.split(",")):
+        report = build_report(scale)
+        legacy_time, legacy_peak = measure(legacy_markdown_to_html, report, args.repeat)
+        new_time, new_peak = measure(render_markdown, report, args.repeat)
+        print(f"{len(report):>10} {legacy_time * 1000:>11.2f} {new_time * 1000:>15.2f} "
+              f"{legacy_time / new_time:>7.2f}x {legacy_peak / 1024:>15.0f} {new_peak / 1024:>12.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,334 @@
+# pipeline_benchmark.py
+# End-to-end pipeline benchmark on the fake LLM backend - throughput, latency percentiles and peak RSS per concurrency
+#
+# Run from the repo root:  python -m benchmarks.pipeline_benchmark [--concurrency 1,4,16] [--requests 16]
+#                          [--time-scale 0.1] [--scenarios coordinator,conversion,context_analysis,comprehensive_analysis]
+#                          [--baseline benchmarks/pipeline_baseline.json] [--tolerance 0.2] [--update-baseline]
+#
+# Every LLM call - direct gateway calls and crew agents alike - goes to agents.fake_llm
+# (LLM_BACKEND=fake), so runs need no API keys and the simulated latencies are the same on
+# every run. Exits 1 when a scenario regresses past the tolerance against the checked-in
+# baseline, or when the baseline is missing or was recorded with other --time-scale /
+# --requests settings; --update-baseline records a new one, along with the environment
+# (Python, CPUs, crewai version, provider quotas) it was recorded in.
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import resource
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from importlib.metadata import PackageNotFoundError, version
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), "pipeline_baseline.json")
+SCENARIOS = ("coordinator", "conversion", "context_analysis", "comprehensive_analysis")
+FINISHED_STATUSES = ("completed", "error", "cancelled")
+BENCHMARK_RPM = 1000000
+BENCHMARK_TPM = 100000000
+
+SAMPLE_CONTEXT = """COMPANY NAME: Benchmark Advisors {token}
+TARGET CUSTOMER: Mid-career financial advisors at captive broker-dealers
+PRODUCT: Transition coaching program for advisors going independent
+PRICE POINT: $4,500 one-time
+MAIN PAIN POINTS: Commission pressure, compliance overhead, fear of losing clients
+DESIRED OUTCOMES: Fee-only independence with an intact book of business
+"""
+
+
+def configure_environment(args):
+    """Point the app at the fake backend and throwaway storage - must run before any app import"""
+    scratch = tempfile.mkdtemp(prefix="pipeline_benchmark_")
+    os.environ["LLM_BACKEND"] = "fake"
+    os.environ["FAKE_LLM_TIME_SCALE"] = str(args.time_scale)
+    os.environ["LLM_CACHE_ENABLED"] = "false"
+    # crewai/OpenTelemetry exporters would add network calls to every crew run
+    os.environ["CREWAI_DISABLE_TELEMETRY"] = "true"
+    os.environ["OTEL_SDK_DISABLED"] = "true"
+    os.environ["AGENT_WARMUP"] = "false"
+    os.environ["RESUME_INTERRUPTED_SESSIONS"] = "false"
+    os.environ["RENDER_REPORTS_ON_COMPLETION"] = "false"
+    # The limiter stays on, but with quotas the fake provider doesn't have: the default
+    # openai tier (200k TPM, charged prompt + max_tokens per call) drains after ~40 calls
+    # and then every scenario measures the token bucket instead of the pipeline
+    for provider in ("OPENAI", "ANTHROPIC"):
+        os.environ[f"{provider}_RPM"] = str(BENCHMARK_RPM)
+        os.environ[f"{provider}_TPM"] = str(BENCHMARK_TPM)
+    os.environ.setdefault("RESEARCH_WORKERS", str(max(args.concurrency)))
+    os.environ["SESSION_DB_PATH"] = os.path.join(scratch, "research.db")
+    os.environ["LLM_CACHE_DIR"] = os.path.join(scratch, "llm_cache")
+    os.environ["TRACE_DIR"] = os.path.join(scratch, "traces")
+    os.environ["REPORTS_DIR"] = os.path.join(scratch, "reports")
+    return scratch
+
+
+def unique_context() -> str:
+    # A distinct context per request, so identical submissions are never coalesced into one run
+    return SAMPLE_CONTEXT.format(token=uuid.uuid4().hex[:8])
+
+
+def percentile(values, fraction: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def current_rss_mb() -> float:
+    """Resident set size right now (Linux /proc); None where it can't be read"""
+    try:
+        with open("/proc/self/statm") as f:
+            resident_pages = int(f.read().split()[1])
+    except (OSError, IndexError, ValueError):
+        return None
+    return resident_pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+
+
+class RssSampler:
+    """
+    Peak RSS while one scenario runs, sampled every `interval` seconds.
+    ru_maxrss is the high-water mark of the whole process, which every later
+    scenario would just repeat; it is only the fallback where /proc is missing.
+    """
+
+    def __init__(self, interval: float = 0.05):
+        self.interval = interval
+        self.peak = current_rss_mb()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._sample, name="rss-sampler", daemon=True)
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, current_rss_mb())
+
+    def __enter__(self):
+        if self.peak is not None:
+            self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join()
+            self.peak = max(self.peak, current_rss_mb())
+
+    def peak_mb(self) -> float:
+        if self.peak is not None:
+            return round(self.peak, 1)
+        # ru_maxrss is KB on Linux, bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def summarize(latencies, elapsed: float, errors: int, peak_rss_mb: float) -> dict:
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "throughput_per_second": round(len(latencies) / elapsed, 3),
+        "p50_seconds": round(percentile(latencies, 0.50), 3),
+        "p95_seconds": round(percentile(latencies, 0.95), 3),
+        "p99_seconds": round(percentile(latencies, 0.99), 3),
+        "peak_rss_mb": peak_rss_mb
+    }
+
+
+def run_threaded(call, concurrency: int, requests: int) -> dict:
+    """`requests` calls of `call()` on `concurrency` threads"""
+    def timed():
+        started = time.perf_counter()
+        try:
+            call()
+            failed = False
+        except Exception as e:
+            print(f"⚠️ Benchmark request failed: {e}")
+            failed = True
+        return time.perf_counter() - started, failed
+
+    started = time.perf_counter()
+    with RssSampler() as rss, ThreadPoolExecutor(max_workers=concurrency) as pool:
+        outcomes = list(pool.map(lambda _: timed(), range(requests)))
+    elapsed = time.perf_counter() - started
+    return summarize([latency for latency, _ in outcomes], elapsed, sum(failed for _, failed in outcomes), rss.peak_mb())
+
+
+async def run_http(submit, concurrency: int, requests: int) -> dict:
+    """`requests` submissions through `submit()` with at most `concurrency` in flight"""
+    gate = asyncio.Semaphore(concurrency)
+
+    async def timed():
+        async with gate:
+            started = time.perf_counter()
+            try:
+                failed = not await submit()
+            except Exception as e:
+                print(f"⚠️ Benchmark request failed: {e}")
+                failed = True
+            return time.perf_counter() - started, failed
+
+    started = time.perf_counter()
+    with RssSampler() as rss:
+        outcomes = await asyncio.gather(*(timed() for _ in range(requests)))
+    elapsed = time.perf_counter() - started
+    return summarize([latency for latency, _ in outcomes], elapsed, sum(failed for _, failed in outcomes), rss.peak_mb())
+
+
+async def benchmark_endpoints(scenarios, concurrency_levels, requests: int) -> dict:
+    import httpx
+    import main as app_module
+
+    async def context_analysis(client) -> bool:
+        submitted = await client.post("/research/context-analysis",
+                                      json={"comprehensive_context": unique_context(), "use_cache": False})
+        session_id = submitted.json()["session_id"]
+        while True:
+            results = (await client.get(f"/research/{session_id}/results")).json()
+            if results["status"] in FINISHED_STATUSES:
+                return results["status"] == "completed"
+            await asyncio.sleep(0.05)
+
+    async def comprehensive_analysis(client) -> bool:
+        response = await client.post("/research/comprehensive-analysis",
+                                     json={"comprehensive_context": unique_context(), "use_cache": False})
+        return response.json().get("status") == "completed"
+
+    submitters = {"context_analysis": context_analysis, "comprehensive_analysis": comprehensive_analysis}
+    results = {}
+    await app_module.start_job_workers()
+    try:
+        transport = httpx.ASGITransport(app=app_module.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=None) as client:
+            for scenario in scenarios:
+                for concurrency in concurrency_levels:
+                    print(f"⏱️ {scenario} x{requests} at concurrency {concurrency}")
+                    results[f"{scenario}@{concurrency}"] = await run_http(
+                        lambda: submitters[scenario](client), concurrency, requests
+                    )
+    finally:
+        await app_module.stop_job_workers()
+    return results
+
+
+def benchmark_functions(scenarios, concurrency_levels, requests: int) -> dict:
+    from agents.avatar_agnostic_coordinator import run_comprehensive_research
+    from agents.conversion_copy_agent import generate_tactical_conversion_assets
+    from agents.fake_llm import ICP_MARKDOWN, INTERVIEW_MARKDOWN, STRATEGY_MARKDOWN
+
+    research_data = "\n\n".join((ICP_MARKDOWN, INTERVIEW_MARKDOWN, STRATEGY_MARKDOWN))
+    calls = {
+        "coordinator": lambda: run_comprehensive_research(unique_context()),
+        "conversion": lambda: generate_tactical_conversion_assets(research_data, unique_context())
+    }
+    results = {}
+    for scenario in scenarios:
+        for concurrency in concurrency_levels:
+            print(f"⏱️ {scenario} x{requests} at concurrency {concurrency}")
+            results[f"{scenario}@{concurrency}"] = run_threaded(calls[scenario], concurrency, requests)
+    return results
+
+
+def environment() -> dict:
+    """What a baseline was recorded on - numbers only compare across matching environments"""
+    try:
+        crewai_version = version("crewai")
+    except PackageNotFoundError:
+        crewai_version = None
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "crewai": crewai_version,
+        "llm_backend": os.environ["LLM_BACKEND"],
+        "research_workers": int(os.environ["RESEARCH_WORKERS"]),
+        "provider_rpm": BENCHMARK_RPM,
+        "provider_tpm": BENCHMARK_TPM
+    }
+
+
+def regressions(results: dict, baseline: dict, tolerance: float) -> list:
+    """Human-readable lines for every metric worse than baseline by more than `tolerance`"""
+    found = []
+    for key, current in results.items():
+        previous = baseline.get(key)
+        if previous is None:
+            continue
+        if current["throughput_per_second"] < previous["throughput_per_second"] * (1 - tolerance):
+            found.append(f"{key}: throughput {current['throughput_per_second']}/s < baseline {previous['throughput_per_second']}/s")
+        for metric in ("p50_seconds", "p95_seconds", "p99_seconds", "peak_rss_mb"):
+            if current[metric] > previous[metric] * (1 + tolerance):
+                found.append(f"{key}: {metric} {current[metric]} > baseline {previous[metric]}")
+        if current["errors"] > previous["errors"]:
+            found.append(f"{key}: {current['errors']} errors (baseline {previous['errors']})")
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--concurrency", default="1,4,16", help="Comma-separated concurrency levels")
+    parser.add_argument("--requests", type=int, default=16, help="Requests per scenario and concurrency level")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--time-scale", type=float, default=0.1,
+                        help="Multiplier on the fake backend's simulated latencies (1.0 = realistic)")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative regression (0.2 = 20%%)")
+    parser.add_argument("--update-baseline", action="store_true", help="Overwrite the baseline with this run")
+    args = parser.parse_args()
+    args.concurrency = [int(level) for level in args.concurrency.split(",")]
+    scenarios = [scenario for scenario in args.scenarios.split(",") if scenario]
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+
+    if not args.update_baseline and not os.path.exists(args.baseline):
+        print(f"❌ Baseline {args.baseline} not found; record one with --update-baseline")
+        return 1
+
+    scratch = configure_environment(args)
+    print(f"📁 Scratch storage: {scratch}")
+
+    results = benchmark_functions([s for s in scenarios if s in ("coordinator", "conversion")],
+                                  args.concurrency, args.requests)
+    endpoint_scenarios = [s for s in scenarios if s in ("context_analysis", "comprehensive_analysis")]
+    if endpoint_scenarios:
+        results.update(asyncio.run(benchmark_endpoints(endpoint_scenarios, args.concurrency, args.requests)))
+
+    print(f"\n{'scenario':<32} {'req/s':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'rss MB':>8} {'errors':>7}")
+    for key, result in results.items():
+        print(f"{key:<32} {result['throughput_per_second']:>8} {result['p50_seconds']:>8} {result['p95_seconds']:>8} "
+              f"{result['p99_seconds']:>8} {result['peak_rss_mb']:>8} {result['errors']:>7}")
+
+    recorded = {"time_scale": args.time_scale, "requests": args.requests,
+                "environment": environment(), "results": results}
+    if args.update_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(recorded, f, indent=2)
+        print(f"\n💾 Baseline written to {args.baseline}")
+        return 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    if (baseline.get("time_scale"), baseline.get("requests")) != (args.time_scale, args.requests):
+        print(f"\n❌ Baseline was recorded with time_scale={baseline.get('time_scale')}, "
+              f"requests={baseline.get('requests')}; not comparable with this run "
+              f"(match them, or record a baseline for these settings with --update-baseline)")
+        return 1
+    recorded_cpus = baseline.get("environment", {}).get("cpu_count")
+    if recorded_cpus is not None and recorded_cpus != os.cpu_count():
+        print(f"\n⚠️ Baseline was recorded on {recorded_cpus} CPU(s), this machine has {os.cpu_count()}; "
+              f"throughput differences may be the hardware")
+
+    found = regressions(results, baseline.get("results", {}), args.tolerance)
+    if found:
+        print(f"\n❌ {len(found)} regression(s) beyond {args.tolerance:.0%}:")
+        for line in found:
+            print(f"   {line}")
+        return 1
+    print(f"\n✅ No regressions beyond {args.tolerance:.0%} against {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
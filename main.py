@@ -1,12 +1,39 @@
-from fastapi.responses import HTMLResponse
-from fastapi import FastAPI, HTTPException
+from fastapi.responses import HTMLResponse, JSONResponse, PlainTextResponse, StreamingResponse
+from fastapi import FastAPI, Header, HTTPException, Request
 from pydantic import BaseModel
+import asyncio
+import importlib.util
 import os
+import socket
+import time
+import uuid
 from typing import Dict, Any, Optional
 import json
 import re  # ADD THIS MISSING IMPORT
 from datetime import datetime, timedelta
+from urllib.parse import quote
 from deep_intelligence_formatter import format_deep_intelligence_report
+from research_jobs import research_job_queue, BATCH_LANE, INTERACTIVE_LANE
+from research_events import TERMINAL_EVENTS, research_events, format_sse
+from session_store import create_session_store, new_session_id, session_cursor
+from report_catalog import ReportCatalog
+from batch_runner import BatchInputMismatch, BatchRunner, batch_id_for, parse_jsonl
+from static_pages import static_pages
+from render_cache import FallbackRender, render_cache
+from markdown_renderer import iter_markdown_html
+from trace_waterfall import render_waterfall, summarize
+from agents.llm_gateway import DEFAULT_CLAUDE_MODEL, llm_gateway
+from agents.rate_limiter import low_priority, rate_limiter
+from agents.llm_cache import llm_cache, cache_scope
+from agents.context_budget import budget_sections, render_value
+from agents.run_control import RunCancelled, RunControl, active_runs, current_run, run_scope
+from agents.checkpoints import checkpoint_scope, restore_stage, save_stage
+from agents.registry import agent_registry
+from agents.tracing import tracer
+from agents.agent_logging import agent_chatter
+from agents.metrics import HTTP_REQUEST_SECONDS, HTTP_REQUESTS, STAGE_SECONDS, metrics, single
+from stage_checkpoints import StageCheckpointStore
+from request_coalescing import RequestCoalescer, context_fingerprint
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -17,11 +44,10 @@ ANTHROPIC_API_KEY = os.getenv("ANTHROPIC_API_KEY")
 USE_CLAUDE = bool(ANTHROPIC_API_KEY)
 
 if USE_CLAUDE:
-    try:
-        import anthropic
-        claude_client = anthropic.Anthropic(api_key=ANTHROPIC_API_KEY)
+    # Only check the SDK is installed here; it is imported by the gateway / warm-up
+    if importlib.util.find_spec("anthropic") is not None:
         print("✅ Claude API initialized for premium research quality")
-    except ImportError:
+    else:
         print("⚠️ Anthropic package not installed. Run: pip install anthropic")
         USE_CLAUDE = False
 else:
@@ -143,62 +169,307 @@ Synthesize the most critical findings into a structured format including:
 * Competitive Landscape
 """
 
-# Agent imports
-AGENTS_AVAILABLE = False
-agent_function = None
-
-try:
-    from agents.icp_intelligence_agent import run_reasoning_icp_research
-    agent_function = run_reasoning_icp_research
-    AGENTS_AVAILABLE = True
-    print("✅ Successfully imported run_reasoning_icp_research")
-except ImportError:
-    try:
-        from agents.icp_intelligence_agent import reasoning_agent_call
-        agent_function = reasoning_agent_call
-        AGENTS_AVAILABLE = True
-        print("✅ Successfully imported reasoning_agent_call")
-    except ImportError as e:
-        print(f"❌ Agent import failed: {e}")
-        AGENTS_AVAILABLE = False
-        
-        def agent_function(context):
-            return {
-                "error": "Agent system not available",
-                "message": "Please check agent imports",
-                "context_received": True
-            }
+# Agent entry points are imported lazily through the registry (and warmed up
+# in the background after startup), so the app starts serving immediately
+def agent_flag(name: str):
+    """Agent availability without triggering an import: True/False, or None while not loaded yet"""
+    return agent_registry.available(name)
 
-# Try to import interview agent
-try:
-    from agents.dynamic_interview_agent import dynamic_interview_intelligence
-    interview_agent = dynamic_interview_intelligence
-    INTERVIEW_AGENT_AVAILABLE = True
-    print("✅ Successfully imported dynamic_interview_intelligence")
-except ImportError:
-    print("⚠️ Interview agent not available")
-    INTERVIEW_AGENT_AVAILABLE = False
-    interview_agent = None
-
-# Try to import comprehensive coordinator
-try:
-    from agents.avatar_agnostic_coordinator import run_comprehensive_research
-    comprehensive_agent = run_comprehensive_research
-    COMPREHENSIVE_AGENT_AVAILABLE = True
-    print("✅ Successfully imported comprehensive coordinator")
-except ImportError:
-    print("⚠️ Comprehensive coordinator not available")
-    COMPREHENSIVE_AGENT_AVAILABLE = False
-    comprehensive_agent = None
+async def load_agent(name: str):
+    """Resolve an agent entry point off the event loop (imports it on first use)"""
+    if agent_registry.is_loaded(name):
+        return agent_registry.get(name)
+    return await asyncio.to_thread(agent_registry.get, name)
 
 app = FastAPI(title="Market Research Agent Team", version="3.0.0")
 
+@app.middleware("http")
+async def observe_requests(request: Request, call_next):
+    """
+    Request metrics plus a root trace span per request; handlers that create
+    or act on a session bind the span to that session's trace.
+    """
+    started = time.perf_counter()
+    status_code = 500
+    try:
+        with tracer.span(f"{request.method} {request.url.path}", "endpoint", method=request.method) as span:
+            response = await call_next(request)
+            status_code = response.status_code
+            if span is not None:
+                span.set(status_code=status_code)
+            return response
+    finally:
+        # Label by route template (/research/{session_id}/report), not the concrete path
+        route = getattr(request.scope.get("route"), "path", "unmatched")
+        HTTP_REQUESTS.inc(method=request.method, route=route, status=status_code)
+        HTTP_REQUEST_SECONDS.observe(time.perf_counter() - started, method=request.method, route=route)
+
 # Data Models
 class SimpleBusinessContext(BaseModel):
     comprehensive_context: str
+    use_cache: bool = True  # Set False to force fresh LLM/crew calls for this request
+    deadline_seconds: Optional[float] = None  # Overall run deadline (defaults to PIPELINE_DEADLINE_SECONDS)
+
+# Persistent research session storage (SQLite WAL by default, shared across workers)
+session_store = create_session_store()
+
+# Indexed catalog of report files on disk
+report_catalog = ReportCatalog()
+
+# Finished stage outputs of in-progress sessions, used to resume them
+checkpoint_store = StageCheckpointStore()
+
+# In-flight runs by context fingerprint + idempotency keys, so duplicate submissions share a run
+request_coalescer = RequestCoalescer()
+
+# Render report pages as soon as a run completes, so the first view is already a cache hit
+RENDER_REPORTS_ON_COMPLETION = os.getenv("RENDER_REPORTS_ON_COMPLETION", "true").lower() == "true"
+
+# Identifies this process as the owner of the sessions it runs (host:pid:boot token)
+RUN_OWNER = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+# Job kind that runs (and resumes) each pipeline
+PIPELINE_JOB_KINDS = {"context_analysis": "context_analysis", "comprehensive": "comprehensive_analysis"}
+RESUMABLE_STATUSES = ("error", "cancelled", "queued", "processing")
+
+# Pipeline phases reported by /research/{session_id}/results while a job runs
+CONTEXT_ANALYSIS_PHASES = ["icp_research", "simulated_interviews", "synthesis"]
+
+# How often old trace files are pruned (see Tracer.prune for the limits)
+TRACE_PRUNE_INTERVAL_SECONDS = float(os.getenv("TRACE_PRUNE_INTERVAL_SECONDS", "3600"))
+
+async def prune_traces_periodically():
+    while True:
+        try:
+            deleted = await asyncio.to_thread(tracer.prune)
+            if deleted:
+                print(f"🧹 Pruned {deleted} old trace files")
+        except Exception as e:
+            print(f"⚠️ Trace pruning failed: {e}")
+        await asyncio.sleep(TRACE_PRUNE_INTERVAL_SECONDS)
+
+@app.on_event("startup")
+async def start_job_workers():
+    await research_job_queue.start()
+    app.state.trace_pruner = asyncio.create_task(prune_traces_periodically())
+    if os.getenv("AGENT_WARMUP", "true").lower() == "true":
+        # Import the agent stack in the background; requests don't wait for it
+        app.state.agent_warmup = asyncio.create_task(asyncio.to_thread(agent_registry.warm_up))
+    if os.getenv("RESUME_INTERRUPTED_SESSIONS", "true").lower() == "true":
+        await resume_interrupted_sessions()
+
+@app.on_event("shutdown")
+async def stop_job_workers():
+    pruner = getattr(app.state, "trace_pruner", None)
+    if pruner is not None:
+        pruner.cancel()
+    await research_job_queue.stop()
+    llm_gateway.close()
+
+def run_owner_alive(owner: Optional[str]) -> bool:
+    """Whether the process that owns a queued/processing session is still running"""
+    if not owner:
+        return False
+    if owner == RUN_OWNER:
+        return True
+    host, pid, _token = (owner.split(":") + ["", ""])[:3]
+    if host != socket.gethostname():
+        # Sessions live in a local SQLite file, so another host means a replaced instance
+        return False
+    try:
+        if int(pid) == os.getpid():
+            # Our pid with a different boot token: a previous run of this process
+            return False
+        os.kill(int(pid), 0)
+    except (ValueError, ProcessLookupError):
+        return False
+    except PermissionError:
+        return True
+    return True
+
+def claim_for_resume(session_id: str) -> bool:
+    """
+    Atomically mark a session queued under this process if it can be resumed:
+    failed/cancelled, or queued/processing under a process that no longer exists.
+    """
+    claimed = []
+    
+    def _apply(session):
+        status = session.get("status")
+        if status not in RESUMABLE_STATUSES:
+            return
+        if status in ("queued", "processing") and run_owner_alive(session.get("run_owner")):
+            return
+        for key in ("error", "stopped_reason", "completed_at", "cancel_requested"):
+            session.pop(key, None)
+        session["status"] = "queued"
+        session["run_owner"] = RUN_OWNER
+        session["resume_count"] = session.get("resume_count", 0) + 1
+        session["resumed_at"] = datetime.now().isoformat()
+        claimed.append(True)
+    
+    session_store.update_with(session_id, _apply)
+    return bool(claimed)
+
+async def enqueue_resumed_session(session_id: str, session: Dict[str, Any]):
+    """Queue a claimed session; its job restores checkpointed stages and runs the rest"""
+    render_cache.invalidate(session_id)
+    research_events.restart(session_id)
+    research_events.publish(session_id, "status", {"status": "queued", "resumed": True})
+    if session.get("fingerprint"):
+        request_coalescer.track(session["fingerprint"], session_id)
+    await research_job_queue.enqueue(
+        session_id,
+        PIPELINE_JOB_KINDS[session["pipeline"]],
+        {
+            "comprehensive_context": session["business_context"]["comprehensive_context"],
+            **session.get("run_options", {})
+        }
+    )
+
+async def resume_interrupted_sessions():
+    """Re-enqueue sessions a previous process left queued or processing (e.g. after a restart)"""
+    resumed = 0
+    for status in ("queued", "processing"):
+        for session in session_store.list(status=status, limit=1000):
+            session_id = session["session_id"]
+            # Batch records are retried by resuming their batch instead
+            if session.get("pipeline") not in PIPELINE_JOB_KINDS or session.get("batch_record_id"):
+                continue
+            if run_owner_alive(session.get("run_owner")) or not claim_for_resume(session_id):
+                continue
+            await enqueue_resumed_session(session_id, session)
+            resumed += 1
+    if resumed:
+        print(f"♻️ Re-enqueued {resumed} interrupted research sessions")
+
+def set_phase_status(session_id: str, phase: str, status: str, **details):
+    """Record per-phase progress on a research session"""
+    def _apply(session):
+        phase_info = session.setdefault("phases", {}).setdefault(phase, {})
+        phase_info["status"] = status
+        if status == "running":
+            phase_info["started_at"] = datetime.now().isoformat()
+        elif status in ("completed", "skipped", "error", "cancelled"):
+            phase_info["completed_at"] = datetime.now().isoformat()
+        phase_info.update(details)
+    
+    session_store.update_with(session_id, _apply)
+    research_events.publish(session_id, "phase", {"phase": phase, "status": status, **details})
+
+async def run_blocking(fn, *args):
+    """Run blocking agent code in a thread; return early with RunCancelled if the current run stops"""
+    future = asyncio.ensure_future(asyncio.to_thread(fn, *args))
+    control = current_run()
+    return await (control.await_future(future) if control is not None else future)
+
+def stored_cancel_request(session_id: str) -> Optional[str]:
+    """A cancellation DELETE /research/{id} stored for a run this process executes (RunControl cancel_source)"""
+    session = session_store.get(session_id)
+    return session.get("cancel_requested") if session is not None else None
+
+async def cancel_on_disconnect(request: Request, control: RunControl, interval: float = 1.0):
+    """
+    Cancel a run once the requesting client has gone away and no coalesced
+    request is still waiting on it (the last waiter to leave ends the run)
+    """
+    disconnected = False
+    while not control.cancelled:
+        if not disconnected and await request.is_disconnected():
+            disconnected = True
+            print(f"🔌 Client of {control.session_id} disconnected")
+        if disconnected and request_coalescer.waiter_count(control.session_id) == 0:
+            print(f"⏹️ No client left waiting - cancelling {control.session_id}")
+            control.cancel("client_disconnected")
+            return
+        await asyncio.sleep(interval)
+
+class stream_deltas:
+    """Callback that publishes streamed LLM text for a phase to the session's event stream"""
+
+    def __init__(self, session_id: str, phase: str):
+        self.session_id = session_id
+        self.phase = phase
+
+    def __call__(self, text: str):
+        research_events.publish(self.session_id, "delta", {"phase": self.phase, "text": text})
+
+    def reset(self):
+        """Tell clients to discard the text streamed so far for this phase (its response failed midway)"""
+        research_events.publish(self.session_id, "reset", {"phase": self.phase})
+
+async def run_checkpointed_phase(session_id: str, phase: str, run):
+    """Run a pipeline phase (coroutine function), or restore its output from an earlier attempt's checkpoint"""
+    found, output = restore_stage(phase)
+    if found:
+        print(f"♻️ {phase} restored from checkpoint")
+        set_phase_status(session_id, phase, "completed", restored=True)
+        now = datetime.now().timestamp()
+        tracer.record(f"phase {phase}", "stage", now, now, status="restored")
+    else:
+        set_phase_status(session_id, phase, "running")
+        started = time.monotonic()
+        status = "error"
+        try:
+            with tracer.span(f"phase {phase}", "stage"):
+                output = await run()
+            status = "completed"
+        except RunCancelled:
+            status = "cancelled"
+            raise
+        finally:
+            STAGE_SECONDS.observe(time.monotonic() - started, stage=phase, status=status)
+        save_stage(phase, output)
+        set_phase_status(session_id, phase, "completed")
+    research_events.publish(session_id, "stage_output", {"phase": phase, "output": render_value(output)})
+    return output
+
+def session_in_flight(session_id: str) -> bool:
+    session = session_store.get(session_id)
+    return session is not None and session.get("status") in ("queued", "processing")
+
+def coalesce_submission(session_id: str, fingerprint: str, idempotency_key: Optional[str]):
+    """
+    Singleflight for a new (already stored) session. Returns None if it should
+    run, otherwise (session id to hand back, primary session id) after turning
+    it into an alias of the run it attached to. A repeated Idempotency-Key
+    gets the original session id back; an identical in-flight context gets
+    the new alias id, which every session endpoint resolves to the primary.
+    """
+    existing, reason = request_coalescer.claim(fingerprint, session_id, idempotency_key, is_active=session_in_flight)
+    if existing is None:
+        return None
+    session_store.update(session_id, status="alias", alias_of=existing, coalesced_by=reason)
+    return (existing if reason == "idempotency_key" else session_id), existing
+
+def resolve_session_id(session_id: str) -> str:
+    """Alias sessions (coalesced duplicate submissions) resolve to the run they attached to"""
+    session = session_store.get(session_id)
+    if session is not None and session.get("status") == "alias":
+        return session["alias_of"]
+    return session_id
+
+def get_session_or_404(session_id: str) -> Dict[str, Any]:
+    session = session_store.get(session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Research session not found")
+    return session
+
+def warm_report_renderings(session_id: str):
+    """Render a just-completed session's report pages into render_cache (run off the event loop)"""
+    session = session_store.get(session_id)
+    if session is None or session.get("status") != "completed":
+        return
+    try:
+        render_cache.get_or_render(session_id, session, "report", lambda: render_session_report(session_id, session))
+        render_cache.get_or_render(session_id, session, "psychology_html",
+                                   lambda: render_psychology_report(session_id, session))
+    except Exception as e:
+        print(f"⚠️ Report pre-render failed for {session_id}: {e}")
 
-# In-memory storage for research sessions
-research_sessions = {}
+async def prerender_reports(session_id: str):
+    if RENDER_REPORTS_ON_COMPLETION:
+        await asyncio.to_thread(warm_report_renderings, session_id)
 
 @app.get("/")
 async def root():
@@ -206,19 +477,16 @@ async def root():
         "message": "Market Research Agent Team - Live! 🚀",
         "version": "3.0.0",
         "research_form": "/research",
-        "status": "Multi-Agent System Ready" if AGENTS_AVAILABLE else "Agent System Loading",
-        "agents_available": AGENTS_AVAILABLE,
-        "interview_agent": INTERVIEW_AGENT_AVAILABLE,
-        "comprehensive_pipeline": COMPREHENSIVE_AGENT_AVAILABLE,
+        "status": "Multi-Agent System Ready" if agent_flag("icp_research") else "Agent System Loading",
+        "agents_available": agent_flag("icp_research"),
+        "interview_agent": agent_flag("interview_intelligence"),
+        "comprehensive_pipeline": agent_flag("comprehensive_research"),
+        "readiness": "/ready",
         "claude_enabled": USE_CLAUDE
     }
 
-@app.get("/research")
-async def main_research_form():
-    """
-    Main ICP Research Intelligence Form
-    """
-    html_content = """
+# Main ICP Research Intelligence Form - rendered once at import and served by static_pages
+RESEARCH_FORM_HTML = """
     <!DOCTYPE html>
     <html>
     <head>
@@ -604,7 +872,7 @@ These should sound like real people talking, not marketing speak'></textarea>
                     📊 Phase 1: Deep ICP Analysis with Belief Mapping<br>
                     🎭 Phase 2: Conducting 3 Simulated Customer Interviews<br>
                     ✨ Phase 3: Synthesizing Insights for GTM Strategy<br><br>
-                    ⏱️ Estimated time: 3-5 minutes for journal-level depth
+                    📡 Insights will stream in below as each agent writes them
                 </div>`;
                 
                 try {
@@ -618,10 +886,121 @@ These should sound like real people talking, not marketing speak'></textarea>
                         throw new Error(`HTTP error! status: ${response.status}`);
                     }
                     
-                    const result = await response.json();
+                    const queued = await response.json();
+                    if (queued.status === 'error') {
+                        throw new Error(queued.message);
+                    }
                     
-                    // Create a link to view formatted report
-                    results.innerHTML = `
+                    const phaseLabels = {
+                        icp_research: '📊 Phase 1: Deep ICP Analysis with Belief Mapping',
+                        simulated_interviews: '🎭 Phase 2: Simulated Customer Interviews',
+                        synthesis: '✨ Phase 3: Synthesizing Insights for GTM Strategy'
+                    };
+                    const phaseIcons = { pending: '⏳', running: '🔄', completed: '✅', skipped: '⏭️', error: '❌', cancelled: '⏹️' };
+                    const phaseStatus = {};
+                    
+                    results.innerHTML = '<div class="loading" id="phaseProgress"></div>' +
+                        Object.keys(phaseLabels).map(phase =>
+                            '<details id="section-' + phase + '" style="display: none; margin-top: 15px;" open>' +
+                            '<summary style="cursor: pointer; font-weight: bold;">' + phaseLabels[phase] + '</summary>' +
+                            '<pre id="output-' + phase + '" style="white-space: pre-wrap; max-height: 400px; overflow-y: auto;"></pre>' +
+                            '</details>'
+                        ).join('');
+                    
+                    const renderProgress = (statusText) => {
+                        document.getElementById('phaseProgress').innerHTML =
+                            '🤖 Agent Team Working (' + statusText + ')...<br><br>' +
+                            Object.keys(phaseLabels).map(phase =>
+                                (phaseIcons[phaseStatus[phase]] || '⏳') + ' ' + phaseLabels[phase]
+                            ).join('<br>');
+                    };
+                    const showOutput = (phase, text, append) => {
+                        const section = document.getElementById('section-' + phase);
+                        const output = document.getElementById('output-' + phase);
+                        if (!section || !output) return;
+                        section.style.display = 'block';
+                        output.textContent = append ? output.textContent + text : text;
+                        output.scrollTop = output.scrollHeight;
+                    };
+                    renderProgress(queued.status);
+                    
+                    // Poll per-phase status (fallback when streaming is unavailable)
+                    const pollUntilDone = async () => {
+                        while (true) {
+                            await new Promise(resolve => setTimeout(resolve, 3000));
+                            const statusResponse = await fetch(queued.status_url);
+                            if (!statusResponse.ok) {
+                                throw new Error(`HTTP error! status: ${statusResponse.status}`);
+                            }
+                            const polled = await statusResponse.json();
+                            Object.entries(polled.phases || {}).forEach(([phase, info]) => { phaseStatus[phase] = info.status; });
+                            renderProgress(polled.status);
+                            if (polled.status === 'completed') return polled;
+                            if (polled.status === 'error') {
+                                throw new Error(polled.error || 'Research failed');
+                            }
+                            if (polled.status === 'cancelled') {
+                                throw new Error('Research ' + (polled.stopped_reason || 'cancelled') + ' - partial results kept');
+                            }
+                        }
+                    };
+                    
+                    // Stream phase events and token deltas as they are generated
+                    const streamUntilDone = () => new Promise((resolve, reject) => {
+                        const source = new EventSource(queued.stream_url);
+                        let finished = false;
+                        source.addEventListener('status', e => renderProgress(JSON.parse(e.data).status));
+                        source.addEventListener('phase', e => {
+                            const data = JSON.parse(e.data);
+                            phaseStatus[data.phase] = data.status;
+                            renderProgress('processing');
+                        });
+                        source.addEventListener('phase_summary', e => {
+                            Object.entries(JSON.parse(e.data)).forEach(([phase, info]) => { phaseStatus[phase] = info.status; });
+                            renderProgress('finished');
+                        });
+                        source.addEventListener('delta', e => {
+                            const data = JSON.parse(e.data);
+                            showOutput(data.phase, data.text, true);
+                        });
+                        source.addEventListener('reset', e => showOutput(JSON.parse(e.data).phase, '', false));
+                        source.addEventListener('stage_output', e => {
+                            const data = JSON.parse(e.data);
+                            showOutput(data.phase, data.output, false);
+                        });
+                        source.addEventListener('complete', e => {
+                            finished = true;
+                            source.close();
+                            resolve(JSON.parse(e.data));
+                        });
+                        source.addEventListener('cancelled', e => {
+                            finished = true;
+                            source.close();
+                            reject(new Error('Research ' + (JSON.parse(e.data).reason || 'cancelled') + ' - partial results kept'));
+                        });
+                        source.addEventListener('failed', e => {
+                            finished = true;
+                            source.close();
+                            reject(new Error(JSON.parse(e.data).error || 'Research failed'));
+                        });
+                        source.onerror = () => {
+                            // EventSource retries on its own; give up on streaming only if it closed for good
+                            if (!finished && source.readyState === EventSource.CLOSED) {
+                                pollUntilDone().then(resolve, reject);
+                            }
+                        };
+                    });
+                    
+                    let result = queued;
+                    if (window.EventSource && queued.stream_url) {
+                        await streamUntilDone();
+                        result = await (await fetch(queued.status_url)).json();
+                    } else {
+                        result = await pollUntilDone();
+                    }
+                    
+                    // Keep the streamed sections and add a link to the formatted report
+                    results.querySelector('#phaseProgress').outerHTML = `
                         <h3>🎉 Multi-Agent Research Complete!</h3>
                         <p>Your comprehensive market intelligence report is ready.</p>
                         <a href="/research/${result.session_id}/report" 
@@ -651,89 +1030,251 @@ These should sound like real people talking, not marketing speak'></textarea>
     </body>
     </html>
     """
-    return HTMLResponse(content=html_content)
+
+static_pages.add_page("/research", RESEARCH_FORM_HTML, "research-form")
+
+@app.get("/research")
+async def main_research_form(request: Request):
+    """
+    Main ICP Research Intelligence Form
+    """
+    return static_pages.page_response("/research", request)
+
+# Fixed system prompt for Claude research calls (part of the cacheable prefix)
+ELITE_RESEARCHER_SYSTEM_PROMPT = "You are an elite market researcher with deep psychological training. Your insights are so accurate that clients feel like you've read their private journals. You uncover hidden beliefs, unspoken fears, and secret desires that even customers don't consciously recognize."
+
+# Static synthesis instructions - sent ahead of the research as part of the prompt; with the
+# system prompt they stay well under Anthropic's 1024-token cache minimum, so not a cached prefix
+SYNTHESIS_INSTRUCTIONS = """
+Synthesize the research components provided below into key GTM insights.
+
+Focus on:
+1. Most surprising insights that clients would say "how did you know that?"
+2. Exact language for messaging (pull from interviews)
+3. Biggest belief shifts needed for purchase
+4. Top 3 GTM recommendations based on psychology
+"""
 
 # Helper function for Claude calls (if enabled)
-async def enhanced_agent_call(prompt: str, use_claude: bool = USE_CLAUDE) -> Any:
+async def enhanced_agent_call(prompt: str, use_claude: bool = USE_CLAUDE,
+                              cached_prefix: Optional[str] = None, usage_log: Optional[list] = None,
+                              on_delta=None) -> Any:
     """
-    Use Claude for enhanced quality when available, fallback to regular agent
+    Use Claude for enhanced quality when available, fallback to regular agent.
+    Calls go through the shared async LLM gateway, so no thread is held while waiting.
+    
+    cached_prefix: static instructions sent ahead of `prompt` as a cacheable block
+    usage_log: optional list that receives this call's cached/uncached token usage
+    on_delta: optional callback; the Claude response is streamed into it as it is generated
     """
     if use_claude and USE_CLAUDE:
+        streamed = []
+        
+        def forward_delta(text: str):
+            streamed.append(len(text))
+            on_delta(text)
+        
         try:
-            response = claude_client.messages.create(
+            response = await llm_gateway.acomplete(
+                prompt,
+                provider="anthropic",
                 model="claude-3-5-sonnet-20241022",
                 max_tokens=8000,
                 temperature=0.5,
-                system="You are an elite market researcher with deep psychological training. Your insights are so accurate that clients feel like you've read their private journals. You uncover hidden beliefs, unspoken fears, and secret desires that even customers don't consciously recognize.",
-                messages=[
-                    {"role": "user", "content": prompt}
-                ]
+                system=ELITE_RESEARCHER_SYSTEM_PROMPT,
+                cached_prefix=cached_prefix,
+                on_delta=forward_delta if on_delta is not None else None
             )
-            return response.content[0].text
+            usage = response.usage
+            print(f"💾 Claude tokens - cached input: {usage.get('cached_input_tokens', 0)}, "
+                  f"uncached input: {usage.get('uncached_input_tokens', 0)}, output: {usage.get('output_tokens', 0)}"
+                  f"{' (local cache hit)' if response.cached else ''}")
+            if usage_log is not None:
+                usage_log.append({"model": response.model, "local_cache_hit": response.cached, **usage})
+            return response.text
+        except RunCancelled:
+            raise
         except Exception as e:
             print(f"Claude API error: {e}, falling back to default agent")
+            if streamed and hasattr(on_delta, "reset"):
+                # Clients already show part of the failed response; clear it before the fallback's text
+                on_delta.reset()
     
     # Fallback to regular agent
-    return agent_function(prompt)
+    full_prompt = f"{cached_prefix}{prompt}" if cached_prefix else prompt
+    agent_function_async = await load_agent("icp_research_async")
+    agent_function = await load_agent("icp_research")
+    if agent_function_async is not None:
+        result = await agent_function_async(full_prompt)
+    elif agent_function is not None:
+        result = await run_blocking(agent_function, full_prompt)
+    else:
+        result = {
+            "error": "Agent system not available",
+            "message": "Please check agent imports",
+            "context_received": True
+        }
+    if on_delta is not None:
+        on_delta(str(result))
+    return result
 
-@app.post("/research/context-analysis")
-async def context_analysis_research(context: SimpleBusinessContext):
+@app.post("/research/context-analysis", status_code=202)
+async def context_analysis_research(context: SimpleBusinessContext, idempotency_key: Optional[str] = Header(None)):
     """
-    Process comprehensive business context with enhanced ICP research + simulated interviews
+    Queue comprehensive business context for enhanced ICP research + simulated interviews.
+    Returns 202 immediately; follow /research/{session_id}/stream for live progress
+    or poll /research/{session_id}/results for per-phase status.
+    
+    A context identical to one already queued or running (or a repeated
+    Idempotency-Key) attaches to that run instead of starting another.
     """
     
     # Generate session ID
-    session_id = f"context_research_{len(research_sessions) + 1}"
+    session_id = new_session_id("context_research")
+    fingerprint = context_fingerprint("context_analysis", context.comprehensive_context,
+                                      context.use_cache, context.deadline_seconds)
     
     # Store initial context
-    research_sessions[session_id] = {
-        "status": "processing",
+    session_store.create(session_id, {
+        "status": "queued",
         "business_context": {"comprehensive_context": context.comprehensive_context},
         "agent_results": {},
+        "phases": {phase: {"status": "pending"} for phase in CONTEXT_ANALYSIS_PHASES},
+        "pipeline": "context_analysis",
+        "run_options": {"use_cache": context.use_cache, "deadline_seconds": context.deadline_seconds},
+        "fingerprint": fingerprint,
+        "run_owner": RUN_OWNER,
         "created_at": datetime.now().isoformat()
+    })
+    tracer.bind(session_id)
+    
+    if await load_agent("icp_research") is None:
+        session_store.update(session_id, status="error", error="Agent system not available")
+        return JSONResponse(status_code=200, content={
+            "session_id": session_id,
+            "status": "error",
+            "message": "Agent system not available. Check deployment logs for import errors."
+        })
+    
+    attached = coalesce_submission(session_id, fingerprint, idempotency_key)
+    if attached is not None:
+        returned_id, primary_id = attached
+        print(f"🔗 {session_id} attached to in-flight context analysis {primary_id}")
+        primary = session_store.get(primary_id) or {}
+        return {
+            "session_id": returned_id,
+            "status": primary.get("status", "queued"),
+            "coalesced_with": primary_id,
+            "message": "Identical research is already in progress; this request shares its results",
+            "status_url": f"/research/{returned_id}/results",
+            "stream_url": f"/research/{returned_id}/stream",
+            "full_results_url": f"/research/{returned_id}/report"
+        }
+    
+    await research_job_queue.enqueue(
+        session_id,
+        "context_analysis",
+        {
+            "comprehensive_context": context.comprehensive_context,
+            "use_cache": context.use_cache,
+            "deadline_seconds": context.deadline_seconds
+        }
+    )
+    
+    return {
+        "session_id": session_id,
+        "status": "queued",
+        "message": "Comprehensive ICP research queued",
+        "queue_depth": research_job_queue.depth(INTERACTIVE_LANE),
+        "status_url": f"/research/{session_id}/results",
+        "stream_url": f"/research/{session_id}/stream",
+        "full_results_url": f"/research/{session_id}/report"
     }
+
+async def run_context_analysis_job(session_id: str, payload: Dict[str, Any]):
+    """
+    Worker job: ICP research -> simulated interviews -> synthesis
+    """
+    session = session_store.get(session_id)
+    if session is not None and session["status"] == "cancelled":
+        print(f"⏹️ Skipping {session_id} - cancelled before it started")
+        request_coalescer.release(session_id)
+        return
+    
+    # Registered so DELETE /research/{id} can stop it; the deadline starts now
+    control = active_runs.start(session_id, payload.get("deadline_seconds"), stored_cancel_request)
+    try:
+        checkpoints = checkpoint_store.for_session(session_id)
+        with cache_scope(payload.get("use_cache", True)), run_scope(control), checkpoint_scope(checkpoints), \
+                tracer.span("pipeline context_analysis", "pipeline", trace_id=session_id):
+            await _run_context_analysis_phases(session_id, payload)
+    finally:
+        active_runs.finish(session_id, control)
+        request_coalescer.release(session_id)
+
+async def _run_context_analysis_phases(session_id: str, payload: Dict[str, Any]):
+    comprehensive_context = payload["comprehensive_context"]
+    session_store.update(session_id, status="processing", run_owner=RUN_OWNER)
+    research_events.publish(session_id, "status", {"status": "processing"})
+    current_phase = "icp_research"
+    icp_results = interview_results = synthesis = None
     
     try:
-        if not AGENTS_AVAILABLE:
-            return {
-                "session_id": session_id,
-                "status": "error",
-                "message": "Agent system not available. Check deployment logs for import errors."
-            }
-        
-        print(f"🧠 Phase 1: Starting comprehensive ICP research with belief mapping...")
-        
         # Phase 1: Comprehensive ICP Research with Enhanced Prompt
-        full_prompt = f"{COMPREHENSIVE_ICP_PROMPT}\n\n---\n\nBUSINESS CONTEXT:\n\n{context.comprehensive_context}"
+        # The fixed prompt is the cacheable prefix; only the business context varies
+        usage_log = list((session_store.get(session_id) or {}).get("llm_usage", []))
+        
+        async def _icp_research():
+            print(f"🧠 Phase 1: Starting comprehensive ICP research with belief mapping...")
+            icp_inputs = budget_sections("icp_business_context", model=DEFAULT_CLAUDE_MODEL, context=comprehensive_context)
+            result = await enhanced_agent_call(
+                f"BUSINESS CONTEXT:\n\n{icp_inputs['context']}",
+                cached_prefix=f"{COMPREHENSIVE_ICP_PROMPT}\n\n---\n\n",
+                usage_log=usage_log,
+                on_delta=stream_deltas(session_id, "icp_research")
+            )
+            session_store.update(session_id, llm_usage=usage_log)
+            return result
         
-        # Use Claude if available, otherwise fallback
-        icp_results = await enhanced_agent_call(full_prompt)
+        icp_results = await run_checkpointed_phase(session_id, "icp_research", _icp_research)
         
         # Phase 2: Simulated Interviews (if available)
-        interview_results = None
-        if INTERVIEW_AGENT_AVAILABLE and interview_agent:
-            print(f"🎭 Phase 2: Conducting simulated customer interviews...")
+        current_phase = "simulated_interviews"
+        interview_agent = await load_agent("interview_intelligence")
+        if interview_agent is not None:
+            async def _simulated_interviews():
+                print(f"🎭 Phase 2: Conducting simulated customer interviews...")
+                # Pass the ICP results directly to the interview agent
+                return await run_blocking(interview_agent, icp_results)
             
-            # Pass the ICP results directly to the interview agent
-            interview_results = interview_agent(icp_results)
+            interview_results = await run_checkpointed_phase(session_id, "simulated_interviews", _simulated_interviews)
         else:
             print("⚠️ Interview agent not available - using ICP research only")
+            set_phase_status(session_id, "simulated_interviews", "skipped", reason="Interview agent not available")
         
         # Phase 3: Synthesis
-        synthesis_prompt = f"""
-        Synthesize these research components into key GTM insights:
+        current_phase = "synthesis"
         
-        ICP Research: {str(icp_results)[:2000]}
-        Interview Insights: {str(interview_results)[:2000] if interview_results else "Not conducted"}
-        
-        Focus on:
-        1. Most surprising insights that clients would say "how did you know that?"
-        2. Exact language for messaging (pull from interviews)
-        3. Biggest belief shifts needed for purchase
-        4. Top 3 GTM recommendations based on psychology
+        async def _synthesis():
+            synthesis_inputs = budget_sections(
+                "synthesis",
+                model=DEFAULT_CLAUDE_MODEL,
+                icp_research=icp_results,
+                interview_insights=interview_results if interview_results else "Not conducted"
+            )
+            synthesis_prompt = f"""
+        ICP Research: {synthesis_inputs["icp_research"]}
+        Interview Insights: {synthesis_inputs["interview_insights"]}
         """
+            result = await enhanced_agent_call(
+                f"{SYNTHESIS_INSTRUCTIONS}{synthesis_prompt}",
+                usage_log=usage_log,
+                on_delta=stream_deltas(session_id, "synthesis")
+            )
+            session_store.update(session_id, llm_usage=usage_log)
+            return result
         
-        synthesis = await enhanced_agent_call(synthesis_prompt)
+        synthesis = await run_checkpointed_phase(session_id, "synthesis", _synthesis)
         
         # Combine all results
         combined_results = {
@@ -753,59 +1294,272 @@ async def context_analysis_research(context: SimpleBusinessContext):
         try:
             # Convert results to string for storage
             serializable_results = str(combined_results)
-            research_sessions[session_id]["agent_results"]["comprehensive_research"] = serializable_results
-            research_sessions[session_id]["status"] = "completed"
         except Exception as e:
             print(f"Storage error: {e}")
-            research_sessions[session_id]["agent_results"]["comprehensive_research"] = "Research completed"
-            research_sessions[session_id]["status"] = "completed"
+            serializable_results = "Research completed"
         
-        return {
-            "session_id": session_id,
+        session_store.update(
+            session_id,
+            agent_results={"comprehensive_research": serializable_results},
+            status="completed",
+            completed_at=datetime.now().isoformat()
+        )
+        checkpoint_store.clear(session_id)
+        research_events.publish(session_id, "complete", {
             "status": "completed",
-            "message": "Comprehensive ICP research with belief mapping completed",
-            "phases_completed": {
-                "icp_research": "✅ Complete with belief mapping",
-                "simulated_interviews": "✅ Interview intelligence gathered", 
-                "synthesis": "✅ GTM insights generated"
-            },
-            "quality_indicators": {
-                "belief_system_mapped": True,
-                "solution_history_analyzed": True,
-                "transformation_requirements": True,
-                "voice_of_customer": True
-            },
-            "full_results_url": f"/research/{session_id}/report"
+            "session_id": session_id,
+            "report_url": f"/research/{session_id}/report",
+            "results_url": f"/research/{session_id}/results"
+        })
+        await prerender_reports(session_id)
+        
+    except RunCancelled as e:
+        # Keep whatever phases finished as a partial result
+        print(f"⏹️ Context analysis {e.reason} during {current_phase}")
+        set_phase_status(session_id, current_phase, "cancelled", reason=e.reason)
+        partial_results = {
+            "icp_analysis": icp_results,
+            "simulated_interviews": interview_results,
+            "synthesis": synthesis
         }
+        session_store.update(
+            session_id,
+            agent_results={"partial_research": str({k: v for k, v in partial_results.items() if v is not None})},
+            status="cancelled",
+            stopped_reason=e.reason,
+            completed_at=datetime.now().isoformat()
+        )
+        research_events.publish(session_id, "cancelled", {
+            "status": "cancelled",
+            "reason": e.reason,
+            "phase": current_phase,
+            "results_url": f"/research/{session_id}/results",
+            "resume_url": f"/research/{session_id}/resume"
+        })
         
     except Exception as e:
-        research_sessions[session_id]["status"] = "error"
-        research_sessions[session_id]["error"] = str(e)
+        print(f"❌ Context analysis failed in {current_phase}: {e}")
+        set_phase_status(session_id, current_phase, "error", error=str(e))
+        session_store.update(session_id, status="error", error=f"Error processing context analysis: {str(e)}")
+        research_events.publish(session_id, "failed", {
+            "status": "error",
+            "phase": current_phase,
+            "error": str(e),
+            "resume_url": f"/research/{session_id}/resume"
+        })
+
+research_job_queue.register("context_analysis", run_context_analysis_job)
+
+async def run_batch_record(record_id: str, record: Dict[str, Any]) -> Dict[str, Any]:
+    """Run one batch record through the context analysis pipeline as its own session"""
+    session_id = new_session_id("batch_research")
+    session_store.create(session_id, {
+        "status": "queued",
+        "business_context": {"comprehensive_context": record["comprehensive_context"]},
+        "agent_results": {},
+        "phases": {phase: {"status": "pending"} for phase in CONTEXT_ANALYSIS_PHASES},
+        "pipeline": "context_analysis",
+        "run_options": {"use_cache": record.get("use_cache", True), "deadline_seconds": record.get("deadline_seconds")},
+        "run_owner": RUN_OWNER,
+        "batch_record_id": record_id,
+        "created_at": datetime.now().isoformat()
+    })
+    
+    await run_context_analysis_job(session_id, {
+        "comprehensive_context": record["comprehensive_context"],
+        "use_cache": record.get("use_cache", True),
+        "deadline_seconds": record.get("deadline_seconds")
+    })
+    
+    session = session_store.get(session_id)
+    return {
+        "record_id": record_id,
+        "session_id": session_id,
+        "status": session["status"],
+        "error": session.get("error"),
+        "stopped_reason": session.get("stopped_reason"),
+        "phases": session.get("phases", {}),
+        "agent_results": session.get("agent_results", {}),
+        "completed_at": session.get("completed_at")
+    }
+
+async def run_batch_job(batch_id: str, payload: Dict[str, Any]):
+    """Worker job (batch lane): run or resume every record of a stored batch"""
+    runner = BatchRunner(batch_id, run_batch_record, max_concurrency=payload.get("max_concurrency"))
+    # Batch LLM requests wait at the shared limiter while interactive ones are queued
+    with low_priority():
+        await runner.run()
+
+research_job_queue.register("batch", run_batch_job)
+
+async def run_comprehensive_pipeline(session_id: str, comprehensive_context: str, use_cache: bool = True,
+                                     deadline_seconds: Optional[float] = None,
+                                     request: Optional[Request] = None) -> Dict[str, Any]:
+    """
+    Run the coordinator for a session and store its results. Stages are
+    checkpointed as they finish, so a resumed session only runs what is left.
+    With a request, the run is cancelled if that client disconnects.
+    """
+    session_store.update(session_id, status="processing", run_owner=RUN_OWNER)
+    
+    # Run the comprehensive coordinator off the event loop
+    control = active_runs.start(session_id, deadline_seconds, stored_cancel_request)
+    watcher = asyncio.create_task(cancel_on_disconnect(request, control)) if request is not None else None
+    try:
+        checkpoints = checkpoint_store.for_session(session_id)
+        with cache_scope(use_cache), run_scope(control), checkpoint_scope(checkpoints), \
+                tracer.span("pipeline comprehensive", "pipeline", trace_id=session_id):
+            comprehensive_agent = await load_agent("comprehensive_research")
+            comprehensive_results = await asyncio.to_thread(comprehensive_agent, comprehensive_context)
+    finally:
+        if watcher is not None:
+            watcher.cancel()
+        active_runs.finish(session_id, control)
+        request_coalescer.release(session_id)
+    
+    # Store results (partial if the run was cancelled or hit its deadline)
+    stopped_reason = comprehensive_results.get("stopped_reason")
+    session_store.update(
+        session_id,
+        agent_results={"comprehensive": comprehensive_results},
+        status="cancelled" if stopped_reason else "completed",
+        stopped_reason=stopped_reason,
+        completed_at=datetime.now().isoformat()
+    )
+    if stopped_reason:
+        return comprehensive_results
+    checkpoint_store.clear(session_id)
+    
+    # Save comprehensive report to disk
+    try:
+        report_data = {
+            "session_id": session_id,
+            "created_at": datetime.now().isoformat(),
+            "business_context": comprehensive_context,
+            "results": comprehensive_results,
+            "status": "completed",
+            "research_type": "comprehensive_pipeline"
+        }
+        
+        report_entry = report_catalog.write_report(session_id, report_data, suffix="comprehensive")
+        report_filename = report_catalog.file_path(report_entry["filename"])
         
+        session_store.update(session_id, report_file=report_filename)
+        print(f"📄 Comprehensive report saved to {report_filename}")
+        
+    except Exception as e:
+        print(f"⚠️ Failed to save comprehensive report: {str(e)}")
+    
+    await prerender_reports(session_id)
+    return comprehensive_results
+
+async def run_comprehensive_job(session_id: str, payload: Dict[str, Any]):
+    """Worker job: resumed or recovered comprehensive research session"""
+    session = session_store.get(session_id)
+    if session is not None and session["status"] == "cancelled":
+        print(f"⏹️ Skipping {session_id} - cancelled before it started")
+        request_coalescer.release(session_id)
+        return
+    try:
+        await run_comprehensive_pipeline(
+            session_id,
+            payload["comprehensive_context"],
+            use_cache=payload.get("use_cache", True),
+            deadline_seconds=payload.get("deadline_seconds")
+        )
+    except Exception as e:
+        print(f"❌ Comprehensive research failed for {session_id}: {e}")
+        session_store.update(session_id, status="error", error=str(e))
+
+research_job_queue.register("comprehensive_analysis", run_comprehensive_job)
+
+def comprehensive_response(session_id: str, comprehensive_results: Dict[str, Any]) -> Dict[str, Any]:
+    """API response for a finished comprehensive run (shared by the run and attached duplicate requests)"""
+    stopped_reason = comprehensive_results.get("stopped_reason")
+    if stopped_reason:
         return {
             "session_id": session_id,
-            "status": "error",
-            "message": f"Error processing context analysis: {str(e)}"
+            "status": "cancelled",
+            "stopped_reason": stopped_reason,
+            "message": "Research stopped early; stages that finished are kept as a partial result",
+            "stage_timings": comprehensive_results.get("stage_timings", {}),
+            "partial_results": comprehensive_results.get("results", {}),
+            "full_results_url": f"/research/{session_id}/results",
+            "resume_url": f"/research/{session_id}/resume"
         }
+    
+    return {
+        "session_id": session_id,
+        "status": "completed",
+        "message": "Comprehensive research pipeline completed",
+        "phases_completed": {
+            "icp_research": "✅ Deep customer psychology with Schwartz analysis",
+            "interview_intelligence": "✅ Persona interviews with authentic language" if comprehensive_results.get("success") else "⚠️ Fallback used",
+            "marketing_strategy": "✅ Copy-ready campaigns and strategy" if comprehensive_results.get("success") else "⚠️ Fallback used"
+        },
+        "pipeline_status": comprehensive_results.get("success", False),
+        "agents_used": comprehensive_results.get("agents_used", {}),
+        "deliverables": {
+            "customer_intelligence": "Deep psychological insights and belief systems",
+            "voice_of_customer": "Authentic language patterns and decision psychology", 
+            "marketing_assets": "Headlines, ads, emails, landing pages ready to deploy",
+            "strategic_framework": "Complete positioning and campaign strategy"
+        },
+        "full_results": comprehensive_results,
+        "full_results_url": f"/research/{session_id}/results",
+        "cost_efficiency": "3x more intelligence for same cost as basic research"
+    }
+
+async def wait_for_session(session_id: str, request: Request, waiter_id: str,
+                           poll_seconds: float = 1.0) -> Optional[Dict[str, Any]]:
+    """
+    Wait until a session leaves queued/processing; None if the client disconnects first.
+    While waiting, `waiter_id` keeps the run from being cancelled by its own client's disconnect.
+    """
+    request_coalescer.attach_waiter(session_id, waiter_id)
+    try:
+        while True:
+            session = session_store.get(session_id)
+            if session is None or session["status"] not in ("queued", "processing"):
+                return session
+            if await request.is_disconnected():
+                return None
+            await asyncio.sleep(poll_seconds)
+    finally:
+        request_coalescer.detach_waiter(waiter_id)
 
 @app.post("/research/comprehensive-analysis")
-async def comprehensive_research_analysis(context: SimpleBusinessContext):
+async def comprehensive_research_analysis(context: SimpleBusinessContext, request: Request,
+                                          idempotency_key: Optional[str] = Header(None)):
     """
     Run complete research pipeline: ICP + Interviews + Marketing Strategy
-    Uses the avatar_agnostic_coordinator to orchestrate all agents
+    Uses the avatar_agnostic_coordinator to orchestrate all agents.
+    The run stops (keeping finished stages) on client disconnect,
+    DELETE /research/{session_id} or its deadline.
+    
+    A submission identical to a run already in flight (or repeating an
+    Idempotency-Key) waits for that run instead of starting another.
     """
     
-    session_id = f"comprehensive_research_{len(research_sessions) + 1}"
+    session_id = new_session_id("comprehensive_research")
+    fingerprint = context_fingerprint("comprehensive", context.comprehensive_context,
+                                      context.use_cache, context.deadline_seconds)
     
-    research_sessions[session_id] = {
+    session_store.create(session_id, {
         "status": "processing",
         "business_context": {"comprehensive_context": context.comprehensive_context},
         "agent_results": {},
+        "pipeline": "comprehensive",
+        "run_options": {"use_cache": context.use_cache, "deadline_seconds": context.deadline_seconds},
+        "fingerprint": fingerprint,
+        "run_owner": RUN_OWNER,
         "created_at": datetime.now().isoformat()
-    }
+    })
+    tracer.bind(session_id)
     
     try:
-        if not COMPREHENSIVE_AGENT_AVAILABLE:
+        if await load_agent("comprehensive_research") is None:
+            session_store.update(session_id, status="error", error="Comprehensive research pipeline not available")
             return {
                 "session_id": session_id,
                 "status": "error",
@@ -813,77 +1567,49 @@ async def comprehensive_research_analysis(context: SimpleBusinessContext):
                 "fallback_url": "/research/context-analysis"
             }
         
-        print(f"🚀 Starting comprehensive research pipeline...")
-        
-        # Run the comprehensive coordinator
-        comprehensive_results = comprehensive_agent(context.comprehensive_context)
+        attached = coalesce_submission(session_id, fingerprint, idempotency_key)
+        if attached is not None:
+            returned_id, primary_id = attached
+            print(f"🔗 {session_id} attached to in-flight comprehensive run {primary_id}")
+            primary = await wait_for_session(primary_id, request, waiter_id=session_id)
+            if primary is None:
+                return {"session_id": returned_id, "status": "processing", "coalesced_with": primary_id}
+            if primary["status"] == "error":
+                return {
+                    "session_id": returned_id,
+                    "status": "error",
+                    "coalesced_with": primary_id,
+                    "message": f"Error in comprehensive research: {primary.get('error')}",
+                    "resume_url": f"/research/{primary_id}/resume"
+                }
+            response = comprehensive_response(returned_id, primary.get("agent_results", {}).get("comprehensive", {}))
+            response["coalesced_with"] = primary_id
+            return response
         
-        # Store results
-        research_sessions[session_id]["agent_results"]["comprehensive"] = comprehensive_results
-        research_sessions[session_id]["status"] = "completed"
+        print(f"🚀 Starting comprehensive research pipeline...")
         
-        # Save comprehensive report to disk
-        try:
-            os.makedirs("reports", exist_ok=True)
-            report_filename = f"reports/{session_id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}_comprehensive.json"
-            
-            report_data = {
-                "session_id": session_id,
-                "created_at": datetime.now().isoformat(),
-                "business_context": context.comprehensive_context,
-                "results": comprehensive_results,
-                "status": "completed",
-                "research_type": "comprehensive_pipeline"
-            }
-            
-            with open(report_filename, 'w') as f:
-                json.dump(report_data, f, indent=2)
-            
-            research_sessions[session_id]["report_file"] = report_filename
-            print(f"📄 Comprehensive report saved to {report_filename}")
-            
-        except Exception as e:
-            print(f"⚠️ Failed to save comprehensive report: {str(e)}")
-        
-        return {
-            "session_id": session_id,
-            "status": "completed",
-            "message": "Comprehensive research pipeline completed",
-            "phases_completed": {
-                "icp_research": "✅ Deep customer psychology with Schwartz analysis",
-                "interview_intelligence": "✅ Persona interviews with authentic language" if comprehensive_results.get("success") else "⚠️ Fallback used",
-                "marketing_strategy": "✅ Copy-ready campaigns and strategy" if comprehensive_results.get("success") else "⚠️ Fallback used"
-            },
-            "pipeline_status": comprehensive_results.get("success", False),
-            "agents_used": comprehensive_results.get("agents_used", {}),
-            "deliverables": {
-                "customer_intelligence": "Deep psychological insights and belief systems",
-                "voice_of_customer": "Authentic language patterns and decision psychology", 
-                "marketing_assets": "Headlines, ads, emails, landing pages ready to deploy",
-                "strategic_framework": "Complete positioning and campaign strategy"
-            },
-            "full_results": comprehensive_results,
-            "full_results_url": f"/research/{session_id}/results",
-            "cost_efficiency": "3x more intelligence for same cost as basic research"
-        }
+        comprehensive_results = await run_comprehensive_pipeline(
+            session_id,
+            context.comprehensive_context,
+            use_cache=context.use_cache,
+            deadline_seconds=context.deadline_seconds,
+            request=request
+        )
+        return comprehensive_response(session_id, comprehensive_results)
         
     except Exception as e:
-        research_sessions[session_id]["status"] = "error"
-        research_sessions[session_id]["error"] = str(e)
+        session_store.update(session_id, status="error", error=str(e))
         
         return {
             "session_id": session_id,
             "status": "error",
             "message": f"Error in comprehensive research: {str(e)}",
-            "troubleshooting": "Check coordinator and agent configurations"
+            "troubleshooting": "Check coordinator and agent configurations",
+            "resume_url": f"/research/{session_id}/resume"
         }
 
-@app.get("/test-comprehensive")
-async def test_comprehensive_form():
-    """
-    Test form for the comprehensive research pipeline
-    """
-    html_content = """
+# Test form for the comprehensive research pipeline - rendered once at import and served by static_pages
+TEST_COMPREHENSIVE_FORM_HTML = """
     <!DOCTYPE html>
     <html>
     <head>
@@ -1014,21 +1740,20 @@ async def test_comprehensive_form():
     </body>
     </html>
     """
-    return HTMLResponse(content=html_content)
 
-@app.get("/research/{session_id}/report")
-async def get_formatted_report(session_id: str):
+static_pages.add_page("/test-comprehensive", TEST_COMPREHENSIVE_FORM_HTML, "test-comprehensive")
+
+@app.get("/test-comprehensive")
+async def test_comprehensive_form(request: Request):
+    """
+    Test form for the comprehensive research pipeline
+    """
+    return static_pages.page_response("/test-comprehensive", request)
+
+def render_session_report(session_id: str, session: Dict[str, Any]) -> str:
     """
     Generate a beautifully formatted HTML report from the research results
     """
-    if session_id not in research_sessions:
-        raise HTTPException(status_code=404, detail="Research session not found")
-    
-    session = research_sessions[session_id]
-    
-    if session["status"] != "completed":
-        return HTMLResponse(content="<h1>Report still processing...</h1>")
-    
     # Get results
     results = session.get("agent_results", {}).get("comprehensive_research", {})
     
@@ -1128,37 +1853,49 @@ async def get_formatted_report(session_id: str):
     </html>
     """
     
-    return HTMLResponse(content=html_report)
+    return html_report
+
+@app.get("/research/{session_id}/report")
+async def get_formatted_report(session_id: str, request: Request):
+    """
+    Formatted HTML report, rendered once per result version and revalidated with ETag/Last-Modified
+    """
+    session_id = resolve_session_id(session_id)
+    session = get_session_or_404(session_id)
+    
+    if session["status"] != "completed":
+        return HTMLResponse(content="<h1>Report still processing...</h1>")
+    
+    resource = await asyncio.to_thread(
+        render_cache.get_or_render, session_id, session, "report",
+        lambda: render_session_report(session_id, session)
+    )
+    return static_pages.respond(resource, request)
 
 # ============= REPORT PERSISTENCE ENDPOINTS =============
 
 @app.get("/reports/list")
-async def list_reports():
-    """List all saved reports"""
+async def list_reports(limit: int = 50, cursor: Optional[str] = None):
+    """List saved reports newest first (cursor paginated, served from the catalog)"""
     try:
-        if not os.path.exists("reports"):
-            return {"reports": [], "message": "No reports directory found"}
-        
-        report_files = [f for f in os.listdir("reports") if f.endswith('.json')]
-        reports = []
-        
-        for filename in report_files:
-            # Extract context_research_X from filename
-            import re
-            match = re.search(r'(context_research_\d+)', filename)
-            session_id = match.group(1) if match else filename.split('_')[0]
-            timestamp = filename.replace('.json', '').split('_', 1)[1] if '_' in filename else 'unknown'
-            
-            reports.append({
-                "filename": filename,
-                "session_id": session_id,
-                "created_at": timestamp,
-                "url": f"/reports/file/{filename}"
-            })
+        entries, next_cursor = report_catalog.list(limit=max(1, min(limit, 500)), cursor=cursor)
+        reports = [
+            {
+                "filename": entry["filename"],
+                "session_id": entry["session_id"],
+                "created_at": entry["created_at"],
+                "company_name": entry["company_name"],
+                "research_type": entry["research_type"],
+                "url": f"/reports/file/{entry['filename']}"
+            }
+            for entry in entries
+        ]
         
         return {
             "count": len(reports),
-            "reports": sorted(reports, key=lambda x: x['created_at'], reverse=True)
+            "total": report_catalog.count(),
+            "reports": reports,
+            "next_cursor": next_cursor
         }
         
     except Exception as e:
@@ -1167,21 +1904,12 @@ async def list_reports():
 @app.get("/reports/session/{session_id}")
 async def get_report_by_session(session_id: str):
     """Get the latest report for a specific session"""
+    entry = report_catalog.latest(session_id)
+    if entry is None:
+        raise HTTPException(status_code=404, detail=f"No reports found for session {session_id}")
+    
     try:
-        if not os.path.exists("reports"):
-            raise HTTPException(status_code=404, detail="No reports directory found")
-        
-        # Find reports matching this session_id
-        matching_files = [f for f in os.listdir("reports") 
-                         if f.startswith(f"{session_id}_") and f.endswith('.json')]
-        
-        if not matching_files:
-            raise HTTPException(status_code=404, detail=f"No reports found for session {session_id}")
-        
-        # Get the most recent one
-        latest_file = sorted(matching_files)[-1]
-        
-        with open(f"reports/{latest_file}", 'r') as f:
+        with open(report_catalog.file_path(entry["filename"]), 'r') as f:
             return json.load(f)
             
     except FileNotFoundError:
@@ -1197,7 +1925,7 @@ async def get_report_by_filename(filename: str):
         if ".." in filename or "/" in filename or "\\" in filename:
             raise HTTPException(status_code=400, detail="Invalid filename")
         
-        filepath = f"reports/{filename}"
+        filepath = report_catalog.file_path(filename)
         
         if not os.path.exists(filepath):
             raise HTTPException(status_code=404, detail="Report not found")
@@ -1212,20 +1940,8 @@ async def get_report_by_filename(filename: str):
 async def cleanup_old_reports(days_old: int = 30):
     """Clean up reports older than specified days (default 30)"""
     try:
-        if not os.path.exists("reports"):
-            return {"message": "No reports directory found", "deleted": 0}
-        
         cutoff_date = datetime.now() - timedelta(days=days_old)
-        deleted_count = 0
-        
-        for filename in os.listdir("reports"):
-            if filename.endswith('.json'):
-                filepath = f"reports/{filename}"
-                file_time = datetime.fromtimestamp(os.path.getmtime(filepath))
-                
-                if file_time < cutoff_date:
-                    os.remove(filepath)
-                    deleted_count += 1
+        deleted_count = report_catalog.delete_older_than(cutoff_date)
         
         return {
             "message": f"Deleted {deleted_count} reports older than {days_old} days",
@@ -1236,41 +1952,46 @@ async def cleanup_old_reports(days_old: int = 30):
         return {"error": str(e), "deleted": 0}
 
 @app.get("/library")
-async def research_library():
-    """Research library using in-memory session data (Render compatible)"""
+async def research_library(limit: int = 50, cursor: Optional[str] = None):
+    """Research library backed by the session store (survives restarts), one cursor page at a time"""
     
-    # Get reports from in-memory sessions instead of disk files
+    # Completed sessions come back newest first from the indexed status column;
+    # one extra row tells whether there is a next page
+    limit = max(1, min(limit, 500))
+    page = await asyncio.to_thread(session_store.list, "completed", limit + 1, cursor)
+    next_cursor = session_cursor(page[limit - 1]) if len(page) > limit else None
+    total_sessions, completed_sessions = await asyncio.gather(
+        asyncio.to_thread(session_store.count),
+        asyncio.to_thread(session_store.count, "completed")
+    )
     saved_reports = []
     
-    for session_id, session_data in research_sessions.items():
-        if session_data.get("status") == "completed":
-            # Extract company name from business context
-            business_context = session_data.get("business_context", {})
-            context_text = ""
-            
-            if isinstance(business_context, dict):
-                context_text = business_context.get("comprehensive_context", "")
-            else:
-                context_text = str(business_context)
-            
-            # Extract company name
-            company_name = "Unknown Company"
-            if "COMPANY NAME:" in context_text:
-                import re
-                match = re.search(r'COMPANY NAME:\s*(.+)', context_text, re.IGNORECASE)
-                if match:
-                    company_name = match.group(1).strip()
-            
-            saved_reports.append({
-                "session_id": session_id,
-                "company_name": company_name,
-                "created_at": session_data.get("created_at", "Unknown"),
-                "status": session_data.get("status", "unknown"),
-                "has_results": bool(session_data.get("agent_results", {}))
-            })
-    
-    # Sort by creation time (newest first)
-    saved_reports.sort(key=lambda x: x["created_at"], reverse=True)
+    for session_data in page[:limit]:
+        session_id = session_data["session_id"]
+        # Extract company name from business context
+        business_context = session_data.get("business_context", {})
+        context_text = ""
+        
+        if isinstance(business_context, dict):
+            context_text = business_context.get("comprehensive_context", "")
+        else:
+            context_text = str(business_context)
+        
+        # Extract company name
+        company_name = "Unknown Company"
+        if "COMPANY NAME:" in context_text:
+            import re
+            match = re.search(r'COMPANY NAME:\s*(.+)', context_text, re.IGNORECASE)
+            if match:
+                company_name = match.group(1).strip()
+        
+        saved_reports.append({
+            "session_id": session_id,
+            "company_name": company_name,
+            "created_at": session_data.get("created_at", "Unknown"),
+            "status": session_data.get("status", "unknown"),
+            "has_results": bool(session_data.get("agent_results", {}))
+        })
     
     html_content = f"""
     <!DOCTYPE html>
@@ -1297,7 +2018,7 @@ async def research_library():
             <h1>📚 Research Library</h1>
             <p>Access all your saved market research reports</p>
             
-            {f'<div class="success">✅ Found {len(saved_reports)} completed research session(s)</div>' if saved_reports else ''}
+            {f'<div class="success">✅ Found {completed_sessions} completed research session(s)</div>' if saved_reports else ''}
             
             {"".join([f'''
             <div class="report-item">
@@ -1312,13 +2033,14 @@ async def research_library():
             </div>
             ''' for report in saved_reports]) if saved_reports else '<p>No completed research sessions yet. <a href="/research">Start your first research</a></p>'}
             
+            {f'<p><a href="/library?limit={limit}&cursor={quote(next_cursor)}" class="btn">Older sessions →</a></p>' if next_cursor else ''}
+            
             <div class="debug">
                 <strong>Debug Info:</strong><br>
-                Total sessions in memory: {len(research_sessions)}<br>
-                Completed sessions: {len(saved_reports)}<br>
-                Session IDs: {list(research_sessions.keys())}<br>
-                File system (Render ephemeral): Reports directory exists on disk: {os.path.exists("reports")}<br>
-                <em>Note: Using in-memory storage since Render file system is ephemeral</em>
+                Total sessions stored: {total_sessions}<br>
+                Completed sessions: {completed_sessions}<br>
+                Session store: {type(session_store).__name__}<br>
+                Cataloged report files: {report_catalog.count()}<br>
             </div>
         </div>
     </body>
@@ -1329,19 +2051,10 @@ async def research_library():
 
 # ============= END REPORT PERSISTENCE ENDPOINTS =============
 
-@app.get("/research/{session_id}/psychology")
-async def get_deep_psychology_report(session_id: str, format: str = "html"):
+def render_psychology_report(session_id: str, session: Dict[str, Any], format: str = "html") -> str:
     """
-    Get deep psychological intelligence report - know your ICP better than they know themselves
+    Deep psychological intelligence report - know your ICP better than they know themselves
     """
-    if session_id not in research_sessions:
-        raise HTTPException(status_code=404, detail="Research session not found")
-    
-    session = research_sessions[session_id]
-    
-    if session["status"] != "completed":
-        return HTMLResponse(content="<h1>Report still processing...</h1>")
-    
     # Get session data
     session_data = {
         "session_id": session_id,
@@ -1355,17 +2068,14 @@ async def get_deep_psychology_report(session_id: str, format: str = "html"):
         markdown_content = format_deep_intelligence_report(session_data)
         
         if format == "markdown":
-            return HTMLResponse(
-                content=f"<pre style='white-space: pre-wrap; font-family: monospace; padding: 20px; background: #f5f5f5; border-radius: 8px;'>{markdown_content}</pre>",
-                headers={"Content-Type": "text/html"}
-            )
+            return f"<pre style='white-space: pre-wrap; font-family: monospace; padding: 20px; background: #f5f5f5; border-radius: 8px;'>{markdown_content}</pre>"
         
         # Convert to HTML
         html_content = deep_psychology_to_html(markdown_content, session_id)
         
     except Exception as e:
-        # Fallback if formatter has issues
-        html_content = f"""
+        # Fallback if formatter has issues - not cached, so a fixed formatter or data shows up on the next view
+        html_content = FallbackRender(f"""
         <!DOCTYPE html>
         <html>
         <head>
@@ -1415,68 +2125,61 @@ async def get_deep_psychology_report(session_id: str, format: str = "html"):
             </div>
         </body>
         </html>
-        """
+        """)
     
-    return HTMLResponse(content=html_content)
+    return html_content
+
+@app.get("/research/{session_id}/psychology")
+async def get_deep_psychology_report(session_id: str, request: Request, format: str = "html"):
+    """
+    Get deep psychological intelligence report - know your ICP better than they know themselves
+    """
+    session_id = resolve_session_id(session_id)
+    session = get_session_or_404(session_id)
+    
+    if session["status"] != "completed":
+        return HTMLResponse(content="<h1>Report still processing...</h1>")
+    
+    render_format = "psychology_markdown" if format == "markdown" else "psychology_html"
+    resource = await asyncio.to_thread(
+        render_cache.get_or_render, session_id, session, render_format,
+        lambda: render_psychology_report(session_id, session, format)
+    )
+    return static_pages.respond(resource, request)
 
 @app.get("/debug-library")
 async def debug_library():
     """Debug what's happening with the library"""
     
     debug_info = {
-        "reports_directory_exists": os.path.exists("reports"),
-        "files_in_reports": [],
+        "reports_directory_exists": os.path.exists(report_catalog.reports_dir),
+        "cataloged_reports": report_catalog.count(),
         "processed_reports": [],
         "research_sessions": {}
     }
     
-    # Check reports directory
-    if os.path.exists("reports"):
-        all_files = os.listdir("reports")
-        debug_info["files_in_reports"] = all_files
-        
-        for filename in all_files:
-            if filename.endswith('.json'):
-                try:
-                    with open(f"reports/{filename}", 'r') as f:
-                        report_data = json.load(f)
-                    
-                    # Extract session_id using multiple methods
-                    session_id_from_data = report_data.get("session_id", "NOT_FOUND")
-                    
-                    # Try regex extraction
-                    import re
-                    regex_match = re.search(r'(context_research_\d+)', filename)
-                    session_id_from_regex = regex_match.group(1) if regex_match else "NO_MATCH"
-                    
-                    # Try simple split
-                    parts = filename.split('_')
-                    session_id_from_split = '_'.join(parts[:3]) if len(parts) >= 3 else "TOO_FEW_PARTS"
-                    
-                    debug_info["processed_reports"].append({
-                        "filename": filename,
-                        "session_id_from_data": session_id_from_data,
-                        "session_id_from_regex": session_id_from_regex,
-                        "session_id_from_split": session_id_from_split,
-                        "company_name": report_data.get("company_name", "NOT_FOUND"),
-                        "created_at": report_data.get("created_at", "NOT_FOUND"),
-                        "file_keys": list(report_data.keys())
-                    })
-                    
-                except Exception as e:
-                    debug_info["processed_reports"].append({
-                        "filename": filename,
-                        "error": str(e)
-                    })
+    # Report metadata comes from the catalog; no report file is opened here
+    entries, _ = report_catalog.list(limit=200)
+    for entry in entries:
+        debug_info["processed_reports"].append({
+            "filename": entry["filename"],
+            "session_id": entry["session_id"],
+            "company_name": entry["company_name"],
+            "created_at": entry["created_at"],
+            "research_type": entry["research_type"],
+            "size_bytes": entry["size_bytes"]
+        })
     
-    # Check in-memory sessions
+    # Check stored sessions
+    stored_sessions = await asyncio.to_thread(session_store.list)
     debug_info["research_sessions"] = {
-        "session_count": len(research_sessions),
-        "session_ids": list(research_sessions.keys()),
+        "session_count": await asyncio.to_thread(session_store.count),
+        "session_ids": [session_data["session_id"] for session_data in stored_sessions],
         "session_details": {}
     }
     
-    for session_id, session_data in research_sessions.items():
+    for session_data in stored_sessions:
+        session_id = session_data["session_id"]
         debug_info["research_sessions"]["session_details"][session_id] = {
             "status": session_data.get("status"),
             "has_results": "agent_results" in session_data,
@@ -1486,40 +2189,9 @@ async def debug_library():
     
     return debug_info
 
-def deep_psychology_to_html(markdown_content: str, session_id: str) -> str:
-    """
-    Convert deep psychology markdown to HTML with specialized styling
-    """
-    
-    # Convert markdown to HTML
-    html_content = markdown_content
-    
-    # Convert headers
-    html_content = re.sub(r'^# (.+)$', r'<h1>\1</h1>', html_content, flags=re.MULTILINE)
-    html_content = re.sub(r'^## (.+)$', r'<h2>\1</h2>', html_content, flags=re.MULTILINE)
-    html_content = re.sub(r'^### (.+)$', r'<h3>\1</h3>', html_content, flags=re.MULTILINE)
-    
-    # Convert bold text
-    html_content = re.sub(r'\*\*(.+?)\*\*', r'<strong>\1</strong>', html_content)
-    
-    # Convert italic text  
-    html_content = re.sub(r'\*(.+?)\*', r'<em>\1</em>', html_content)
-    
-    # Convert bullet points
-    html_content = re.sub(r'^- (.+)$', r'<li>\1</li>', html_content, flags=re.MULTILINE)
-    
-    # Convert blockquotes (customer thoughts)
-    html_content = re.sub(r'^> (.+)$', r'<blockquote class="customer-voice">\1</blockquote>', html_content, flags=re.MULTILINE)
-    
-    # Convert line breaks
-    html_content = html_content.replace('\n\n', '</p><p>')
-    html_content = html_content.replace('\n', '<br>')
-    
-    # Wrap in paragraphs
-    html_content = f'<p>{html_content}</p>'
-    
-    # Create full HTML document with psychology-focused styling
-    full_html = f"""
+def psychology_page_shell(session_id: str):
+    """(header, footer) HTML around the rendered psychology report"""
+    header = f"""
     <!DOCTYPE html>
     <html>
     <head>
@@ -1592,7 +2264,11 @@ def deep_psychology_to_html(markdown_content: str, session_id: str) -> str:
                 padding-left: 15px;
                 position: relative;
             }}
-            li::before {{
+            ul {{
+                list-style: none;
+                padding-left: 20px;
+            }}
+            ul > li::before {{
                 content: '🧠';
                 position: absolute;
                 left: -5px;
@@ -1636,9 +2312,8 @@ def deep_psychology_to_html(markdown_content: str, session_id: str) -> str:
                 <a href="/research/{session_id}/report" class="btn">📊 Standard Report</a>
                 <a href="/research/{session_id}/results" class="btn">🔍 Raw Data</a>
             </div>
-            
-            {html_content}
-            
+    """
+    footer = f"""
             <hr style="margin: 50px 0; border: none; border-top: 2px solid #e2e8f0;">
             <div style="text-align: center; color: #718096; font-size: 0.95em; background: #f7fafc; padding: 20px; border-radius: 8px;">
                 <strong>🧠 Deep Intelligence Session {session_id}</strong><br>
@@ -1650,39 +2325,374 @@ def deep_psychology_to_html(markdown_content: str, session_id: str) -> str:
     </body>
     </html>
     """
-    
-    return full_html
+    return header, footer
+
+def iter_deep_psychology_html(markdown_content: str, session_id: str):
+    """Stream the psychology report page: shell header, markdown rendered in one pass, footer"""
+    header, footer = psychology_page_shell(session_id)
+    yield header
+    yield from iter_markdown_html(markdown_content)
+    yield footer
+
+def deep_psychology_to_html(markdown_content: str, session_id: str) -> str:
+    """
+    Convert deep psychology markdown to HTML with specialized styling
+    """
+    return "".join(iter_deep_psychology_html(markdown_content, session_id))
 
 @app.get("/research/{session_id}/results")
 async def get_research_results(session_id: str):
     """
     Get the full research results as JSON
     """
-    if session_id not in research_sessions:
-        raise HTTPException(status_code=404, detail="Research session not found")
-    
-    session = research_sessions[session_id]
+    session_id = resolve_session_id(session_id)
+    session = get_session_or_404(session_id)
     
     return {
         "session_id": session_id,
         "status": session["status"],
+        "phases": session.get("phases", {}),
+        "error": session.get("error"),
+        "stopped_reason": session.get("stopped_reason"),
+        "llm_usage": session.get("llm_usage", []),
         "business_context": session["business_context"],
         "agent_results": session.get("agent_results", {}),
-        "created_at": session["created_at"]
+        "checkpointed_stages": checkpoint_store.stages(session_id),
+        "resume_count": session.get("resume_count", 0),
+        "created_at": session["created_at"],
+        "completed_at": session.get("completed_at")
+    }
+
+@app.post("/research/batch", status_code=202)
+async def submit_research_batch(request: Request, max_concurrency: Optional[int] = None):
+    """
+    Queue a batch of business contexts: JSONL body, one SimpleBusinessContext per line.
+    Runs in the low-priority batch lane; resubmitting the same records resumes the batch.
+    """
+    if await load_agent("icp_research") is None:
+        raise HTTPException(status_code=503, detail="Agent system not available")
+    
+    body = (await request.body()).decode("utf-8")
+    records, errors = parse_jsonl(body)
+    if not records:
+        raise HTTPException(status_code=400, detail={"message": "No valid records in JSONL body", "errors": errors})
+    
+    batch_id = batch_id_for(records)
+    runner = BatchRunner(batch_id, run_batch_record, max_concurrency=max_concurrency)
+    try:
+        await asyncio.to_thread(runner.save_input, records)
+    except BatchInputMismatch as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    
+    if batch_id not in research_job_queue.active_jobs:
+        await research_job_queue.enqueue(batch_id, "batch", {"max_concurrency": max_concurrency}, lane=BATCH_LANE)
+    
+    return {
+        "batch_id": batch_id,
+        "status": "queued",
+        "records": len(records),
+        "rejected_lines": errors,
+        "batch_queue_depth": research_job_queue.depth(BATCH_LANE),
+        "status_url": f"/research/batch/{batch_id}"
     }
 
+@app.get("/research/batch/{batch_id}")
+async def get_research_batch(batch_id: str):
+    """Batch progress: per-status counts plus the checkpointed result of each finished record"""
+    try:
+        runner = BatchRunner(batch_id, run_batch_record)
+    except ValueError:
+        raise HTTPException(status_code=404, detail="Batch not found")
+    if not os.path.exists(runner.input_path):
+        raise HTTPException(status_code=404, detail="Batch not found")
+    
+    progress = runner.progress()
+    progress["active"] = batch_id in research_job_queue.active_jobs
+    progress["records"] = list(runner.load_checkpoint().values())
+    return progress
+
+@app.post("/research/batch/{batch_id}/resume", status_code=202)
+async def resume_research_batch(batch_id: str, max_concurrency: Optional[int] = None):
+    """Re-queue an interrupted batch; records already completed are skipped"""
+    try:
+        runner = BatchRunner(batch_id, run_batch_record)
+    except ValueError:
+        raise HTTPException(status_code=404, detail="Batch not found")
+    if not os.path.exists(runner.input_path):
+        raise HTTPException(status_code=404, detail="Batch not found")
+    
+    if batch_id not in research_job_queue.active_jobs:
+        await research_job_queue.enqueue(batch_id, "batch", {"max_concurrency": max_concurrency}, lane=BATCH_LANE)
+    return {"batch_id": batch_id, "status": "queued", "status_url": f"/research/batch/{batch_id}"}
+
+@app.post("/research/{session_id}/resume", status_code=202)
+async def resume_research(session_id: str):
+    """
+    Restart a failed, cancelled or interrupted session from its first
+    incomplete stage. Stages checkpointed by earlier attempts are reused.
+    """
+    session_id = resolve_session_id(session_id)
+    session = get_session_or_404(session_id)
+    tracer.bind(session_id)
+    if session.get("pipeline") not in PIPELINE_JOB_KINDS:
+        raise HTTPException(status_code=400, detail="Session was not started by a resumable pipeline")
+    if active_runs.get(session_id) is not None or session_id in research_job_queue.active_jobs:
+        raise HTTPException(status_code=409, detail="Session is still running")
+    if session["status"] not in RESUMABLE_STATUSES:
+        raise HTTPException(status_code=409, detail=f"Session is {session['status']} and cannot be resumed")
+    if not claim_for_resume(session_id):
+        raise HTTPException(status_code=409, detail="Session is still running in another worker")
+    
+    await enqueue_resumed_session(session_id, session)
+    return {
+        "session_id": session_id,
+        "status": "queued",
+        "checkpointed_stages": checkpoint_store.stages(session_id),
+        "status_url": f"/research/{session_id}/results",
+        "stream_url": f"/research/{session_id}/stream"
+    }
+
+@app.delete("/research/{session_id}")
+async def cancel_research(session_id: str):
+    """Cancel a queued or running research session; finished stages are kept as a partial result"""
+    session = get_session_or_404(session_id)
+    tracer.bind(session_id)
+    
+    if session["status"] == "alias":
+        # Detach this duplicate request only; the shared run keeps going for the others
+        session_store.update(session_id, status="cancelled", stopped_reason="cancelled", completed_at=datetime.now().isoformat())
+        return {"session_id": session_id, "status": "cancelled", "message": "Detached from the shared research run"}
+    
+    if session["status"] in ("completed", "error", "cancelled"):
+        return {"session_id": session_id, "status": session["status"], "message": "Research already finished"}
+    
+    cancelling = {
+        "session_id": session_id,
+        "status": "cancelling",
+        "message": "Cancellation requested; in-flight agent calls stop at their next checkpoint",
+        "status_url": f"/research/{session_id}/results"
+    }
+    if active_runs.cancel(session_id):
+        return cancelling
+    
+    if session["status"] == "processing" and run_owner_alive(session.get("run_owner")):
+        # Running in another worker process - it picks the request up from the store.
+        # The run's own cancelled result updates the status and releases its coalescing claim.
+        session_store.update(session_id, cancel_requested="cancelled")
+        return cancelling
+    
+    # Still waiting in the job queue (the worker skips it), or its worker is gone.
+    # The flag also stops a run whose worker picks the job up at this very moment.
+    session_store.update(session_id, status="cancelled", stopped_reason="cancelled", cancel_requested="cancelled",
+                         completed_at=datetime.now().isoformat())
+    request_coalescer.release(session_id)
+    research_events.publish(session_id, "cancelled", {"status": "cancelled", "reason": "cancelled"})
+    message = "Queued research cancelled" if session["status"] == "queued" else "Interrupted research cancelled"
+    return {"session_id": session_id, "status": "cancelled", "message": message}
+
+@app.get("/research/{session_id}/trace")
+async def get_research_trace(session_id: str, format: str = "html"):
+    """
+    Waterfall of every span recorded for a session - endpoint, job, pipeline
+    phases, coordinator stages, crew kickoffs and LLM calls - with the
+    critical path marked. `format=json` returns the raw spans.
+    """
+    session_id = resolve_session_id(session_id)
+    get_session_or_404(session_id)
+    spans = await asyncio.to_thread(tracer.load, session_id)
+    if format == "json":
+        return {"session_id": session_id, "summary": summarize(spans), "spans": spans}
+    return HTMLResponse(content=render_waterfall(session_id, spans))
+
+@app.get("/research/{session_id}/agent-log")
+async def get_agent_log(session_id: str, limit: Optional[int] = None):
+    """
+    Recent agent chatter for a session - crew reasoning steps, task outputs
+    and agent log events - from the bounded in-memory buffer of the worker
+    that ran it. With AGENT_VERBOSE off this is the only place it goes.
+    """
+    session_id = resolve_session_id(session_id)
+    get_session_or_404(session_id)
+    entries = agent_chatter.entries(session_id, limit)
+    return {"session_id": session_id, "entries": entries, "count": len(entries)}
+
+FINISHED_SESSION_STATUSES = ("completed", "error", "cancelled")
+
+def terminal_event(session_id: str, session: Dict[str, Any], event_id: int) -> Dict[str, Any]:
+    """The complete / cancelled / failed event for a finished session, built from the store"""
+    if session["status"] == "completed":
+        return {"id": event_id, "event": "complete", "data": {
+            "status": "completed",
+            "session_id": session_id,
+            "report_url": f"/research/{session_id}/report",
+            "results_url": f"/research/{session_id}/results"
+        }}
+    if session["status"] == "cancelled":
+        return {"id": event_id, "event": "cancelled", "data": {
+            "status": "cancelled",
+            "reason": session.get("stopped_reason"),
+            "results_url": f"/research/{session_id}/results"
+        }}
+    return {"id": event_id, "event": "failed", "data": {"status": "error", "error": session.get("error")}}
+
+async def poll_session_events(session_id: str, session: Dict[str, Any], request: Request,
+                              interval: float = None, heartbeat_seconds: float = 15.0):
+    """
+    Phase and terminal events derived from the session store, for a run another
+    worker executes. No token deltas or stage outputs - those only exist in the
+    running worker. Events carry id 0, so a reconnect starts over instead of
+    skipping this worker's own event ids. Stops early if the session starts
+    publishing here (e.g. it is resumed on this worker); yields None as a heartbeat.
+    """
+    interval = interval or float(os.getenv("STREAM_POLL_SECONDS", "1.0"))
+    phases: Dict[str, Any] = {}
+    quiet = 0.0
+    while not await request.is_disconnected():
+        changed = False
+        for phase, info in (session.get("phases") or {}).items():
+            if phases.get(phase) != info:
+                phases[phase] = info
+                changed = True
+                yield {"id": 0, "event": "phase", "data": {"phase": phase, **info}}
+        if session["status"] in FINISHED_SESSION_STATUSES:
+            yield terminal_event(session_id, session, event_id=0)
+            return
+        if session.get("run_owner") == RUN_OWNER or research_events.has_history(session_id):
+            return
+        
+        quiet = 0.0 if changed else quiet + interval
+        if quiet >= heartbeat_seconds:
+            quiet = 0.0
+            yield None
+        await asyncio.sleep(interval)
+        session = session_store.get(session_id) or session
+
+@app.get("/research/{session_id}/stream")
+async def stream_research(session_id: str, request: Request):
+    """
+    Server-Sent Events for a research session: status, phase start/end, token
+    deltas and stage outputs as they happen, ending with complete, failed or cancelled.
+    Reconnecting clients resume after the Last-Event-ID they received. A session
+    running on another worker is followed through the session store (phases and
+    the final event only).
+    """
+    session_id = resolve_session_id(session_id)
+    session = get_session_or_404(session_id)
+    
+    try:
+        last_event_id = int(request.headers.get("last-event-id", "0"))
+    except ValueError:
+        last_event_id = 0
+    
+    async def event_source():
+        # Finished before this process saw it (e.g. after a restart) - summarize from the store
+        if session["status"] in FINISHED_SESSION_STATUSES and not research_events.has_history(session_id):
+            yield format_sse({"id": 1, "event": "phase_summary", "data": session.get("phases", {})})
+            yield format_sse(terminal_event(session_id, session, event_id=2))
+            return
+        
+        if last_event_id == 0:
+            yield format_sse({"id": 0, "event": "status", "data": {"status": session["status"]}})
+        if session.get("run_owner") != RUN_OWNER and not research_events.has_history(session_id):
+            # Another worker runs this session and the event bus is per process:
+            # follow its phases through the session store instead
+            async for item in poll_session_events(session_id, session, request):
+                yield format_sse(item)
+                if item is not None and item["event"] in TERMINAL_EVENTS:
+                    return
+            if await request.is_disconnected():
+                return
+        async for item in research_events.subscribe(session_id, last_event_id=last_event_id):
+            if await request.is_disconnected():
+                break
+            yield format_sse(item)
+    
+    return StreamingResponse(
+        event_source(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "Connection": "keep-alive",
+            # Stop nginx-style proxies from buffering the stream
+            "X-Accel-Buffering": "no"
+        }
+    )
+
 @app.get("/health")
 async def health_check():
+    # In-memory state only - stored session counts are a SQLite scan, exported by /metrics (research_sessions_stored)
     return {
         "status": "healthy", 
         "service": "market-research-agents", 
         "version": "3.0.0",
-        "agents_available": AGENTS_AVAILABLE,
-        "interview_agent": INTERVIEW_AGENT_AVAILABLE,
-        "comprehensive_pipeline": COMPREHENSIVE_AGENT_AVAILABLE,
+        "job_queue_depth": research_job_queue.depth(INTERACTIVE_LANE),
+        "batch_queue_depth": research_job_queue.depth(BATCH_LANE),
+        "active_jobs": len(research_job_queue.active_jobs),
+        "active_runs": active_runs.active_count(),
+        "llm_cache": llm_cache.stats(),
+        "llm_rate_limits": rate_limiter.stats(),
+        "llm_backend": llm_gateway.backend_stats(),
+        "coalesced_inflight_runs": request_coalescer.inflight_count(),
+        "render_cache": render_cache.stats(),
+        "agent_chatter": agent_chatter.stats(),
+        "agents_available": agent_flag("icp_research"),
+        "interview_agent": agent_flag("interview_intelligence"),
+        "comprehensive_pipeline": agent_flag("comprehensive_research"),
+        "agent_warmup": agent_registry.warmup_state,
         "claude_enabled": USE_CLAUDE
     }
 
+@app.get("/static/{filename}")
+async def static_asset(filename: str, request: Request):
+    """Hashed CSS/JS split out of the pre-rendered pages"""
+    response = static_pages.asset_response(filename, request)
+    if response is None:
+        raise HTTPException(status_code=404, detail="Asset not found")
+    return response
+
+def _rate_limiter_models(field: str) -> Dict[tuple, float]:
+    return {
+        tuple(name.split(":", 1)): stats[field]
+        for name, stats in rate_limiter.stats()["models"].items()
+    }
+
+# Values other components already keep, read only when /metrics is scraped
+metrics.gauge("research_job_queue_depth", "Jobs waiting for a worker by lane",
+              lambda: {(lane,): research_job_queue.depth(lane) for lane in (INTERACTIVE_LANE, BATCH_LANE)}, ("lane",))
+metrics.gauge("research_active_jobs", "Jobs currently running on a worker",
+              lambda: single(len(research_job_queue.active_jobs)))
+metrics.gauge("research_active_runs", "Research runs in progress (cancellable)", lambda: single(active_runs.active_count()))
+metrics.gauge("research_sessions", "Stored research sessions by status",
+              lambda: {(status,): session_store.count(status=status)
+                       for status in ("queued", "processing", "completed", "error", "cancelled")}, ("status",))
+metrics.gauge("research_sessions_stored", "All stored research sessions", lambda: single(session_store.count()))
+metrics.gauge("research_coalesced_inflight_runs", "In-flight runs shared by duplicate submissions",
+              lambda: single(request_coalescer.inflight_count()))
+metrics.gauge("llm_in_flight_requests", "LLM API requests in flight by provider and model",
+              lambda: _rate_limiter_models("in_flight"), ("provider", "model"))
+metrics.gauge("llm_rate_limit_queue_depth", "LLM requests waiting on the rate limiter by provider and model",
+              lambda: _rate_limiter_models("queue_depth"), ("provider", "model"))
+metrics.gauge("llm_concurrency_limit", "Adaptive (AIMD) concurrency limit by provider and model",
+              lambda: _rate_limiter_models("concurrency_limit"), ("provider", "model"))
+metrics.gauge("llm_cache_hits_total", "LLM/crew response cache hits", lambda: single(llm_cache.hits), kind="counter")
+metrics.gauge("llm_cache_misses_total", "LLM/crew response cache misses", lambda: single(llm_cache.misses), kind="counter")
+metrics.gauge("render_cache_hits_total", "Rendered report cache hits", lambda: single(render_cache.hits), kind="counter")
+metrics.gauge("render_cache_misses_total", "Rendered report cache misses", lambda: single(render_cache.misses), kind="counter")
+metrics.gauge("render_cache_entries", "Rendered reports held in memory", lambda: single(render_cache.stats()["entries"]))
+
+@app.get("/metrics")
+async def metrics_endpoint():
+    """Prometheus text exposition of request, stage, LLM, cache, session store and queue metrics"""
+    # Gauges query SQLite (session counts), so render off the event loop
+    content = await asyncio.to_thread(metrics.render)
+    return PlainTextResponse(content=content, media_type="text/plain; version=0.0.4; charset=utf-8")
+
+@app.get("/ready")
+async def readiness_check():
+    """Readiness probe: 200 once the agent modules are imported, 503 while warm-up is still running"""
+    status = agent_registry.status()
+    return JSONResponse(status_code=200 if status["ready"] else 503, content=status)
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=int(os.environ.get("PORT", 8000)))
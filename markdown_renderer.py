@@ -0,0 +1,119 @@
+# markdown_renderer.py
+# Single-pass markdown -> HTML for the deep intelligence reports (headers, lists, quotes, emphasis)
+
+import html
+import re
+from typing import Iterable, Iterator
+
+# One pattern classifies every line; groups say which block it starts
+BLOCK_PATTERN = re.compile(
+    r"(?P<rule>(?:-{3,}|\*{3,}|_{3,})\s*$)"
+    r"|(?P<heading>#{1,6})\s+(?P<heading_text>.*)"
+    r"|[-*+]\s+(?P<bullet>.*)"
+    r"|\d+[.)]\s+(?P<ordered>.*)"
+    r"|>\s?(?P<quote>.*)"
+)
+
+# Emphasis and code spans, resolved left to right in one scan of the (escaped) text
+INLINE_PATTERN = re.compile(
+    r"\*\*(?P<strong>.+?)\*\*"
+    r"|\*(?P<em>[^*\s](?:[^*]*?[^*\s])?)\*"
+    r"|`(?P<code>[^`]+)`"
+)
+
+# First characters that can start a non-paragraph block (plus digits for ordered lists)
+BLOCK_STARTS = frozenset("-*+_#>0123456789")
+
+QUOTE_CLASS = "customer-voice"
+
+# Block containers and the tags that open/close them
+_CONTAINERS = {
+    "p": ("<p>", "</p>\n"),
+    "ul": ("<ul>\n", "</ul>\n"),
+    "ol": ("<ol>\n", "</ol>\n"),
+    "quote": (f'<blockquote class="{QUOTE_CLASS}">', "</blockquote>\n"),
+}
+
+
+def _inline_replace(match: re.Match) -> str:
+    if match.group("strong") is not None:
+        return f"<strong>{render_inline_escaped(match.group('strong'))}</strong>"
+    if match.group("em") is not None:
+        return f"<em>{match.group('em')}</em>"
+    return f"<code>{match.group('code')}</code>"
+
+
+def render_inline_escaped(text: str) -> str:
+    """Inline markup for text that is already HTML-escaped"""
+    return INLINE_PATTERN.sub(_inline_replace, text)
+
+
+def render_inline(text: str) -> str:
+    # Most report lines have nothing to escape or format; skip the scans for those
+    if "&" in text or "<" in text or ">" in text:
+        text = html.escape(text, quote=False)
+    if "*" not in text and "`" not in text:
+        return text
+    return INLINE_PATTERN.sub(_inline_replace, text)
+
+
+def iter_markdown_html(markdown: str) -> Iterator[str]:
+    """
+    Yield HTML for `markdown` block by block, in one pass over its lines.
+
+    Consecutive list items share one <ul>/<ol>, consecutive quote lines one
+    blockquote, and consecutive text lines one <p> (joined with <br>).
+    Headings and rules always close the open block first, so every tag is
+    properly nested. Text is HTML-escaped before inline markup is applied.
+    """
+    return _render_lines(markdown.splitlines())
+
+
+def _render_lines(lines: Iterable[str]) -> Iterator[str]:
+    open_block = None
+    for raw_line in lines:
+        line = raw_line.strip()
+        if not line:
+            if open_block is not None:
+                yield _CONTAINERS[open_block][1]
+                open_block = None
+            continue
+
+        match = BLOCK_PATTERN.match(line) if line[0] in BLOCK_STARTS else None
+        kind = match.lastgroup if match else None
+        if kind == "heading_text":
+            kind = "heading"
+
+        if kind == "bullet":
+            block, content = "ul", f"<li>{render_inline(match.group('bullet'))}</li>\n"
+        elif kind == "ordered":
+            block, content = "ol", f"<li>{render_inline(match.group('ordered'))}</li>\n"
+        elif kind == "quote":
+            block, content = "quote", render_inline(match.group("quote"))
+        elif kind in ("heading", "rule"):
+            block = None
+            if kind == "heading":
+                level = len(match.group("heading"))
+                content = f"<h{level}>{render_inline(match.group('heading_text'))}</h{level}>\n"
+            else:
+                content = "<hr>\n"
+        else:
+            block, content = "p", render_inline(line)
+
+        if block != open_block:
+            if open_block is not None:
+                yield _CONTAINERS[open_block][1]
+            if block is not None:
+                yield _CONTAINERS[block][0]
+            open_block = block
+        elif block in ("p", "quote"):
+            # Another line of the same paragraph/quote
+            content = f"<br>{content}"
+        yield content
+
+    if open_block is not None:
+        yield _CONTAINERS[open_block][1]
+
+
+def render_markdown(markdown: str) -> str:
+    return "".join(iter_markdown_html(markdown))
@@ -0,0 +1,118 @@
+# render_cache.py
+# Memoized report renderings per (session, result version, format) - completed sessions render once
+
+import os
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+from email.utils import format_datetime
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from static_pages import StaticResource
+
+# Reports revalidate on every view; an unchanged session answers 304
+REPORT_CACHE_CONTROL = "private, no-cache"
+
+
+def result_version(session: Dict[str, Any]) -> str:
+    """
+    Identifies one set of results for a session.
+
+    A resume bumps resume_count and a finished run stamps a new completed_at,
+    so a resumed or re-run session never matches an older rendering.
+    """
+    return f"{session.get('resume_count', 0)}:{session.get('completed_at') or ''}"
+
+
+def http_date(timestamp: Optional[str]) -> Optional[str]:
+    """ISO timestamp (as stored on sessions, local time) -> Last-Modified header value"""
+    if not timestamp:
+        return None
+    try:
+        moment = datetime.fromisoformat(timestamp)
+    except ValueError:
+        return None
+    # Naive timestamps are local time; astimezone() interprets them as such
+    return format_datetime(moment.astimezone(timezone.utc), usegmt=True)
+
+
+class FallbackRender(str):
+    """A page served in place of a rendering that failed - returned as is, never cached"""
+
+
+class RenderCache:
+    """
+    LRU of rendered report bodies keyed by (session_id, result_version, format).
+
+    Entries are StaticResources, so a hit also reuses the ETag and the
+    precompressed gzip/br variants. Rendering happens on the first request
+    for a key (or eagerly when a run completes); `invalidate` drops every entry of a
+    session when it is resumed or re-run. Each worker keeps its own cache -
+    the version in the key comes from the shared session store, so workers
+    can never serve a stale rendering, only render once more.
+    """
+
+    def __init__(self, max_entries: int = None):
+        self.max_entries = max_entries or int(os.getenv("RENDER_CACHE_SIZE", "256"))
+        self._entries: "OrderedDict[Tuple[str, str, str], StaticResource]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, session_id: str, version: str, fmt: str) -> Optional[StaticResource]:
+        key = (session_id, version, fmt)
+        with self._lock:
+            resource = self._entries.get(key)
+            if resource is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return resource
+
+    def put(self, session_id: str, version: str, fmt: str, resource: StaticResource):
+        with self._lock:
+            # Only the newest version of a session is worth keeping
+            for key in [key for key in self._entries if key[0] == session_id and key[1] != version]:
+                del self._entries[key]
+            self._entries[(session_id, version, fmt)] = resource
+            self._entries.move_to_end((session_id, version, fmt))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get_or_render(self, session_id: str, session: Dict[str, Any], fmt: str,
+                      render: Callable[[], str], media_type: str = "text/html; charset=utf-8") -> StaticResource:
+        """
+        The cached rendering for the session's current results, rendering it on a miss.
+        A FallbackRender is served but not cached, so the next request renders again.
+        """
+        version = result_version(session)
+        resource = self.get(session_id, version, fmt)
+        if resource is None:
+            body = render()
+            resource = StaticResource(body, media_type, REPORT_CACHE_CONTROL,
+                                      last_modified=http_date(session.get("completed_at")))
+            if not isinstance(body, FallbackRender):
+                self.put(session_id, version, fmt, resource)
+        return resource
+
+    def invalidate(self, session_id: str) -> int:
+        with self._lock:
+            keys = [key for key in self._entries if key[0] == session_id]
+            for key in keys:
+                del self._entries[key]
+        return len(keys)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else None
+        }
+
+
+# Shared cache of rendered session reports used by the report endpoints
+render_cache = RenderCache()
@@ -0,0 +1,271 @@
+# report_catalog.py
+# Indexed catalog of saved report files - written atomically alongside each report
+
+import json
+import os
+import re
+import threading
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from session_store import open_database
+
+
+def extract_company_name(context_text: str) -> str:
+    match = re.search(r'COMPANY NAME:\s*(.+)', context_text or "", re.IGNORECASE)
+    return match.group(1).strip() if match else "Unknown Company"
+
+
+class ReportCatalog:
+    """
+    Report files stay on disk as JSON, but every lookup goes through this
+    catalog so no endpoint has to list or parse the reports directory.
+
+    - `reports` holds one row per file, indexed by (session_id, created_at)
+      and (created_at, filename) for time-ordered keyset pagination.
+    - `latest_reports` keeps the newest file per session, so "latest report
+      for session" is a primary-key lookup.
+
+    The report file is written to a temp file and renamed into place before
+    its catalog rows are committed, so the catalog never points at a partial
+    or missing file.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS reports (
+            filename TEXT PRIMARY KEY,
+            session_id TEXT NOT NULL,
+            created_at TEXT NOT NULL,
+            research_type TEXT,
+            company_name TEXT,
+            status TEXT,
+            size_bytes INTEGER NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_reports_session ON reports (session_id, created_at);
+        CREATE INDEX IF NOT EXISTS idx_reports_created_at ON reports (created_at, filename);
+        CREATE TABLE IF NOT EXISTS latest_reports (
+            session_id TEXT PRIMARY KEY,
+            filename TEXT NOT NULL,
+            created_at TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS catalog_meta (
+            key TEXT PRIMARY KEY,
+            value TEXT
+        );
+    """
+
+    COLUMNS = "filename, session_id, created_at, research_type, company_name, status, size_bytes"
+
+    def __init__(self, path: str = None, reports_dir: str = None):
+        self.path = path or os.getenv("REPORT_CATALOG_PATH") or os.getenv("SESSION_DB_PATH", "data/research.db")
+        self.reports_dir = reports_dir or os.getenv("REPORTS_DIR", "reports")
+        self._local = threading.local()
+        self._connection().executescript(self.SCHEMA)
+        self.backfill()
+
+    def _connection(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = open_database(self.path)
+            self._local.connection = connection
+        return connection
+
+    def file_path(self, filename: str) -> str:
+        return os.path.join(self.reports_dir, filename)
+
+    # ---- writes ----
+
+    def _index(self, connection, entry: Dict[str, Any]):
+        connection.execute(
+            f"INSERT OR REPLACE INTO reports ({self.COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            tuple(entry[column.strip()] for column in self.COLUMNS.split(","))
+        )
+        connection.execute(
+            """
+            INSERT INTO latest_reports (session_id, filename, created_at) VALUES (?, ?, ?)
+            ON CONFLICT(session_id) DO UPDATE SET filename = excluded.filename, created_at = excluded.created_at
+            WHERE excluded.created_at >= latest_reports.created_at
+            """,
+            (entry["session_id"], entry["filename"], entry["created_at"])
+        )
+
+    def write_report(self, session_id: str, report_data: Dict[str, Any], suffix: str = "comprehensive") -> Dict[str, Any]:
+        """Write a report file atomically and index it; returns the catalog entry"""
+        created_at = report_data.get("created_at") or datetime.now().isoformat()
+        filename = f"{session_id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{suffix}.json"
+        path = self.file_path(filename)
+
+        os.makedirs(self.reports_dir, exist_ok=True)
+        data = json.dumps(report_data, indent=2, default=str)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+        business_context = report_data.get("business_context", "")
+        if isinstance(business_context, dict):
+            business_context = business_context.get("comprehensive_context", "")
+        entry = {
+            "filename": filename,
+            "session_id": session_id,
+            "created_at": created_at,
+            "research_type": report_data.get("research_type"),
+            "company_name": report_data.get("company_name") or extract_company_name(str(business_context)),
+            "status": report_data.get("status"),
+            "size_bytes": len(data.encode("utf-8"))
+        }
+
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            self._index(connection, entry)
+            connection.execute("COMMIT")
+        except Exception:
+            connection.execute("ROLLBACK")
+            raise
+        return entry
+
+    def delete_older_than(self, cutoff: datetime) -> int:
+        """Remove report files created before cutoff and drop them from the catalog"""
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            rows = connection.execute(
+                "SELECT filename, session_id FROM reports WHERE created_at < ?", (cutoff.isoformat(),)
+            ).fetchall()
+            filenames = [row["filename"] for row in rows]
+            sessions = {row["session_id"] for row in rows}
+
+            connection.executemany("DELETE FROM reports WHERE filename = ?", [(name,) for name in filenames])
+            for session_id in sessions:
+                connection.execute("DELETE FROM latest_reports WHERE session_id = ?", (session_id,))
+                connection.execute(
+                    """
+                    INSERT INTO latest_reports (session_id, filename, created_at)
+                    SELECT session_id, filename, created_at FROM reports
+                    WHERE session_id = ? ORDER BY created_at DESC, filename DESC LIMIT 1
+                    """,
+                    (session_id,)
+                )
+            connection.execute("COMMIT")
+        except Exception:
+            connection.execute("ROLLBACK")
+            raise
+
+        for filename in filenames:
+            try:
+                os.remove(self.file_path(filename))
+            except OSError:
+                pass
+        return len(filenames)
+
+    # ---- reads ----
+
+    @staticmethod
+    def encode_cursor(entry: Dict[str, Any]) -> str:
+        return f"{entry['created_at']}|{entry['filename']}"
+
+    @staticmethod
+    def decode_cursor(cursor: str) -> Tuple[str, str]:
+        created_at, _, filename = cursor.partition("|")
+        return created_at, filename
+
+    def list(self, limit: int = 50, cursor: Optional[str] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """Newest first; returns (entries, next_cursor)"""
+        if cursor:
+            created_at, filename = self.decode_cursor(cursor)
+            rows = self._connection().execute(
+                f"""
+                SELECT {self.COLUMNS} FROM reports
+                WHERE created_at < ? OR (created_at = ? AND filename < ?)
+                ORDER BY created_at DESC, filename DESC LIMIT ?
+                """,
+                (created_at, created_at, filename, limit + 1)
+            ).fetchall()
+        else:
+            rows = self._connection().execute(
+                f"SELECT {self.COLUMNS} FROM reports ORDER BY created_at DESC, filename DESC LIMIT ?",
+                (limit + 1,)
+            ).fetchall()
+
+        entries = [dict(row) for row in rows[:limit]]
+        next_cursor = self.encode_cursor(entries[-1]) if len(rows) > limit else None
+        return entries, next_cursor
+
+    def for_session(self, session_id: str) -> List[Dict[str, Any]]:
+        rows = self._connection().execute(
+            f"SELECT {self.COLUMNS} FROM reports WHERE session_id = ? ORDER BY created_at DESC",
+            (session_id,)
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+    def latest(self, session_id: str) -> Optional[Dict[str, Any]]:
+        row = self._connection().execute(
+            f"""
+            SELECT {', '.join('r.' + column.strip() for column in self.COLUMNS.split(','))}
+            FROM latest_reports l JOIN reports r ON r.filename = l.filename
+            WHERE l.session_id = ?
+            """,
+            (session_id,)
+        ).fetchone()
+        return dict(row) if row else None
+
+    def get(self, filename: str) -> Optional[Dict[str, Any]]:
+        row = self._connection().execute(
+            f"SELECT {self.COLUMNS} FROM reports WHERE filename = ?", (filename,)
+        ).fetchone()
+        return dict(row) if row else None
+
+    def count(self) -> int:
+        return self._connection().execute("SELECT COUNT(*) AS n FROM reports").fetchone()["n"]
+
+    # ---- migration ----
+
+    def backfill(self):
+        """
+        One-time import of report files written before the catalog existed.
+        This is the only place the reports directory is ever scanned.
+        """
+        connection = self._connection()
+        if connection.execute("SELECT 1 FROM catalog_meta WHERE key = 'backfilled'").fetchone():
+            return
+
+        entries = []
+        if os.path.isdir(self.reports_dir):
+            for filename in os.listdir(self.reports_dir):
+                if not filename.endswith(".json"):
+                    continue
+                path = self.file_path(filename)
+                try:
+                    with open(path, "r") as f:
+                        report_data = json.load(f)
+                except (OSError, ValueError):
+                    continue
+                business_context = report_data.get("business_context", "")
+                if isinstance(business_context, dict):
+                    business_context = business_context.get("comprehensive_context", "")
+                entries.append({
+                    "filename": filename,
+                    "session_id": report_data.get("session_id") or filename.rsplit("_", 3)[0],
+                    "created_at": report_data.get("created_at")
+                        or datetime.fromtimestamp(os.path.getmtime(path)).isoformat(),
+                    "research_type": report_data.get("research_type"),
+                    "company_name": report_data.get("company_name") or extract_company_name(str(business_context)),
+                    "status": report_data.get("status"),
+                    "size_bytes": os.path.getsize(path)
+                })
+
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            for entry in entries:
+                self._index(connection, entry)
+            connection.execute(
+                "INSERT OR REPLACE INTO catalog_meta (key, value) VALUES ('backfilled', ?)",
+                (datetime.now().isoformat(),)
+            )
+            connection.execute("COMMIT")
+        except Exception:
+            connection.execute("ROLLBACK")
+            raise
+        if entries:
+            print(f"📚 Report catalog backfilled {len(entries)} existing report(s)")
@@ -0,0 +1,160 @@
+# request_coalescing.py
+# Singleflight for research submissions - identical in-flight requests share one pipeline run
+
+import hashlib
+import os
+import re
+import threading
+import time
+from typing import Callable, Optional, Tuple
+
+from session_store import open_database
+
+
+def normalize_context(text: str) -> str:
+    """Whitespace-insensitive form of a business context (double submits often differ only in spacing)"""
+    return re.sub(r"\s+", " ", text or "").strip()
+
+
+def context_fingerprint(pipeline: str, context_text: str, use_cache: bool = True,
+                        deadline_seconds: Optional[float] = None) -> str:
+    """Pipeline, context and the run options that change the outcome - only identical runs are shared"""
+    deadline = float(deadline_seconds) if deadline_seconds else None
+    digest = hashlib.sha256(
+        f"{pipeline}\n{bool(use_cache)}\n{deadline}\n{normalize_context(context_text)}".encode("utf-8")
+    )
+    return digest.hexdigest()
+
+
+class RequestCoalescer:
+    """
+    Shared (SQLite, so every uvicorn worker sees it) registry of in-flight
+    runs by context fingerprint, plus client idempotency keys.
+
+    - `inflight_runs` maps a fingerprint to the session currently running it;
+      the row is removed when that run finishes.
+    - `idempotency_keys` maps a client key to the session it created, kept
+      for IDEMPOTENCY_TTL_SECONDS whether or not the run has finished.
+    - `run_waiters` lists the coalesced requests currently waiting on a run,
+      so it is only cancelled on disconnect once none of them is left.
+
+    Claims run inside BEGIN IMMEDIATE, so two simultaneous submissions can
+    never both become the primary run.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS inflight_runs (
+            fingerprint TEXT PRIMARY KEY,
+            session_id TEXT NOT NULL,
+            created_at REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_inflight_session ON inflight_runs (session_id);
+        CREATE TABLE IF NOT EXISTS idempotency_keys (
+            idempotency_key TEXT PRIMARY KEY,
+            session_id TEXT NOT NULL,
+            created_at REAL NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS run_waiters (
+            waiter_id TEXT PRIMARY KEY,
+            session_id TEXT NOT NULL,
+            created_at REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_run_waiters_session ON run_waiters (session_id);
+    """
+
+    def __init__(self, path: str = None, key_ttl_seconds: float = None):
+        self.path = path or os.getenv("COALESCING_DB_PATH") or os.getenv("SESSION_DB_PATH", "data/research.db")
+        self.key_ttl_seconds = key_ttl_seconds or float(os.getenv("IDEMPOTENCY_TTL_SECONDS", "86400"))
+        self._local = threading.local()
+        self._connection().executescript(self.SCHEMA)
+
+    def _connection(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = open_database(self.path)
+            self._local.connection = connection
+        return connection
+
+    def claim(self, fingerprint: str, session_id: str, idempotency_key: Optional[str] = None,
+              is_active: Callable[[str], bool] = None) -> Tuple[Optional[str], Optional[str]]:
+        """
+        Register `session_id` as the run for `fingerprint` (and the key), or
+        return the session to attach to instead.
+
+        Returns (existing_session_id, reason) with reason "idempotency_key" or
+        "in_flight", or (None, None) if the caller should start its own run.
+        `is_active` double-checks that a registered run is still going (a row
+        can outlive a run whose process died before releasing it).
+        """
+        now = time.time()
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            if idempotency_key:
+                connection.execute(
+                    "DELETE FROM idempotency_keys WHERE created_at < ?", (now - self.key_ttl_seconds,)
+                )
+                row = connection.execute(
+                    "SELECT session_id FROM idempotency_keys WHERE idempotency_key = ?", (idempotency_key,)
+                ).fetchone()
+                if row is not None:
+                    connection.execute("COMMIT")
+                    return row["session_id"], "idempotency_key"
+
+            row = connection.execute(
+                "SELECT session_id FROM inflight_runs WHERE fingerprint = ?", (fingerprint,)
+            ).fetchone()
+            if row is not None and (is_active is None or is_active(row["session_id"])):
+                if idempotency_key:
+                    connection.execute(
+                        "INSERT INTO idempotency_keys (idempotency_key, session_id, created_at) VALUES (?, ?, ?)",
+                        (idempotency_key, row["session_id"], now)
+                    )
+                connection.execute("COMMIT")
+                return row["session_id"], "in_flight"
+
+            connection.execute(
+                "INSERT OR REPLACE INTO inflight_runs (fingerprint, session_id, created_at) VALUES (?, ?, ?)",
+                (fingerprint, session_id, now)
+            )
+            if idempotency_key:
+                connection.execute(
+                    "INSERT INTO idempotency_keys (idempotency_key, session_id, created_at) VALUES (?, ?, ?)",
+                    (idempotency_key, session_id, now)
+                )
+            connection.execute("COMMIT")
+            return None, None
+        except Exception:
+            connection.execute("ROLLBACK")
+            raise
+
+    def track(self, fingerprint: str, session_id: str):
+        """Mark an existing session (e.g. a resumed one) as the in-flight run, unless another run holds it"""
+        self._connection().execute(
+            "INSERT OR IGNORE INTO inflight_runs (fingerprint, session_id, created_at) VALUES (?, ?, ?)",
+            (fingerprint, session_id, time.time())
+        )
+
+    def release(self, session_id: str):
+        """The session's run finished - later identical submissions start fresh"""
+        connection = self._connection()
+        connection.execute("DELETE FROM inflight_runs WHERE session_id = ?", (session_id,))
+        connection.execute("DELETE FROM run_waiters WHERE session_id = ?", (session_id,))
+
+    def attach_waiter(self, session_id: str, waiter_id: str):
+        """A coalesced request (`waiter_id`) is now waiting on the run of `session_id`"""
+        self._connection().execute(
+            "INSERT OR REPLACE INTO run_waiters (waiter_id, session_id, created_at) VALUES (?, ?, ?)",
+            (waiter_id, session_id, time.time())
+        )
+
+    def detach_waiter(self, waiter_id: str):
+        self._connection().execute("DELETE FROM run_waiters WHERE waiter_id = ?", (waiter_id,))
+
+    def waiter_count(self, session_id: str) -> int:
+        return self._connection().execute(
+            "SELECT COUNT(*) AS n FROM run_waiters WHERE session_id = ?", (session_id,)
+        ).fetchone()["n"]
+
+    def inflight_count(self) -> int:
+        return self._connection().execute("SELECT COUNT(*) AS n FROM inflight_runs").fetchone()["n"]
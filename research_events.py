@@ -0,0 +1,125 @@
+# research_events.py
+# Per-session progress events (phases, token deltas, stage outputs) for SSE streaming
+
+import asyncio
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+# "failed" rather than "error": EventSource reserves the error event for connection problems
+TERMINAL_EVENTS = ("complete", "failed", "cancelled")
+
+
+class ResearchEventBus:
+    """
+    Fan-out of research progress events to any number of stream subscribers.
+
+    `publish` is thread-safe and may be called from the job worker, crew
+    threads or the LLM gateway loop. Each session keeps its event history so a
+    client that connects late (or reconnects with Last-Event-ID) replays what
+    it missed before receiving live events. Histories of the least recently
+    active sessions are dropped beyond `max_sessions`.
+    """
+
+    def __init__(self, max_sessions: int = None, max_events: int = None):
+        self.max_sessions = max_sessions or int(os.getenv("STREAM_MAX_SESSIONS", "200"))
+        self.max_events = max_events or int(os.getenv("STREAM_MAX_EVENTS", "20000"))
+        self._lock = threading.Lock()
+        self._history: "OrderedDict[str, List[Dict[str, Any]]]" = OrderedDict()
+        self._next_id: Dict[str, int] = {}
+        self._subscribers: Dict[str, List[tuple]] = {}
+
+    def publish(self, session_id: str, event: str, data: Any = None):
+        with self._lock:
+            event_id = self._next_id.get(session_id, 0) + 1
+            self._next_id[session_id] = event_id
+            item = {"id": event_id, "event": event, "data": data}
+
+            history = self._history.setdefault(session_id, [])
+            self._history.move_to_end(session_id)
+            # Token deltas are the bulk of the history; stop keeping them
+            # (but still deliver them live) once a session hits the cap
+            if event != "delta" or len(history) < self.max_events:
+                history.append(item)
+            while len(self._history) > self.max_sessions:
+                dropped, _ = self._history.popitem(last=False)
+                self._next_id.pop(dropped, None)
+
+            subscribers = list(self._subscribers.get(session_id, []))
+
+        for loop, queue in subscribers:
+            try:
+                loop.call_soon_threadsafe(queue.put_nowait, item)
+            except RuntimeError:
+                # Subscriber's loop already closed
+                pass
+
+    def restart(self, session_id: str):
+        """
+        Drop a session's history before it runs again (resume), so new
+        subscribers don't stop at the previous attempt's terminal event.
+        Event ids keep increasing, so Last-Event-ID stays valid.
+        """
+        with self._lock:
+            self._history.pop(session_id, None)
+
+    def has_history(self, session_id: str) -> bool:
+        with self._lock:
+            return session_id in self._history
+
+    async def subscribe(self, session_id: str, last_event_id: int = 0,
+                        heartbeat_seconds: float = 15.0) -> AsyncIterator[Optional[Dict[str, Any]]]:
+        """
+        Yield events after last_event_id, then live events until a terminal
+        event. Yields None every heartbeat_seconds of silence so the caller can
+        keep proxies from timing out the connection.
+        """
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+        subscriber = (loop, queue)
+
+        with self._lock:
+            backlog = [item for item in self._history.get(session_id, []) if item["id"] > last_event_id]
+            self._subscribers.setdefault(session_id, []).append(subscriber)
+
+        try:
+            seen = last_event_id
+            for item in backlog:
+                seen = item["id"]
+                yield item
+                if item["event"] in TERMINAL_EVENTS:
+                    return
+
+            while True:
+                try:
+                    item = await asyncio.wait_for(queue.get(), timeout=heartbeat_seconds)
+                except asyncio.TimeoutError:
+                    yield None
+                    continue
+                if item["id"] <= seen:
+                    continue
+                seen = item["id"]
+                yield item
+                if item["event"] in TERMINAL_EVENTS:
+                    return
+        finally:
+            with self._lock:
+                subscribers = self._subscribers.get(session_id, [])
+                if subscriber in subscribers:
+                    subscribers.remove(subscriber)
+                if not subscribers:
+                    self._subscribers.pop(session_id, None)
+
+
+def format_sse(item: Optional[Dict[str, Any]]) -> str:
+    """Encode one event (or a heartbeat for None) in text/event-stream format"""
+    if item is None:
+        return ": keep-alive\n\n"
+    data = json.dumps(item["data"], default=str)
+    return f"id: {item['id']}\nevent: {item['event']}\ndata: {data}\n\n"
+
+
+# Shared bus used by the research jobs and the stream endpoint
+research_events = ResearchEventBus()
@@ -0,0 +1,112 @@
+# research_jobs.py
+# Background job execution for long-running research pipelines
+
+import asyncio
+import os
+import time
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict
+
+from agents.tracing import tracer
+
+JobRunner = Callable[[str, Dict[str, Any]], Awaitable[Any]]
+
+INTERACTIVE_LANE = "interactive"
+BATCH_LANE = "batch"
+
+
+class ResearchJobQueue:
+    """
+    In-process job queue for research sessions.
+
+    Endpoints enqueue a session and return immediately; worker tasks pick jobs
+    up and run the registered runner for the job kind. Runners are coroutines
+    and must offload blocking agent work (crew kickoffs, SDK calls) to threads
+    so the event loop stays free for other requests.
+
+    Jobs run in lanes, each with its own queue and workers. Interactive
+    requests use the interactive lane; bulk work goes to the smaller batch
+    lane so it can never occupy the workers interactive traffic needs.
+    """
+
+    def __init__(self, worker_count: int = None, batch_worker_count: int = None):
+        self.worker_count = worker_count or int(os.getenv("RESEARCH_WORKERS", "2"))
+        self.batch_worker_count = batch_worker_count or int(os.getenv("RESEARCH_BATCH_WORKERS", "1"))
+        self.runners: Dict[str, JobRunner] = {}
+        self.active_jobs: Dict[str, Dict[str, Any]] = {}
+        self._queues: Dict[str, asyncio.Queue] = {}
+        self._workers = []
+
+    def register(self, kind: str, runner: JobRunner):
+        """Register the coroutine that executes jobs of the given kind"""
+        self.runners[kind] = runner
+
+    async def start(self):
+        """Create the lane queues and spawn worker tasks on the running loop"""
+        if self._workers:
+            return
+        lanes = {INTERACTIVE_LANE: self.worker_count, BATCH_LANE: self.batch_worker_count}
+        for lane, count in lanes.items():
+            self._queues[lane] = asyncio.Queue()
+            self._workers.extend(
+                asyncio.create_task(self._worker(lane, worker_id))
+                for worker_id in range(count)
+            )
+        print(f"⚙️ Research job queue started with {self.worker_count} interactive "
+              f"and {self.batch_worker_count} batch workers")
+
+    async def stop(self):
+        """Cancel worker tasks (in-flight jobs are abandoned)"""
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        self._queues = {}
+
+    async def enqueue(self, session_id: str, kind: str, payload: Dict[str, Any], lane: str = INTERACTIVE_LANE):
+        """Queue a job for a session; returns as soon as the job is queued"""
+        if kind not in self.runners:
+            raise ValueError(f"No runner registered for job kind '{kind}'")
+        if not self._queues:
+            await self.start()
+        if lane not in self._queues:
+            raise ValueError(f"Unknown job lane '{lane}'")
+
+        await self._queues[lane].put({
+            "session_id": session_id,
+            "kind": kind,
+            "lane": lane,
+            "payload": payload,
+            "enqueued_at": datetime.now().isoformat(),
+            "enqueued_time": time.time()
+        })
+
+    def depth(self, lane: str = None) -> int:
+        """Number of jobs waiting for a worker (in one lane, or all lanes)"""
+        if lane is not None:
+            queue = self._queues.get(lane)
+            return queue.qsize() if queue is not None else 0
+        return sum(queue.qsize() for queue in self._queues.values())
+
+    async def _worker(self, lane: str, worker_id: int):
+        queue = self._queues[lane]
+        while True:
+            job = await queue.get()
+            session_id = job["session_id"]
+            self.active_jobs[session_id] = job
+            try:
+                print(f"⚙️ {lane.title()} worker {worker_id} running {job['kind']} job for {session_id}")
+                with tracer.span(f"job {job['kind']}", "job", trace_id=session_id, lane=lane, worker=worker_id):
+                    tracer.record("queued", "queue", job["enqueued_time"], time.time())
+                    await self.runners[job["kind"]](session_id, job["payload"])
+            except Exception as e:
+                # Runners record their own failures on the session; this only
+                # keeps an unexpected error from killing the worker.
+                print(f"❌ Job {job['kind']} for {session_id} failed: {e}")
+            finally:
+                self.active_jobs.pop(session_id, None)
+                queue.task_done()
+
+
+# Shared queue used by the API
+research_job_queue = ResearchJobQueue()
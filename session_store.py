@@ -0,0 +1,274 @@
+# session_store.py
+# Pluggable research session storage - SQLite (WAL) backend with an in-memory hot cache
+
+import copy
+import json
+import os
+import sqlite3
+import threading
+import uuid
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+def new_session_id(prefix: str) -> str:
+    """Collision-free session id (safe across workers and restarts)"""
+    return f"{prefix}_{uuid.uuid4().hex[:16]}"
+
+
+def open_database(path: str) -> sqlite3.Connection:
+    """Open a SQLite connection tuned for concurrent readers and one writer at a time"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    connection = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+    connection.row_factory = sqlite3.Row
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA synchronous=NORMAL")
+    connection.execute("PRAGMA busy_timeout=30000")
+    return connection
+
+
+def session_cursor(session: Dict[str, Any]) -> str:
+    """Cursor for the page after `session` in list() order"""
+    return f"{session.get('created_at', '')}|{session['session_id']}"
+
+
+def decode_session_cursor(cursor: str) -> Tuple[str, str]:
+    created_at, _, session_id = cursor.partition("|")
+    return created_at, session_id
+
+
+class SessionStore(ABC):
+    """
+    Session storage interface used by the API.
+
+    Sessions are plain dicts with at least status and created_at. Callers never
+    mutate a stored dict in place; they use update() for top-level fields or
+    update_with() for read-modify-write of nested fields.
+
+    Every method is synchronous. Single-session calls are indexed point
+    queries (sub-millisecond on the SQLite/WAL backend) and are made directly
+    from async handlers; list() and count() scan many rows, so async code
+    runs them through asyncio.to_thread.
+    """
+
+    @abstractmethod
+    def create(self, session_id: str, data: Dict[str, Any]) -> Dict[str, Any]:
+        ...
+
+    @abstractmethod
+    def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        ...
+
+    def update(self, session_id: str, **fields) -> Dict[str, Any]:
+        return self.update_with(session_id, lambda session: session.update(fields))
+
+    @abstractmethod
+    def update_with(self, session_id: str, mutate: Callable[[Dict[str, Any]], Any]) -> Dict[str, Any]:
+        ...
+
+    @abstractmethod
+    def list(self, status: Optional[str] = None, limit: int = 200,
+             cursor: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Sessions newest first, optionally filtered by status; `cursor` (session_cursor) starts after that session"""
+
+    @abstractmethod
+    def count(self, status: Optional[str] = None) -> int:
+        ...
+
+
+class InMemorySessionStore(SessionStore):
+    """Single-process store for local development"""
+
+    def __init__(self):
+        self._sessions: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def create(self, session_id, data):
+        with self._lock:
+            if session_id in self._sessions:
+                raise KeyError(f"Session {session_id} already exists")
+            self._sessions[session_id] = copy.deepcopy(data)
+            return copy.deepcopy(data)
+
+    def get(self, session_id):
+        with self._lock:
+            session = self._sessions.get(session_id)
+            return copy.deepcopy(session) if session is not None else None
+
+    def update_with(self, session_id, mutate):
+        with self._lock:
+            session = self._sessions[session_id]
+            mutate(session)
+            session["updated_at"] = datetime.now().isoformat()
+            return copy.deepcopy(session)
+
+    def list(self, status=None, limit=200, cursor=None):
+        after = decode_session_cursor(cursor) if cursor else None
+        with self._lock:
+            sessions = [
+                dict(copy.deepcopy(data), session_id=session_id)
+                for session_id, data in self._sessions.items()
+                if (status is None or data.get("status") == status)
+                and (after is None or (data.get("created_at", ""), session_id) < after)
+            ]
+        sessions.sort(key=lambda session: (session.get("created_at", ""), session["session_id"]), reverse=True)
+        return sessions[:limit]
+
+    def count(self, status=None):
+        with self._lock:
+            return sum(1 for data in self._sessions.values() if status is None or data.get("status") == status)
+
+
+class SQLiteSessionStore(SessionStore):
+    """
+    Sessions persisted in SQLite (WAL mode) so they survive restarts and are
+    shared by every uvicorn worker on the instance. Status and created_at are
+    real columns with indexes; the rest of the session is a JSON document.
+
+    Decoded sessions are kept in a small LRU hot cache. A cached copy is only
+    served if its updated_at still matches the row, so writes from other
+    workers are never hidden.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS sessions (
+            session_id TEXT PRIMARY KEY,
+            status TEXT NOT NULL,
+            created_at TEXT NOT NULL,
+            updated_at TEXT NOT NULL,
+            data TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_sessions_status ON sessions (status, created_at);
+        CREATE INDEX IF NOT EXISTS idx_sessions_created_at ON sessions (created_at);
+    """
+
+    def __init__(self, path: str = None, cache_size: int = None):
+        self.path = path or os.getenv("SESSION_DB_PATH", "data/research.db")
+        self.cache_size = cache_size or int(os.getenv("SESSION_CACHE_SIZE", "256"))
+        self._local = threading.local()
+        self._cache: OrderedDict = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._connection().executescript(self.SCHEMA)
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = open_database(self.path)
+            self._local.connection = connection
+        return connection
+
+    # ---- hot cache ----
+
+    def _cache_get(self, session_id: str, updated_at: str) -> Optional[Dict[str, Any]]:
+        with self._cache_lock:
+            entry = self._cache.get(session_id)
+            if entry is None or entry[0] != updated_at:
+                return None
+            self._cache.move_to_end(session_id)
+            return copy.deepcopy(entry[1])
+
+    def _cache_put(self, session_id: str, updated_at: str, session: Dict[str, Any]):
+        with self._cache_lock:
+            self._cache[session_id] = (updated_at, copy.deepcopy(session))
+            self._cache.move_to_end(session_id)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    # ---- SessionStore ----
+
+    def create(self, session_id, data):
+        session = dict(data)
+        session.setdefault("created_at", datetime.now().isoformat())
+        session["updated_at"] = datetime.now().isoformat()
+        self._connection().execute(
+            "INSERT INTO sessions (session_id, status, created_at, updated_at, data) VALUES (?, ?, ?, ?, ?)",
+            (session_id, session.get("status", "queued"), session["created_at"], session["updated_at"],
+             json.dumps(session, default=str))
+        )
+        self._cache_put(session_id, session["updated_at"], session)
+        return copy.deepcopy(session)
+
+    def get(self, session_id):
+        connection = self._connection()
+        row = connection.execute(
+            "SELECT updated_at FROM sessions WHERE session_id = ?", (session_id,)
+        ).fetchone()
+        if row is None:
+            return None
+
+        cached = self._cache_get(session_id, row["updated_at"])
+        if cached is not None:
+            return cached
+
+        row = connection.execute(
+            "SELECT updated_at, data FROM sessions WHERE session_id = ?", (session_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        session = json.loads(row["data"])
+        self._cache_put(session_id, row["updated_at"], session)
+        return session
+
+    def update_with(self, session_id, mutate):
+        connection = self._connection()
+        # IMMEDIATE takes the write lock up front so concurrent read-modify-write
+        # cycles (phase updates from several workers) serialize cleanly
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            row = connection.execute(
+                "SELECT data FROM sessions WHERE session_id = ?", (session_id,)
+            ).fetchone()
+            if row is None:
+                raise KeyError(f"Session {session_id} not found")
+            session = json.loads(row["data"])
+            mutate(session)
+            session["updated_at"] = datetime.now().isoformat()
+            connection.execute(
+                "UPDATE sessions SET status = ?, updated_at = ?, data = ? WHERE session_id = ?",
+                (session.get("status", "queued"), session["updated_at"], json.dumps(session, default=str), session_id)
+            )
+            connection.execute("COMMIT")
+        except Exception:
+            connection.execute("ROLLBACK")
+            raise
+        self._cache_put(session_id, session["updated_at"], session)
+        return copy.deepcopy(session)
+
+    def list(self, status=None, limit=200, cursor=None):
+        conditions, params = [], []
+        if status is not None:
+            conditions.append("status = ?")
+            params.append(status)
+        if cursor:
+            created_at, session_id = decode_session_cursor(cursor)
+            conditions.append("(created_at < ? OR (created_at = ? AND session_id < ?))")
+            params.extend((created_at, created_at, session_id))
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        rows = self._connection().execute(
+            f"SELECT session_id, data FROM sessions {where} ORDER BY created_at DESC, session_id DESC LIMIT ?",
+            (*params, limit)
+        ).fetchall()
+        return [dict(json.loads(row["data"]), session_id=row["session_id"]) for row in rows]
+
+    def count(self, status=None):
+        if status is None:
+            row = self._connection().execute("SELECT COUNT(*) AS n FROM sessions").fetchone()
+        else:
+            row = self._connection().execute(
+                "SELECT COUNT(*) AS n FROM sessions WHERE status = ?", (status,)
+            ).fetchone()
+        return row["n"]
+
+
+def create_session_store() -> SessionStore:
+    """Pick the backend from SESSION_STORE (sqlite by default, memory for local dev)"""
+    backend = os.getenv("SESSION_STORE", "sqlite").lower()
+    if backend == "memory":
+        return InMemorySessionStore()
+    if backend == "sqlite":
+        return SQLiteSessionStore()
+    raise ValueError(f"Unknown SESSION_STORE backend: {backend}")
@@ -0,0 +1,97 @@
+# stage_checkpoints.py
+# Durable per-stage outputs so failed or interrupted research sessions resume where they stopped
+
+import json
+import os
+import threading
+from datetime import datetime
+from typing import Any, Dict, List, Tuple
+
+from session_store import open_database
+
+
+class StageCheckpointStore:
+    """
+    One row per (session_id, stage), written as soon as the stage finishes.
+
+    Outputs are stored as JSON; objects that are not JSON-serializable
+    (crew outputs) are stored as their text, which is what downstream stages
+    render them to anyway.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS stage_checkpoints (
+            session_id TEXT NOT NULL,
+            stage TEXT NOT NULL,
+            output TEXT NOT NULL,
+            created_at TEXT NOT NULL,
+            PRIMARY KEY (session_id, stage)
+        );
+    """
+
+    def __init__(self, path: str = None):
+        self.path = path or os.getenv("CHECKPOINT_DB_PATH") or os.getenv("SESSION_DB_PATH", "data/research.db")
+        self._local = threading.local()
+        self._connection().executescript(self.SCHEMA)
+
+    def _connection(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = open_database(self.path)
+            self._local.connection = connection
+        return connection
+
+    def save(self, session_id: str, stage: str, output: Any):
+        self._connection().execute(
+            "INSERT INTO stage_checkpoints (session_id, stage, output, created_at) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT (session_id, stage) DO UPDATE SET output = excluded.output, created_at = excluded.created_at",
+            (session_id, stage, json.dumps(output, default=str), datetime.now().isoformat())
+        )
+
+    def load(self, session_id: str) -> Dict[str, Any]:
+        """All checkpointed stage outputs for a session"""
+        rows = self._connection().execute(
+            "SELECT stage, output FROM stage_checkpoints WHERE session_id = ?", (session_id,)
+        ).fetchall()
+        return {row["stage"]: json.loads(row["output"]) for row in rows}
+
+    def stages(self, session_id: str) -> List[str]:
+        rows = self._connection().execute(
+            "SELECT stage FROM stage_checkpoints WHERE session_id = ? ORDER BY created_at", (session_id,)
+        ).fetchall()
+        return [row["stage"] for row in rows]
+
+    def clear(self, session_id: str):
+        self._connection().execute("DELETE FROM stage_checkpoints WHERE session_id = ?", (session_id,))
+
+    def for_session(self, session_id: str) -> "SessionCheckpoints":
+        return SessionCheckpoints(self, session_id)
+
+
+class SessionCheckpoints:
+    """
+    A session's checkpoints, loaded once per run. This is the object agents
+    see through `agents.checkpoints.checkpoint_scope`.
+    """
+
+    def __init__(self, store: StageCheckpointStore, session_id: str):
+        self.store = store
+        self.session_id = session_id
+        self._outputs = store.load(session_id)
+        self._lock = threading.Lock()
+
+    def restore(self, stage: str) -> Tuple[bool, Any]:
+        with self._lock:
+            if stage in self._outputs:
+                return True, self._outputs[stage]
+        return False, None
+
+    def save(self, stage: str, output: Any):
+        try:
+            self.store.save(self.session_id, stage, output)
+        except Exception as e:
+            # A failed checkpoint only costs a re-run of this stage on resume
+            print(f"⚠️ Could not checkpoint {stage} for {self.session_id}: {e}")
+            return
+        with self._lock:
+            self._outputs[stage] = output
@@ -0,0 +1,158 @@
+# static_pages.py
+# Pre-rendered static pages/assets - hashed CSS/JS, strong ETags, precompressed gzip/brotli variants
+
+import gzip
+import hashlib
+import re
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional
+
+from fastapi import Request
+from fastapi.responses import Response
+
+try:
+    import brotli
+    BROTLI_AVAILABLE = True
+except ImportError:
+    brotli = None
+    BROTLI_AVAILABLE = False
+
+# Pages revalidate every time (cheap 304); hashed assets never change under their URL
+PAGE_CACHE_CONTROL = "public, no-cache"
+ASSET_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+# Below this, compression overhead isn't worth it
+MIN_COMPRESS_BYTES = 512
+
+STYLE_PATTERN = re.compile(r"<style>(.*?)</style>", re.DOTALL)
+SCRIPT_PATTERN = re.compile(r"<script>(.*?)</script>", re.DOTALL)
+
+
+class StaticResource:
+    """One immutable response body with its ETag and precompressed variants"""
+
+    def __init__(self, content: str, media_type: str, cache_control: str, last_modified: Optional[str] = None):
+        self.media_type = media_type
+        self.cache_control = cache_control
+        self.last_modified = last_modified
+        self.body = content.encode("utf-8")
+        self.digest = hashlib.sha256(self.body).hexdigest()[:20]
+
+        # encoding -> (body, etag); strong ETags differ per encoding since the bytes do
+        self.variants = {"identity": (self.body, f'"{self.digest}"')}
+        if len(self.body) >= MIN_COMPRESS_BYTES:
+            self.variants["gzip"] = (gzip.compress(self.body, compresslevel=9, mtime=0), f'"{self.digest}-gz"')
+            if BROTLI_AVAILABLE:
+                self.variants["br"] = (brotli.compress(self.body, quality=11), f'"{self.digest}-br"')
+
+    def etags(self):
+        return {etag for _, etag in self.variants.values()}
+
+
+def accepted_encodings(header: Optional[str]) -> Dict[str, float]:
+    """Parse Accept-Encoding into {encoding: q}"""
+    accepted = {}
+    for part in (header or "").split(","):
+        token, _, params = part.strip().partition(";")
+        if not token:
+            continue
+        q = 1.0
+        match = re.search(r"q=([0-9.]+)", params)
+        if match:
+            try:
+                q = float(match.group(1))
+            except ValueError:
+                q = 0.0
+        accepted[token.strip().lower()] = q
+    return accepted
+
+
+def not_modified_since(last_modified: str, if_modified_since: Optional[str]) -> bool:
+    if not if_modified_since:
+        return False
+    try:
+        return parsedate_to_datetime(last_modified) <= parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+
+
+class StaticPages:
+    """
+    Pages and their CSS/JS rendered once at startup.
+
+    `add_page` moves a page's inline <style>/<script> blocks into assets at
+    content-hashed URLs (/static/<name>.<hash>.css|js), so browsers cache
+    them for good and the page itself shrinks to markup. Every response
+    carries a strong ETag; If-None-Match gets a 304 with no body, and
+    Accept-Encoding picks a precompressed br/gzip variant.
+    """
+
+    def __init__(self, asset_prefix: str = "/static"):
+        self.asset_prefix = asset_prefix
+        self.pages: Dict[str, StaticResource] = {}
+        self.assets: Dict[str, StaticResource] = {}
+
+    def _add_asset(self, name: str, extension: str, content: str, media_type: str) -> str:
+        resource = StaticResource(content, media_type, ASSET_CACHE_CONTROL)
+        filename = f"{name}.{resource.digest[:12]}.{extension}"
+        self.assets[filename] = resource
+        return f"{self.asset_prefix}/{filename}"
+
+    def add_page(self, path: str, html: str, asset_name: str) -> StaticResource:
+        styles = "\n".join(STYLE_PATTERN.findall(html))
+        scripts = "\n".join(SCRIPT_PATTERN.findall(html))
+
+        if styles:
+            css_url = self._add_asset(asset_name, "css", styles, "text/css")
+            html = STYLE_PATTERN.sub("", html)
+            html = html.replace("</head>", f'    <link rel="stylesheet" href="{css_url}">\n    </head>', 1)
+        if scripts:
+            js_url = self._add_asset(asset_name, "js", scripts, "application/javascript")
+            html = SCRIPT_PATTERN.sub("", html)
+            html = html.replace("</body>", f'    <script src="{js_url}"></script>\n    </body>', 1)
+
+        page = StaticResource(html, "text/html; charset=utf-8", PAGE_CACHE_CONTROL)
+        self.pages[path] = page
+        return page
+
+    def respond(self, resource: StaticResource, request: Request) -> Response:
+        headers = {"Cache-Control": resource.cache_control, "Vary": "Accept-Encoding"}
+        if resource.last_modified:
+            headers["Last-Modified"] = resource.last_modified
+
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match:
+            candidates = {tag.strip().replace("W/", "", 1) for tag in if_none_match.split(",")}
+            if "*" in candidates or candidates & resource.etags():
+                headers["ETag"] = next(iter(candidates & resource.etags()), resource.variants["identity"][1])
+                return Response(status_code=304, headers=headers)
+        elif resource.last_modified and not_modified_since(resource.last_modified, request.headers.get("if-modified-since")):
+            # If-Modified-Since only counts when the client sent no ETag to compare
+            headers["ETag"] = resource.variants["identity"][1]
+            return Response(status_code=304, headers=headers)
+
+        accepted = accepted_encodings(request.headers.get("accept-encoding"))
+        encoding = "identity"
+        for candidate in ("br", "gzip"):
+            if candidate in resource.variants and accepted.get(candidate, accepted.get("*", 0)) > 0:
+                encoding = candidate
+                break
+
+        body, etag = resource.variants[encoding]
+        headers["ETag"] = etag
+        if encoding != "identity":
+            headers["Content-Encoding"] = encoding
+        return Response(content=body, media_type=resource.media_type, headers=headers)
+
+    def page_response(self, path: str, request: Request) -> Response:
+        return self.respond(self.pages[path], request)
+
+    def asset_response(self, filename: str, request: Request) -> Optional[Response]:
+        resource = self.assets.get(filename)
+        if resource is None:
+            return None
+        return self.respond(resource, request)
+
+
+# Shared pre-rendered pages served by the API
+static_pages = StaticPages()
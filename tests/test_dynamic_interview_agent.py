@@ -0,0 +1,47 @@
+# test_dynamic_interview_agent.py
+# Merging per-persona interview outcomes, including malformed LLM output
+
+import json
+
+from agents.dynamic_interview_agent import DynamicInterviewAgent
+
+
+def _agent():
+    # merge_persona_interviews needs none of the LLM setup done in __init__
+    return DynamicInterviewAgent.__new__(DynamicInterviewAgent)
+
+
+def _completed(result):
+    return {"status": "completed", "result": result, "duration": 0.1}
+
+
+def test_malformed_persona_keeps_raw_transcript_and_merges_the_rest():
+    personas = [{"persona_id": f"persona_{n:03d}"} for n in range(1, 7)]
+    good = json.dumps({
+        "persona_interview": {"interview_sessions": [{"session": 1}, {"session": 2}]},
+        "marketing_intelligence": {"pain_language": ["stuck", "overwhelmed"]},
+        "campaign_ready_insights": {"headlines": "Own your book"}
+    })
+    outcomes = {
+        0: _completed(good),
+        1: _completed('["a list", "of strings"]'),
+        2: _completed('{"persona_interview": "just text"}'),
+        3: _completed('{"persona_interview": {}, "marketing_intelligence": ["not", "a", "dict"]}'),
+        4: _completed("no JSON here"),
+        5: {"status": "error", "error": "boom", "duration": 0.1}
+    }
+
+    merged = _agent().merge_persona_interviews(personas, outcomes)
+
+    interviews = merged["persona_interviews"]
+    assert [entry["persona_id"] for entry in interviews] == [persona["persona_id"] for persona in personas]
+    assert interviews[0]["interview_sessions"] == [{"session": 1}, {"session": 2}]
+    for entry, outcome in zip(interviews[1:5], list(outcomes.values())[1:5]):
+        assert entry["raw_transcript"] == outcome["result"]
+    assert interviews[5]["error"] == "Interview error: boom"
+
+    assert merged["interview_summary"]["total_interviews"] == 2
+    assert merged["interview_summary"]["insight_quality"] == "5/6 persona interviews completed"
+    assert merged["interview_summary"]["failed_personas"] == ["persona_006"]
+    assert merged["marketing_intelligence"] == {"pain_language": ["stuck", "overwhelmed"]}
+    assert merged["campaign_ready_insights"] == {"headlines": ["Own your book"]}
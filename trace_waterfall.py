@@ -0,0 +1,139 @@
+# trace_waterfall.py
+# HTML waterfall for a session's trace spans, with the critical path highlighted
+
+import html
+from collections import defaultdict
+from typing import Any, Dict, List, Set
+
+STATUS_COLORS = {
+    "ok": "#48bb78",
+    "completed": "#48bb78",
+    "restored": "#9ae6b4",
+    "running": "#4299e1",
+    "fallback": "#ecc94b",
+    "cancelled": "#a0aec0",
+    "error": "#f56565"
+}
+
+# Attributes shown next to a span, in this order
+DETAIL_KEYS = (
+    "model", "prompt_tokens", "completion_tokens", "cached_prompt_tokens", "retries", "http_attempts",
+    "llm_requests", "status_code", "rate_limit_wait_seconds", "cached", "lane", "queued_seconds"
+)
+
+
+def _ordered(spans: List[Dict[str, Any]]):
+    """(span, depth) in depth-first order, children by start time"""
+    ids = {span["span_id"] for span in spans}
+    children = defaultdict(list)
+    roots = []
+    for span in spans:
+        if span.get("parent_id") in ids:
+            children[span["parent_id"]].append(span)
+        else:
+            roots.append(span)
+
+    ordered = []
+    stack = [(span, 0) for span in sorted(roots, key=lambda span: span["start"], reverse=True)]
+    while stack:
+        span, depth = stack.pop()
+        ordered.append((span, depth))
+        for child in sorted(children[span["span_id"]], key=lambda child: child["start"], reverse=True):
+            stack.append((child, depth + 1))
+    return ordered, roots, children
+
+
+def critical_path(roots: List[Dict[str, Any]], children: Dict[str, List[Dict[str, Any]]]) -> Set[str]:
+    """
+    Span ids on each root's critical path: from the root, repeatedly follow
+    the child that finished last - the one the parent was waiting on.
+    """
+    path = set()
+    for span in roots:
+        while span is not None:
+            path.add(span["span_id"])
+            kids = children.get(span["span_id"])
+            span = max(kids, key=lambda child: child["end"]) if kids else None
+    return path
+
+
+def summarize(spans: List[Dict[str, Any]]) -> Dict[str, Any]:
+    llm_spans = [span for span in spans if span["kind"] == "llm"]
+    return {
+        "spans": len(spans),
+        "llm_calls": len(llm_spans),
+        "llm_seconds": round(sum(span["duration_seconds"] for span in llm_spans), 3),
+        "prompt_tokens": sum(span["attributes"].get("prompt_tokens") or 0 for span in llm_spans),
+        "completion_tokens": sum(span["attributes"].get("completion_tokens") or 0 for span in llm_spans),
+        "retries": sum(span["attributes"].get("retries") or 0 for span in llm_spans),
+        "errors": sum(1 for span in spans if span["status"] == "error")
+    }
+
+
+def _details(span: Dict[str, Any]) -> str:
+    attributes = span.get("attributes", {})
+    parts = [f"{key}={attributes[key]}" for key in DETAIL_KEYS if key in attributes]
+    if span.get("error"):
+        parts.append(f"error={span['error'][:200]}")
+    return html.escape(" · ".join(str(part) for part in parts))
+
+
+def render_waterfall(trace_id: str, spans: List[Dict[str, Any]]) -> str:
+    """Full HTML page: summary, then one row per span with a bar on a shared timeline"""
+    title = f"Trace - Session {html.escape(trace_id)}"
+    if not spans:
+        return f"<!DOCTYPE html><html><head><title>{title}</title></head><body><h1>{title}</h1><p>No spans recorded for this session.</p></body></html>"
+
+    ordered, roots, children = _ordered(spans)
+    on_path = critical_path(roots, children)
+    started = min(span["start"] for span in spans)
+    total = max(max(span["end"] for span in spans) - started, 1e-6)
+    summary = summarize(spans)
+
+    rows = []
+    for span, depth in ordered:
+        left = (span["start"] - started) / total * 100
+        width = max(span["duration_seconds"] / total * 100, 0.2)
+        color = STATUS_COLORS.get(span["status"], "#718096")
+        critical = " critical" if span["span_id"] in on_path else ""
+        rows.append(
+            f'<tr class="{span["kind"]}{critical}">'
+            f'<td class="name" style="padding-left: {8 + depth * 16}px" title="{html.escape(span["name"])}">{html.escape(span["name"])}</td>'
+            f'<td class="kind">{html.escape(span["kind"])}</td>'
+            f'<td class="duration">{span["duration_seconds"]:.3f}s</td>'
+            f'<td class="timeline"><div class="bar" style="left: {left:.3f}%; width: {width:.3f}%; background: {color}"></div></td>'
+            f'<td class="details">{_details(span)}</td>'
+            f'</tr>'
+        )
+
+    summary_items = "".join(f"<li><strong>{key.replace('_', ' ')}:</strong> {value}</li>" for key, value in summary.items())
+    return f"""<!DOCTYPE html>
+<html>
+<head>
+    <title>{title}</title>
+    <style>
+        body {{ font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif; margin: 30px; color: #2d3748; }}
+        ul.summary {{ list-style: none; padding: 0; display: flex; flex-wrap: wrap; gap: 20px; }}
+        table {{ border-collapse: collapse; width: 100%; font-size: 13px; table-layout: fixed; }}
+        td {{ padding: 3px 8px; border-bottom: 1px solid #edf2f7; white-space: nowrap; overflow: hidden; text-overflow: ellipsis; }}
+        td.name {{ width: 26%; }}
+        td.kind {{ width: 7%; color: #718096; }}
+        td.duration {{ width: 7%; text-align: right; font-family: monospace; }}
+        td.timeline {{ width: 35%; position: relative; }}
+        td.details {{ width: 25%; color: #4a5568; font-family: monospace; font-size: 12px; }}
+        .bar {{ position: absolute; top: 5px; bottom: 5px; min-width: 2px; border-radius: 2px; }}
+        tr.critical td.name {{ font-weight: 600; }}
+        tr.critical .bar {{ outline: 2px solid #2d3748; }}
+    </style>
+</head>
+<body>
+    <h1>🔎 {title}</h1>
+    <p>Total {total:.2f}s. Bold rows with outlined bars are the critical path - the chain of spans each parent was waiting on.</p>
+    <ul class="summary">{summary_items}</ul>
+    <table>
+        <tr><th>Span</th><th>Kind</th><th>Duration</th><th>Timeline</th><th>Details</th></tr>
+        {"".join(rows)}
+    </table>
+    <p><a href="?format=json">Raw spans (JSON)</a></p>
+</body>
+</html>"""